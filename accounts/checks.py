@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_user_cache(app_configs, **kwargs):
+    """The cached users and sessions are invalidated in a single process
+    when the cache isn't shared, other workers keep them until they
+    expire."""
+    aliases = {settings.RECIPY_USER_CACHE['alias']}
+    if settings.SESSION_ENGINE == 'django.contrib.sessions.backends.cached_db':
+        aliases.add(settings.SESSION_CACHE_ALIAS)
+
+    return [
+        Warning(
+            f'Cache "{alias}" is local to the process, so the users and '
+            f'sessions logged out in one worker stay cached in the others.',
+            hint='Set CACHE_URL to a cache shared by all the workers.',
+            id='accounts.W001',
+        )
+        for alias in sorted(aliases)
+        if isinstance(caches[alias], LocMemCache)
+    ]
@@ -1,19 +1,151 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 
+from accounts.middleware import UserCache
 from accounts.models import RecipyUser
+from recipy.models import Recipe
+from recipy.pantry import invalidate_ingredient_index
+from recipy.utils.images import find_orphaned_images, is_seed_image
+from recipy.utils.purge import (
+    delete_recipes_in_bulk, get_recipe_dependent_querysets
+)
 
 
 class Command(BaseCommand):
-    help = 'Clears all data for the demo user.'
+    help = 'Clears all data for the demo user or the given users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Users whose data is cleared. By default, the demo user.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of recipes deleted in a single transaction.',
+        )
+        parser.add_argument(
+            '--image-batch-size', type=int, default=1000,
+            help='Number of image files checked in a single query when '
+                 'looking for the orphaned images.',
+        )
+        parser.add_argument(
+            '--image-min-age', type=int, default=60,
+            help='Orphaned images newer than this number of minutes are kept '
+                 'because they could belong to a recipe which is just being '
+                 'saved.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be deleted.',
+        )
 
     def handle(self, *args, **options):
-        username = settings.RECIPY_DEMO_USER['username']
-
-        demo_user_qs = RecipyUser.objects.filter(username=username)
-        if not demo_user_qs.exists():
-            self.stderr.write('Demo user does not exist.')
-        else:
-            demo_user = demo_user_qs.first()
-            demo_user.recipes.all().delete()
-            self.stdout.write('Successfully deleted demo user data.')
+        chunk_size = options['chunk_size']
+        image_batch_size = options['image_batch_size']
+        if chunk_size < 1 or image_batch_size < 1:
+            msg = 'Chunk size and image batch size have to be positive '
+            msg += 'numbers.'
+            raise CommandError(msg)
+
+        usernames = options['usernames'] or \
+            [settings.RECIPY_DEMO_USER['username']]
+        users = list(RecipyUser.objects.filter(username__in=usernames))
+        missing_usernames = set(usernames) - {user.username for user in users}
+        for username in sorted(missing_usernames):
+            self.stderr.write(f'User "{username}" does not exist.')
+        if not users:
+            return
+
+        recipes = Recipe.objects.filter(user__in=users)
+        image_min_age = timedelta(minutes=options['image_min_age'])
+        if options['dry_run']:
+            self.report_dry_run(recipes, image_batch_size, image_min_age)
+            return
+
+        start = time.perf_counter()
+        deleted_counts = self.delete_recipes(recipes, chunk_size)
+        orphaned_images_count = self.delete_orphaned_images(
+            image_batch_size, image_min_age
+        )
+        # The cached users could hold related objects of the deleted data
+        UserCache().invalidate(*[user.pk for user in users])
+        duration = time.perf_counter() - start
+
+        msg = f'Successfully deleted demo user data in {duration:.1f} s: '
+        msg += ', '.join(
+            f'{count} {label}' for label, count in deleted_counts.items()
+        )
+        msg += f' and {orphaned_images_count} orphaned image file(s).'
+        self.stdout.write(msg)
+
+    def delete_recipes(self, recipes, chunk_size):
+        total_count = recipes.count()
+
+        deleted_counts = Counter()
+        start = time.perf_counter()
+        while True:
+            with transaction.atomic():
+                chunk = list(
+                    recipes.order_by('pk').values_list('pk', 'image')
+                    [:chunk_size]
+                )
+                if not chunk:
+                    break
+
+                recipe_pks = [recipe_pk for recipe_pk, _ in chunk]
+                deleted_counts.update(delete_recipes_in_bulk(recipe_pks))
+
+            # The signal handlers delete only the renditions
+            for _, image_name in chunk:
+                if image_name and not is_seed_image(image_name):
+                    default_storage.delete(image_name)
+
+            deleted_count = deleted_counts[Recipe._meta.label]
+            rate = deleted_count / (time.perf_counter() - start)
+            self.stdout.write(
+                f'Deleted {deleted_count}/{total_count} recipes '
+                f'({rate:.0f} recipes/s).'
+            )
+
+        if deleted_counts:
+            invalidate_ingredient_index()
+
+        return deleted_counts
+
+    def delete_orphaned_images(self, batch_size, min_age):
+        deleted_count = 0
+        start = time.perf_counter()
+        for name in find_orphaned_images(batch_size, min_age):
+            default_storage.delete(name)
+            deleted_count += 1
+
+            if deleted_count % batch_size == 0:
+                self.stdout.write(
+                    f'Deleted {deleted_count} orphaned image file(s) in '
+                    f'{time.perf_counter() - start:.1f} s.'
+                )
+
+        return deleted_count
+
+    def report_dry_run(self, recipes, image_batch_size, image_min_age):
+        recipe_pks = recipes.values('pk')
+        self.stdout.write(f'{recipes.count()} {Recipe._meta.label} would be '
+                          f'deleted.')
+        for label, queryset in \
+                get_recipe_dependent_querysets(recipe_pks).items():
+            self.stdout.write(f'{queryset.count()} {label} would be deleted.')
+
+        images_count = recipes.exclude(image='').exclude(image=None).count()
+        orphaned_images_count = sum(
+            1 for _ in find_orphaned_images(image_batch_size, image_min_age)
+        )
+        msg = f'The images of {images_count} recipe(s) and '
+        msg += f'{orphaned_images_count} orphaned image file(s) would be '
+        msg += f'deleted.'
+        self.stdout.write(msg)
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+
+class UserCache:
+    """Short-lived cache of the authenticated users, which saves the user
+    query of every request.
+
+    A user is cached together with the session auth hash it was verified
+    with, i.e. the hash of the password at the time. A session whose hash
+    differs, e.g. because the password was changed in the meantime, loads
+    and verifies the user from the database as usual. The cached users are
+    invalidated whenever they are saved or deleted, on logout and when the
+    demo user data is cleared (see accounts.signals).
+
+    Configured with the RECIPY_USER_CACHE setting:
+        - alias: alias of the cache in CACHES
+        - timeout: number of seconds a user is kept in the cache
+    """
+    key_prefix = 'accounts:user'
+
+    def __init__(self):
+        self.cache = caches[settings.RECIPY_USER_CACHE['alias']]
+        self.timeout = settings.RECIPY_USER_CACHE['timeout']
+
+    def get(self, user_pk, session_hash):
+        """Returns the cached user if it was verified with the session hash,
+        otherwise None."""
+        cached = self.cache.get(self._get_key(user_pk))
+        if cached is None or not session_hash:
+            return None
+
+        cached_hash, user = cached
+        if not constant_time_compare(cached_hash, session_hash):
+            return None
+
+        return user
+
+    def set(self, user, session_hash):
+        self.cache.set(self._get_key(user.pk), (session_hash, user),
+                       self.timeout)
+
+    def invalidate(self, *user_pks):
+        self.cache.delete_many([self._get_key(pk) for pk in user_pks])
+
+    def _get_key(self, user_pk):
+        return f'{self.key_prefix}:{user_pk}'
+
+
+def get_user(request):
+    """Returns the user of the session from the UserCache. Falls back to
+    django.contrib.auth.get_user, which also verifies the session, and
+    caches the user it returns."""
+    session = request.session
+    user_pk = session.get(auth.SESSION_KEY)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    backend_path = session.get(auth.BACKEND_SESSION_KEY)
+    if user_pk is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    user_cache = UserCache()
+    user = user_cache.get(user_pk, session_hash)
+    if user is not None:
+        return user
+
+    user = auth.get_user(request)
+    # The session hash could have been updated by get_user, e.g. after a
+    # change of SECRET_KEY
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if user.is_authenticated and session_hash:
+        user_cache.set(user, session_hash)
+
+    return user
+
+
+class CachedUserAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware which loads request.user through the
+    UserCache. Replaces AuthenticationMiddleware in MIDDLEWARE.
+
+    Together with the cached_db or signed_cookies session engine (see
+    SESSION_ENGINE), a request of a logged-in user usually needs no query to
+    authenticate.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
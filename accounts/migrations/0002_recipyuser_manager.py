@@ -0,0 +1,20 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:57
+
+import accounts.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='recipyuser',
+            managers=[
+                ('objects', accounts.models.RecipyUserManager()),
+            ],
+        ),
+    ]
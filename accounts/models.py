@@ -1,5 +1,25 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import models
 
 
-class RecipyUser(AbstractUser):
+class RecipyUserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """Also invalidates the cached users, which are otherwise invalidated
+        by the save and delete signals (see accounts.signals). Covers e.g.
+        the users deactivated in bulk."""
+        # The middleware module can't be imported before the models are
+        from accounts.middleware import UserCache
+
+        user_pks = list(self.values_list('pk', flat=True))
+        updated_count = super().update(**kwargs)
+        UserCache().invalidate(*user_pks)
+        return updated_count
+
+
+class RecipyUserManager(UserManager.from_queryset(RecipyUserQuerySet)):
     pass
+
+
+class RecipyUser(AbstractUser):
+    objects = RecipyUserManager()
@@ -0,0 +1,20 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.middleware import UserCache
+from accounts.models import RecipyUser
+
+
+@receiver(post_save, sender=RecipyUser)
+@receiver(post_delete, sender=RecipyUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers the password changes, which also update the session auth hash,
+    # and the logins, which update last_login
+    UserCache().invalidate(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_cached_user_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        UserCache().invalidate(user.pk)
@@ -1,3 +1,210 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth import HASH_SESSION_KEY
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+
+from accounts.middleware import UserCache
+from accounts.models import RecipyUser
+from recipy.models import Recipe, Step, Ingredient, RecipeSearchDocument
+from recipy.tests.test_images import make_image_file
+from recipy.utils.images import get_rendition_name
+
+
+class ClearDemoUserDataCommandTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.demo_user = baker.make(RecipyUser, username='recipy')
+        self.other_user = baker.make(RecipyUser, username='other')
+
+    def make_recipe(self, user, image_name=None):
+        recipe = baker.make(Recipe, user=user, image=None)
+        baker.make(Step, recipe=recipe, _quantity=3)
+        baker.make(Ingredient, recipe=recipe, _quantity=2)
+        RecipeSearchDocument.objects.create(recipe=recipe, title=recipe.title)
+
+        if image_name:
+            image_name = default_storage.save(
+                f'uploads/{image_name}', ContentFile(b'image')
+            )
+            rendition_name = default_storage.save(
+                get_rendition_name(image_name, 320, 'webp'),
+                ContentFile(b'rendition'),
+            )
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image=image_name,
+                image_renditions={'webp': {'320': rendition_name}},
+            )
+
+        return recipe
+
+    def call_command(self, *args):
+        stdout = StringIO()
+        call_command('clear_demo_user_data', *args, stdout=stdout,
+                     stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_deletes_recipes_in_chunks(self):
+        for _ in range(5):
+            self.make_recipe(self.demo_user)
+        other_recipe = self.make_recipe(self.other_user)
+
+        output = self.call_command('--chunk-size', '2')
+
+        self.assertIn('Deleted 5/5 recipes', output)
+        self.assertEqual([other_recipe], list(Recipe.objects.all()))
+        self.assertEqual(3, Step.objects.count())
+        self.assertEqual(2, Ingredient.objects.count())
+        self.assertEqual(1, RecipeSearchDocument.objects.count())
+
+    def test_multiple_users(self):
+        self.make_recipe(self.demo_user)
+        self.make_recipe(self.other_user)
+
+        self.call_command('recipy', 'other', 'missing')
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_dry_run(self):
+        self.make_recipe(self.demo_user, image_name='photo.jpg')
+
+        output = self.call_command('--dry-run')
+
+        self.assertIn('3 recipy.Step would be deleted', output)
+        self.assertEqual(1, Recipe.objects.count())
+        self.assertTrue(default_storage.exists('uploads/photo.jpg'))
+
+    def test_deletes_images(self):
+        self.make_recipe(self.demo_user, image_name='demo.jpg')
+        kept_recipe = self.make_recipe(self.other_user, image_name='kept.jpg')
+        default_storage.save('uploads/orphan.jpg', ContentFile(b'image'))
+        default_storage.save('renditions/uploads/gone.jpg-320w.webp',
+                             ContentFile(b'rendition'))
+
+        self.call_command('--image-min-age', '0')
+
+        self.assertEqual(
+            ['kept.jpg'], default_storage.listdir('uploads')[1]
+        )
+        self.assertEqual(
+            ['kept.jpg-320w.webp'],
+            default_storage.listdir('renditions/uploads')[1],
+        )
+        kept_recipe.refresh_from_db()
+        self.assertEqual('uploads/kept.jpg', kept_recipe.image.name)
+
+    def test_keeps_images_shared_with_other_users(self):
+        images_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, images_dir)
+        Path(images_dir, 'photo.jpg').write_bytes(make_image_file().read())
+        call_command('seed_recipes', '--recipes', '10', '--users', '1',
+                     '--images', images_dir, '--workers', '1',
+                     stdout=StringIO())
+        demo_recipe = Recipe.objects.filter(user=self.demo_user).first()
+        seed_recipes = Recipe.objects.exclude(user=self.demo_user)
+        self.assertIsNotNone(demo_recipe)
+        self.assertTrue(seed_recipes.exists())
+
+        # A single recipe, deleted and with a replaced image
+        demo_recipe.image = make_image_file(name='other.jpg')
+        demo_recipe.save()
+        Recipe.objects.filter(user=self.demo_user).first().delete()
+        self.call_command('--image-min-age', '0')
+
+        self.assertFalse(Recipe.objects.filter(user=self.demo_user).exists())
+        for recipe in seed_recipes:
+            self.assertTrue(default_storage.exists(recipe.image.name))
+            for renditions in recipe.image_renditions.values():
+                for name in renditions.values():
+                    self.assertTrue(default_storage.exists(name))
+
+    def test_recent_orphaned_images_are_kept(self):
+        default_storage.save('uploads/new.jpg', ContentFile(b'image'))
+
+        self.call_command()
+
+        self.assertTrue(default_storage.exists('uploads/new.jpg'))
+
+
+class UserCacheTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(RecipyUser)
+        self.user.set_password('password')
+        self.user.save()
+        self.client.force_login(self.user)
+        self.url = reverse('recipy:recipes-list')
+
+    def get_cached_user(self):
+        return UserCache().get(self.user.pk,
+                               self.client.session[HASH_SESSION_KEY])
+
+    def test_user_is_cached(self):
+        self.client.get(self.url)
+        self.assertEqual(self.user, self.get_cached_user())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(self.user, response.context['user'])
+        for table in (RecipyUser._meta.db_table, 'django_session'):
+            self.assertFalse([
+                query for query in queries
+                if f'FROM "{table}"' in query['sql']
+            ])
+
+    def test_password_change(self):
+        self.client.get(self.url)
+
+        user = RecipyUser.objects.get(pk=self.user.pk)
+        user.set_password('new password')
+        user.save()
+
+        # The session of the old password isn't valid anymore
+        self.assertIsNone(self.get_cached_user())
+        response = self.client.get(self.url)
+        self.assertRedirects(
+            response, f'{reverse("accounts:login")}?next={self.url}'
+        )
+
+    def test_bulk_update(self):
+        self.client.get(self.url)
+
+        RecipyUser.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertIsNone(self.get_cached_user())
+        response = self.client.get(self.url)
+        self.assertRedirects(
+            response, f'{reverse("accounts:login")}?next={self.url}'
+        )
+
+    def test_logout(self):
+        self.client.get(self.url)
+        session_hash = self.client.session[HASH_SESSION_KEY]
+
+        self.client.post(reverse('accounts:logout'))
+
+        self.assertIsNone(UserCache().get(self.user.pk, session_hash))
+
+    def test_clear_demo_user_data(self):
+        self.client.get(self.url)
+
+        call_command('clear_demo_user_data', self.user.username,
+                     stdout=StringIO(), stderr=StringIO())
+
+        self.assertIsNone(self.get_cached_user())
@@ -1,8 +1,12 @@
 from django.contrib import admin
 
-from recipy.models import Recipe, Ingredient, Step
+from recipy.models import (
+    Recipe, Ingredient, IngredientTerm, Step, Job, RecipeImport,
+    RecipeImportError, RecipeChange, RecipeUsage
+)
 
 
-@admin.register(Recipe, Ingredient, Step)
+@admin.register(Recipe, Ingredient, IngredientTerm, Step, Job, RecipeImport,
+                RecipeImportError, RecipeChange, RecipeUsage)
 class DefaultAdmin(admin.ModelAdmin):
     pass
@@ -0,0 +1,236 @@
+"""Read-only JSON API of the recipes.
+
+The recipes are serialized the same way as by the export (see
+recipy.export.serialize_recipe) with their steps and ingredients.
+
+Every response has an ETag derived from the updated timestamps of the
+returned recipes. The timestamps are loaded first with a cheap query, so a
+request with a matching If-None-Match header is answered with 304 Not
+Modified before the recipes with their steps and ingredients are loaded and
+serialized.
+
+Endpoints:
+    - api/recipes: the user's recipes and the public recipes, newest first.
+        Keyset paginated, the next page is requested with the `cursor` GET
+        parameter. `scope` (mine or public) limits the recipes to one of the
+        sections of the recipe list.
+    - api/recipes/<pk>: a single recipe, with the same access rules as the
+        recipe detail page
+    - api/recipes/changes: the recipes changed after the sequence number in
+        the `since` GET parameter (see recipy.changes). Clients keep their
+        copy of the recipes up to date by requesting the changes since the
+        `next_since` of the previous response, as long as `has_more` is true.
+        The deleted recipes and the ones the user can't see anymore are
+        returned without the recipe.
+
+Under ASGI, the async versions of the views are served (see
+RECIPY_ASGI_URLCONF), which authenticate the user and look the recipes up
+with the async ORM interface.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Prefetch
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.utils.cache import patch_cache_control
+from django.views import View
+from django.views.generic.detail import SingleObjectMixin
+
+from recipy.changes import get_recipe_changes
+from recipy.export import serialize_recipe
+from recipy.models import Recipe, Step, Ingredient, RecipeChange
+from recipy.utils.http import (
+    get_not_modified_response, make_etag, set_validators
+)
+from recipy.utils.pagination import InvalidCursor, KeysetPaginator
+from recipy.utils.views import (
+    AsyncLoginRequiredMixin, AsyncRecipeAccessControlMixin,
+    RecipeAccessControlMixin
+)
+
+
+def serialize_api_recipe(recipe):
+    return {
+        **serialize_recipe(recipe),
+        'image': recipe.image.url if recipe.image else None,
+        'updated': recipe.updated.isoformat(),
+    }
+
+
+def load_recipes(recipe_pks, queryset=None):
+    """Returns the recipes with their authors, ingredients and steps in the
+    order of the PKs. The PKs missing from the queryset are skipped."""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+
+    recipes = queryset.select_related('user').prefetch_related(
+        Prefetch('ingredients', Ingredient.objects.order_by('pk')),
+        Prefetch('steps', Step.objects.order_by('pk')),
+    ).in_bulk(recipe_pks)
+    return [recipes[pk] for pk in recipe_pks if pk in recipes]
+
+
+def get_version(recipe):
+    return f'{recipe.pk}:{recipe.updated.timestamp()}'
+
+
+def cacheable_json_response(request, data_func, etag, last_modified=None):
+    """Returns 304 Not Modified if the client has the current version,
+    otherwise a JSON response of what data_func returns. Clients have to
+    revalidate the response every time it is used."""
+    response = get_not_modified_response(request, etag, last_modified)
+    if response is None:
+        response = JsonResponse(data_func())
+
+    set_validators(response, etag, last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class RecipeApiListView(LoginRequiredMixin, View):
+    raise_exception = True
+    scopes = ('all', 'mine', 'public')
+
+    def get_queryset(self, scope):
+        user = self.request.user
+        if scope == 'mine':
+            return Recipe.objects.filter(user=user)
+        elif scope == 'public':
+            return Recipe.objects.filter(is_public=True)
+
+        return Recipe.objects.visible_to(user)
+
+    def get_paginator(self):
+        """Returns the paginator of the requested scope, None if the scope is
+        unknown."""
+        scope = self.request.GET.get('scope', 'all')
+        if scope not in self.scopes:
+            return None
+
+        # Only what the ETag and the cursor need is loaded before the
+        # conditional check
+        return KeysetPaginator(
+            self.get_queryset(scope).only('pk', 'created', 'updated'),
+            per_page=settings.RECIPY_RECIPES_PER_PAGE,
+        )
+
+    def get(self, request, *args, **kwargs):
+        paginator = self.get_paginator()
+        if paginator is None:
+            return HttpResponseBadRequest()
+        try:
+            page = paginator.get_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            return HttpResponseBadRequest()
+
+        return self.get_page_response(page)
+
+    def get_page_response(self, page):
+        etag = make_etag(
+            *[get_version(recipe) for recipe in page],
+            page.next_cursor or '',
+        )
+        return cacheable_json_response(self.request, lambda: {
+            'results': [
+                serialize_api_recipe(recipe)
+                for recipe in load_recipes([recipe.pk for recipe in page])
+            ],
+            'next_cursor': page.next_cursor,
+        }, etag)
+
+
+class RecipeApiDetailView(RecipeAccessControlMixin, SingleObjectMixin, View):
+    model = Recipe
+    pk_url_kwarg = 'pk_recipe'
+    action = RecipeAccessControlMixin.Action.READ
+    raise_exception = True
+
+    def get_queryset(self):
+        # The access checks run in SQL, only the version is needed
+        return super().get_queryset().only('pk', 'updated')
+
+    def get(self, request, *args, **kwargs):
+        recipe = self.object
+        return cacheable_json_response(
+            request,
+            lambda: serialize_api_recipe(load_recipes([recipe.pk])[0]),
+            etag=make_etag(get_version(recipe)),
+            last_modified=recipe.updated,
+        )
+
+
+class RecipeApiChangesView(LoginRequiredMixin, View):
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since = int(request.GET.get('since', 0))
+        except ValueError:
+            return HttpResponseBadRequest()
+        if since < 0:
+            return HttpResponseBadRequest()
+
+        changes, next_since, has_more = get_recipe_changes(
+            request.user, since, limit=settings.RECIPY_CHANGES_PAGE_SIZE
+        )
+        # The recipe could have been deleted or hidden since the change
+        recipes = {recipe.pk: recipe for recipe in load_recipes(
+            [change.recipe_pk for change in changes
+             if change.action != RecipeChange.Action.DELETED],
+            queryset=Recipe.objects.visible_to(request.user),
+        )}
+
+        results = []
+        for change in changes:
+            recipe = recipes.get(change.recipe_pk)
+            results.append({
+                'sequence': change.pk,
+                'id': change.recipe_pk,
+                'action': change.action.lower() if recipe else 'deleted',
+                'recipe': serialize_api_recipe(recipe) if recipe else None,
+            })
+
+        response = JsonResponse({
+            'changes': results,
+            'next_since': next_since,
+            'has_more': has_more,
+        })
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class AsyncRecipeApiListView(AsyncLoginRequiredMixin, RecipeApiListView):
+    """RecipeApiListView which loads the page with the async ORM interface.
+
+    Django 4.1 has no async version of prefetch_related, so the recipes are
+    loaded and serialized in a thread.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        paginator = self.get_paginator()
+        if paginator is None:
+            return HttpResponseBadRequest()
+        try:
+            page = await paginator.aget_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            return HttpResponseBadRequest()
+
+        return await sync_to_async(self.get_page_response)(page)
+
+
+class AsyncRecipeApiDetailView(AsyncRecipeAccessControlMixin,
+                               RecipeApiDetailView):
+    """RecipeApiDetailView which looks the recipe up with the async ORM
+    interface. The recipe is loaded and serialized in a thread."""
+
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(super().get)(request, *args, **kwargs)
+
+
+class AsyncRecipeApiChangesView(AsyncLoginRequiredMixin,
+                                RecipeApiChangesView):
+    """RecipeApiChangesView which authenticates the user without blocking the
+    event loop. The changes are read in a thread."""
+
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(super().get)(request, *args, **kwargs)
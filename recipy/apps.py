@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RecipyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipy'
+
+    def ready(self):
+        # Connect the signal handlers and register the background tasks
+        from recipy import signals, tasks  # noqa: F401
@@ -0,0 +1,7 @@
+"""Benchmark suite of the recipe views.
+
+Seeds a reproducible synthetic dataset into a throwaway test database, drives
+the recipe views through the Django test client and a local WSGI server and
+compares the throughput, latency percentiles and query counts against a
+stored baseline. Run it with the benchmark_views management command.
+"""
@@ -0,0 +1,221 @@
+"""Throughput of the recipe read views under WSGI and ASGI while slow clients
+hold connections open.
+
+Every slow client sends the headers of a request a line at a time and never
+finishes it, like a client on a bad mobile connection. A WSGI server with a
+fixed number of threads spends a thread on every such connection, so the
+other clients wait for a free one. An ASGI server reads the requests on its
+event loop, so the slow clients only cost it a connection. Run it with the
+benchmark_concurrency management command.
+"""
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.error import URLError
+from urllib.request import build_opener, Request
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.servers.basehttp import WSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.test.testcases import QuietWSGIRequestHandler
+from django.urls import reverse
+
+from recipy.benchmarks.runner import SCENARIOS, NoRedirectHandler, Scenario
+from recipy.utils.metrics import percentile
+
+
+READ_SCENARIOS = (
+    *[
+        scenario for scenario in SCENARIOS
+        if scenario.name in ('list', 'detail')
+    ],
+    Scenario(
+        'api', 'recipy:api-recipes-list',
+        lambda context, rng: ('get', reverse('recipy:api-recipes-list'), None),
+    ),
+)
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI server which handles the connections in a fixed number of
+    threads, like the threaded workers of the production WSGI servers."""
+
+    def __init__(self, *args, threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request,
+                             client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WSGIServerRunner:
+    """Runs the WSGI application in a PooledWSGIServer in a thread of this
+    process."""
+    name = 'wsgi'
+
+    def __init__(self, threads):
+        self.server = PooledWSGIServer(
+            ('localhost', 0), QuietWSGIRequestHandler, threads=threads,
+        )
+        self.server.set_app(get_wsgi_application())
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.port = self.server.server_address[1]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class ASGIServerRunner:
+    """Runs the ASGI application in uvicorn in a thread of this process."""
+    name = 'asgi'
+
+    def __init__(self, threads):
+        # The number of threads isn't fixed, the sync code of a request runs
+        # in a thread of its own
+        # Only needed to run the benchmark, see requirements/local.txt
+        import uvicorn
+
+        self.socket = socket.socket()
+        self.socket.bind(('localhost', 0))
+        self.port = self.socket.getsockname()[1]
+
+        self.server = uvicorn.Server(uvicorn.Config(
+            get_asgi_application(), lifespan='off', access_log=False,
+            log_level='warning',
+        ))
+        self.thread = threading.Thread(
+            target=self.server.run, kwargs={'sockets': [self.socket]},
+            daemon=True,
+        )
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError('The ASGI server failed to start.')
+            time.sleep(0.01)
+
+    def close(self):
+        self.server.should_exit = True
+        self.thread.join()
+        self.socket.close()
+
+
+class SlowClients:
+    """Connections which send the headers of a request a line at a time and
+    never finish it."""
+
+    def __init__(self, port, count, interval=0.5):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.sockets = []
+        for _ in range(count):
+            sock = socket.create_connection(('localhost', port))
+            sock.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\n')
+            self.sockets.append(sock)
+
+        self.thread = threading.Thread(target=self.trickle, daemon=True)
+        self.thread.start()
+
+    def trickle(self):
+        while not self.stopped.wait(self.interval):
+            for sock in self.sockets:
+                try:
+                    sock.sendall(b'X-Slow-Client: 1\r\n')
+                except OSError:
+                    # Closed by the server
+                    pass
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        for sock in self.sockets:
+            sock.close()
+
+
+@dataclass
+class ConcurrencyResult:
+    requests: int
+    # Failed and timed out requests
+    errors: int
+    requests_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def make_session_cookie(user):
+    """Returns the Cookie header of a session of the user."""
+    client = Client()
+    client.force_login(user)
+    session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return f'{settings.SESSION_COOKIE_NAME}={session_key}'
+
+
+def run_load(port, cookie, scenario, context, clients, duration, timeout=5,
+             seed=0):
+    """Sends the requests of the scenario from the clients, each one request
+    at a time, for the duration in seconds."""
+    opener = build_opener(NoRedirectHandler)
+    durations = []
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    def send_requests(client_seed):
+        rng = random.Random(client_seed)
+        while time.perf_counter() < deadline:
+            _, path, _ = scenario.build_request(context, rng)
+            request = Request(f'http://localhost:{port}{path}',
+                              headers={'Cookie': cookie})
+            request_start = time.perf_counter()
+            try:
+                with opener.open(request, timeout=timeout) as response:
+                    response.read()
+                    status_code = response.status
+            except (URLError, OSError):
+                status_code = None
+
+            if status_code == scenario.expected_status_code:
+                durations.append((time.perf_counter() - request_start) * 1000)
+            else:
+                errors.append(status_code)
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=send_requests, args=(seed + i,))
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    durations.sort()
+    latencies = [
+        percentile(durations, percent) if durations else 0
+        for percent in (50, 95, 99)
+    ]
+    return ConcurrencyResult(
+        len(durations), len(errors), len(durations) / elapsed, *latencies,
+    )
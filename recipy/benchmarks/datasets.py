@@ -0,0 +1,133 @@
+import random
+from dataclasses import dataclass, field
+from itertools import cycle
+
+from django.contrib.auth import get_user_model
+from faker import Faker
+from model_bakery import baker
+
+from recipy.changes import record_recipe_changes
+from recipy.models import Recipe, Step, Ingredient, RecipeChange
+from recipy.pantry import update_ingredient_terms
+from recipy.quotas import adjust_usage_of_recipes
+from recipy.search import update_search_documents
+
+
+INGREDIENT_NAMES = (
+    'Butter', 'Eggs', 'Flour', 'Sugar', 'Milk', 'Salt', 'Black pepper',
+    'Olive oil', 'Garlic', 'Onion', 'Tomatoes', 'Potatoes', 'Carrots',
+    'Chicken breast', 'Ground beef', 'Rice', 'Pasta', 'Parmesan', 'Basil',
+    'Lemon', 'Cream', 'Mushrooms', 'Paprika', 'Honey', 'Yogurt', 'Spinach',
+)
+
+
+@dataclass
+class DatasetConfig:
+    users: int = 20
+    recipes: int = 2000
+    # Number of steps and the number of ingredients of every recipe
+    children: int = 10
+    # Share of the recipes which are public
+    public_ratio: float = 0.3
+    seed: int = 0
+
+
+@dataclass
+class Dataset:
+    config: DatasetConfig
+    users: list = field(default_factory=list)
+    recipe_pks: list = field(default_factory=list)
+
+
+def prepare_recipes(users, count, faker, rng, public_ratio=0.3, images=()):
+    """Returns unsaved recipes with realistic text owned by the users.
+
+    Args:
+        images: (image name, renditions) tuples of already processed images
+            which are randomly assigned to the recipes
+    """
+    recipes = baker.prepare(
+        Recipe, _quantity=count,
+        title=lambda: faker.sentence(nb_words=4).rstrip('.'),
+        description=lambda: faker.paragraph(nb_sentences=3),
+        duration_minutes=lambda: rng.choice((None, rng.randint(5, 240))),
+        is_public=lambda: rng.random() < public_ratio,
+        user=lambda: rng.choice(users),
+        image=None,
+    )
+
+    if images:
+        for recipe in recipes:
+            recipe.image, recipe.image_renditions = rng.choice(images)
+
+    return recipes
+
+
+def prepare_children(recipes, count, faker, rng):
+    """Returns unsaved steps and ingredients, count of each per recipe."""
+    recipe_per_child = [recipe for recipe in recipes for _ in range(count)]
+    steps = baker.prepare(
+        Step, _quantity=len(recipe_per_child),
+        recipe=iter(recipe_per_child),
+        name=lambda: faker.sentence(nb_words=3).rstrip('.'),
+        description=lambda: faker.paragraph(nb_sentences=2),
+        duration_minutes=lambda: rng.randint(1, 30),
+    )
+    ingredients = baker.prepare(
+        Ingredient, _quantity=len(recipe_per_child),
+        recipe=iter(recipe_per_child),
+        name=lambda: rng.choice(INGREDIENT_NAMES),
+        quantity=lambda: round(rng.uniform(0.1, 5), 1),
+        measure=cycle(Ingredient.Measure.values),
+    )
+    return steps, ingredients
+
+
+def seed_recipes(users, count, children, faker, rng, public_ratio=0.3,
+                 images=(), batch_size=1000):
+    """Creates the recipes with their steps and ingredients in bulk.
+
+    Bulk creation doesn't send the model signals, so the denormalized data
+    (durations, search documents and ingredient index) is built and the
+    changes are recorded afterwards.
+
+    Returns:
+        list of the PKs of the created recipes
+    """
+    recipe_pks = []
+    for start in range(0, count, batch_size):
+        recipes = Recipe.objects.bulk_create(prepare_recipes(
+            users, min(batch_size, count - start), faker, rng,
+            public_ratio=public_ratio, images=images,
+        ))
+        steps, ingredients = prepare_children(recipes, children, faker, rng)
+        Step.objects.bulk_create(steps, batch_size=batch_size)
+        Ingredient.objects.bulk_create(ingredients, batch_size=batch_size)
+
+        batch_pks = [recipe.pk for recipe in recipes]
+        Recipe.objects.filter(pk__in=batch_pks).update_computed_durations()
+        update_search_documents(batch_pks)
+        update_ingredient_terms(batch_pks)
+        record_recipe_changes(batch_pks, RecipeChange.Action.CREATED)
+        adjust_usage_of_recipes(batch_pks)
+        recipe_pks += batch_pks
+
+    return recipe_pks
+
+
+def seed_dataset(config: DatasetConfig, batch_size=1000) -> Dataset:
+    """Creates the users and recipes. The same config always produces the
+    same data."""
+    faker = Faker()
+    faker.seed_instance(config.seed)
+    rng = random.Random(config.seed)
+
+    users = get_user_model().objects.bulk_create(baker.prepare(
+        get_user_model(), _quantity=config.users,
+        username=iter(f'benchmark-{i}' for i in range(config.users)),
+    ))
+    recipe_pks = seed_recipes(
+        users, config.recipes, config.children, faker, rng,
+        public_ratio=config.public_ratio, batch_size=batch_size,
+    )
+    return Dataset(config, users=users, recipe_pks=recipe_pks)
@@ -0,0 +1,291 @@
+import json
+import random
+import re
+import time
+from dataclasses import dataclass, asdict
+from http.cookies import SimpleCookie
+from typing import Callable
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import build_opener, HTTPRedirectHandler, Request
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.testcases import LiveServerThread
+from django.urls import reverse
+
+from recipy.models import Recipe
+from recipy.utils.metrics import percentile, view_metrics
+
+
+class ClientDriver:
+    """Sends the requests through the Django test client, i.e. without the
+    HTTP layer."""
+    name = 'client'
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def request(self, method, path, data=None):
+        response = getattr(self.client, method)(path, data=data)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class NoRedirectHandler(HTTPRedirectHandler):
+    """Makes urllib return the redirects instead of following them."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class WSGIServerDriver:
+    """Sends the requests over HTTP to a WSGI server running in a thread of
+    this process."""
+    name = 'wsgi'
+
+    def __init__(self, user):
+        # In-memory SQLite databases have to be shared with the server thread
+        self.connections_override = {
+            connection.alias: connection
+            for connection in connections.all()
+            if connection.vendor == 'sqlite' and connection.is_in_memory_db()
+        }
+        for connection in self.connections_override.values():
+            connection.inc_thread_sharing()
+
+        self.server = LiveServerThread(
+            'localhost', lambda handler: handler,
+            connections_override=self.connections_override,
+        )
+        self.server.daemon = True
+        self.server.start()
+        self.server.is_ready.wait()
+        if self.server.error:
+            raise self.server.error
+        self.base_url = f'http://localhost:{self.server.port}'
+        self.opener = build_opener(NoRedirectHandler)
+
+        # Log in by reusing the session of a test client
+        client = Client()
+        client.force_login(user)
+        self.cookies = SimpleCookie()
+        self.cookies[settings.SESSION_COOKIE_NAME] = \
+            client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        # The CSRF cookie and token are reused by all the POST requests
+        _, content = self._send('get', reverse('recipy:recipe-create'))
+        self.csrf_token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"', content
+        ).group(1)
+
+    def request(self, method, path, data=None):
+        if method == 'post':
+            data = {**data, 'csrfmiddlewaretoken': self.csrf_token}
+        return self._send(method, path, data)[0]
+
+    def _send(self, method, path, data=None):
+        body = urlencode(data or {}).encode() if method == 'post' else None
+        request = Request(
+            self.base_url + path, data=body, method=method.upper(),
+            headers={'Cookie': '; '.join(
+                f'{name}={morsel.value}'
+                for name, morsel in self.cookies.items()
+            )},
+        )
+        try:
+            with self.opener.open(request) as response:
+                status_code, content = response.status, response.read()
+                headers = response.headers
+        except HTTPError as e:
+            status_code, content, headers = e.code, b'', e.headers
+
+        for cookie in headers.get_all('Set-Cookie') or ():
+            self.cookies.load(cookie)
+
+        return status_code, content.decode()
+
+    def close(self):
+        self.server.terminate()
+        for connection in self.connections_override.values():
+            connection.dec_thread_sharing()
+
+
+@dataclass
+class Scenario:
+    name: str
+    # URL name of the view, used to look up the query counts in view_metrics
+    view_name: str
+    # Called with the dataset context and the random generator and returns
+    # (method, path, data)
+    build_request: Callable
+    expected_status_code: int = 200
+
+
+def prepare_recipe_form_data(recipe=None, children=10):
+    """Form data of RecipeForm. Changes the first step of existing recipes."""
+    data = {'title': 'Benchmark recipe', 'description': 'Benchmark.'}
+    steps = [
+        {'name': f'Step {i}', 'description': '', 'duration_minutes': 5}
+        for i in range(children)
+    ]
+    ingredients = [{'name': f'Ingredient {i}'} for i in range(children)]
+
+    if recipe is not None:
+        data.update({'title': recipe.title, 'description': recipe.description})
+        steps = list(recipe.steps.order_by('pk').values(
+            'id', 'name', 'description', 'duration_minutes'
+        ))
+        if steps:
+            steps[0]['duration_minutes'] = (
+                steps[0]['duration_minutes'] or 0
+            ) + 1
+        ingredients = list(recipe.ingredients.order_by('pk').values(
+            'id', 'name', 'quantity', 'measure'
+        ))
+
+    for prefix, objects in (('steps', steps), ('ingredients', ingredients)):
+        data[f'{prefix}-TOTAL_FORMS'] = len(objects)
+        data[f'{prefix}-INITIAL_FORMS'] = \
+            sum(1 for obj in objects if obj.get('id'))
+        for index, obj in enumerate(objects):
+            for field_name, value in obj.items():
+                data[f'{prefix}-{index}-{field_name}'] = \
+                    '' if value is None else value
+
+    return data
+
+
+def prepare_update_request(recipe_pk):
+    recipe = Recipe.objects.get(pk=recipe_pk)
+    return (
+        'post', reverse('recipy:recipe-update', args=[recipe_pk]),
+        prepare_recipe_form_data(recipe),
+    )
+
+
+SCENARIOS = (
+    Scenario(
+        'list', 'recipy:recipes-list',
+        lambda context, rng: ('get', reverse('recipy:recipes-list'), None),
+    ),
+    Scenario(
+        'detail', 'recipy:recipe-detail',
+        lambda context, rng: ('get', reverse(
+            'recipy:recipe-detail', args=[rng.choice(context['recipe_pks'])]
+        ), None),
+    ),
+    Scenario(
+        'create', 'recipy:recipe-create',
+        lambda context, rng: (
+            'post', reverse('recipy:recipe-create'),
+            prepare_recipe_form_data(children=context['children']),
+        ),
+        expected_status_code=302,
+    ),
+    Scenario(
+        'update', 'recipy:recipe-update',
+        lambda context, rng: prepare_update_request(
+            rng.choice(context['own_recipe_pks'])
+        ),
+        expected_status_code=302,
+    ),
+)
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    requests_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    # Highest number of queries of a request
+    queries: int
+
+
+def run_scenario(driver, scenario, context, requests, seed=0):
+    rng = random.Random(seed)
+    prepared_requests = [
+        scenario.build_request(context, rng) for _ in range(requests)
+    ]
+
+    view_metrics.reset()
+    durations = []
+    start = time.perf_counter()
+    for method, path, data in prepared_requests:
+        request_start = time.perf_counter()
+        status_code = driver.request(method, path, data)
+        durations.append((time.perf_counter() - request_start) * 1000)
+
+        if status_code != scenario.expected_status_code:
+            msg = f'{scenario.name}: {method.upper()} {path} returned '
+            msg += f'{status_code}, expected {scenario.expected_status_code}.'
+            raise AssertionError(msg)
+    elapsed = time.perf_counter() - start
+
+    durations.sort()
+    query_counts = view_metrics.get_summary()[scenario.view_name]['queries']
+    return ScenarioResult(
+        requests=requests,
+        requests_per_second=requests / elapsed,
+        p50_ms=percentile(durations, 50),
+        p95_ms=percentile(durations, 95),
+        p99_ms=percentile(durations, 99),
+        queries=query_counts['p99'],
+    )
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Finds the regressions - more queries than in the baseline or p95
+    latency higher by more than the tolerance (e.g. 0.25 for 25 %).
+
+    Args:
+        results: dictionary of result names and ScenarioResults
+        baseline: dictionary of result names and ScenarioResult dictionaries
+
+    Returns:
+        list of regression descriptions
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline_result = baseline.get(name)
+        if baseline_result is None:
+            continue
+
+        if result.queries > baseline_result['queries']:
+            msg = f'{name}: {result.queries} queries, baseline has '
+            msg += f'{baseline_result["queries"]}.'
+            regressions.append(msg)
+
+        max_p95_ms = baseline_result['p95_ms'] * (1 + tolerance)
+        if result.p95_ms > max_p95_ms:
+            msg = f'{name}: p95 latency is {result.p95_ms:.1f} ms, baseline '
+            msg += f'has {baseline_result["p95_ms"]:.1f} ms.'
+            regressions.append(msg)
+
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, dataset_config, results):
+    with open(path, 'w') as baseline_file:
+        json.dump({
+            'dataset': asdict(dataset_config),
+            'results': {
+                name: {
+                    key: round(value, 2)
+                    for key, value in asdict(result).items()
+                }
+                for name, result in results.items()
+            },
+        }, baseline_file, indent=4, sort_keys=True)
+        baseline_file.write('\n')
@@ -0,0 +1,105 @@
+"""Change feed of the recipes for the clients which keep a copy of them, e.g.
+to use them offline.
+
+Every time a recipe or one of its steps or ingredients is created, updated or
+deleted, a RecipeChange is recorded. Its ID is the sequence number of the
+change, so a client which remembers the last sequence number it has seen only
+asks for the changes that came after it instead of downloading all the
+recipes again.
+
+The model signals record the changes (see recipy.signals). The code which
+bypasses them, e.g. bulk_create or the imports, calls record_recipe_changes
+itself.
+
+A user sees the changes of their own recipes and of the public ones. When a
+recipe stops being public, the other users see it as deleted.
+
+The changes are recorded in the transaction of the change. On databases which
+run transactions concurrently (PostgreSQL), a transaction can commit after a
+later one, so its changes may appear behind a sequence number a client has
+already synced past. The window is as long as the transaction, the bulk
+import keeps it short by committing a batch at a time.
+
+Usage:
+    >>> from recipy.changes import get_recipe_changes
+    >>>
+    >>> changes, next_since, has_more = get_recipe_changes(user, since=42)
+"""
+from django.db.models import Q
+
+from recipy.models import Recipe, RecipeChange
+
+
+def record_recipe_changes(recipe_pks, action=RecipeChange.Action.UPDATED):
+    """Records a change of every recipe. Should be called before the recipes
+    are deleted."""
+    recipes = Recipe._base_manager.filter(pk__in=recipe_pks)\
+        .order_by('pk').values_list('pk', 'user_id', 'is_public')
+    return RecipeChange.objects.bulk_create([
+        RecipeChange(recipe_pk=pk, user_pk=user_pk, action=action,
+                     is_public=is_public, was_public=is_public)
+        for pk, user_pk, is_public in recipes
+    ])
+
+
+def record_recipe_change(recipe, action=RecipeChange.Action.UPDATED,
+                         was_public=None):
+    """Records a change of the recipe instance without loading it again.
+
+    Args:
+        recipe: the changed recipe
+        action: RecipeChange.Action
+        was_public: visibility of the recipe before the change, by default the
+            current one
+    """
+    if was_public is None:
+        was_public = recipe.is_public
+
+    return RecipeChange.objects.create(
+        recipe_pk=recipe.pk, user_pk=recipe.user_id, action=action,
+        is_public=recipe.is_public, was_public=was_public,
+    )
+
+
+def get_recipe_changes(user, since=0, limit=500):
+    """Returns the changes visible to the user which follow the sequence
+    number since, at most one per recipe.
+
+    Only the latest change of a recipe matters to the client, so the changes
+    within the page are collapsed. Changes of the recipes the user can't see
+    (anymore) are returned as deletions. The recipes created or made visible
+    to the user within the page are returned as creations.
+
+    Returns:
+        (changes, next_since, has_more) tuple. The changes are ordered by
+        their sequence number. next_since is the sequence number to continue
+        from and has_more tells if there are more changes after it.
+    """
+    changes = list(
+        RecipeChange.objects.filter(pk__gt=since).filter(
+            Q(user_pk=user.pk) | Q(is_public=True) | Q(was_public=True)
+        ).order_by('pk')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    next_since = changes[-1].pk if changes else since
+
+    first_changes = {}
+    for change in changes:
+        first_changes.setdefault(change.recipe_pk, change)
+    latest_changes = {change.recipe_pk: change for change in changes}
+    for change in latest_changes.values():
+        first_change = first_changes[change.recipe_pk]
+        is_own = change.user_pk == user.pk
+        if not is_own and not change.is_public:
+            change.action = RecipeChange.Action.DELETED
+        elif change.action != RecipeChange.Action.DELETED and (
+            first_change.action == RecipeChange.Action.CREATED
+            or not is_own and not first_change.was_public
+        ):
+            change.action = RecipeChange.Action.CREATED
+
+    return (
+        sorted(latest_changes.values(), key=lambda change: change.pk),
+        next_since, has_more,
+    )
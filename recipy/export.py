@@ -0,0 +1,225 @@
+"""Streaming export of the recipes with their ingredients and steps.
+
+The recipes are read in chunks with QuerySet.iterator (a server-side cursor
+on PostgreSQL) and serialized one at a time, so the memory use doesn't depend
+on the number of exported recipes. An export is a generator of bytes which is
+passed to StreamingHttpResponse or written to a file.
+
+Formats:
+    - jsonl: a JSON object per recipe and line
+    - csv: a row per recipe, the ingredients and steps are JSON encoded
+Either can be bundled into a zip archive together with the recipe images.
+
+Usage:
+    >>> from recipy.export import export_recipes
+    >>>
+    >>> recipes = Recipe.objects.filter(user=request.user)
+    >>> response = StreamingHttpResponse(export_recipes(recipes, 'jsonl'))
+"""
+import csv
+import io
+import json
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from recipy.models import Ingredient, Step
+
+
+EXPORT_FORMATS = {
+    'jsonl': 'application/jsonl',
+    'csv': 'text/csv',
+}
+ZIP_CONTENT_TYPE = 'application/zip'
+
+INGREDIENT_FIELDS = ('name', 'quantity', 'measure')
+STEP_FIELDS = ('name', 'description', 'duration_minutes')
+CSV_COLUMNS = (
+    'id', 'title', 'description', 'duration_minutes', 'is_public', 'created',
+    'author', 'image', 'ingredients', 'steps',
+)
+
+# Size of the chunks of bytes passed to the response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def serialize_recipe(recipe):
+    """Expects the author, ingredients and steps to be loaded.
+
+    Returns:
+        dictionary of JSON serializable values
+    """
+    return {
+        'id': recipe.pk,
+        'title': recipe.title,
+        'description': recipe.description,
+        'duration_minutes': recipe.duration_minutes,
+        'is_public': recipe.is_public,
+        'created': recipe.created.isoformat(),
+        'author': recipe.user.username,
+        'image': recipe.image.name or None,
+        'ingredients': [
+            {field: getattr(ingredient, field) for field in INGREDIENT_FIELDS}
+            for ingredient in recipe.ingredients.all()
+        ],
+        'steps': [
+            {field: getattr(step, field) for field in STEP_FIELDS}
+            for step in recipe.steps.all()
+        ],
+    }
+
+
+def iter_serialized_recipes(recipes, chunk_size=None):
+    """Yields the serialized recipes in the order of their PKs. Every chunk of
+    recipes is loaded with its ingredients and steps in 3 queries."""
+    if chunk_size is None:
+        chunk_size = settings.RECIPY_EXPORT_CHUNK_SIZE
+
+    recipes = recipes.select_related('user').prefetch_related(
+        Prefetch('ingredients', Ingredient.objects.order_by('pk')),
+        Prefetch('steps', Step.objects.order_by('pk')),
+    ).order_by('pk')
+    for recipe in recipes.iterator(chunk_size=chunk_size):
+        yield serialize_recipe(recipe)
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n'
+
+
+class Echo:
+    """File-like object which returns what is written to it instead of
+    storing it, so that the csv writer's rows can be yielded."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS).encode()
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(row[column]) if column in ('ingredients', 'steps')
+            else row[column]
+            for column in CSV_COLUMNS
+        ]).encode()
+
+
+_writers = {
+    'jsonl': iter_jsonl,
+    'csv': iter_csv,
+}
+
+
+def buffer_chunks(chunks, size=STREAM_CHUNK_SIZE):
+    """Joins small chunks of bytes, every yielded chunk is a write to the
+    client."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
+
+
+class ZipStream(io.RawIOBase):
+    """Unseekable file which collects what ZipFile writes into it until the
+    data is popped. ZipFile handles unseekable files by writing the sizes of
+    the entries after their data."""
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.buffer += b
+        return len(b)
+
+    def pop(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def iter_zip(recipes, export_format, chunk_size, storage):
+    """Yields a zip archive with the recipes file and the images. The images
+    are stored under their names in the storage, which are the image values
+    of the exported recipes."""
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        recipes_file = archive.open(
+            f'recipes.{export_format}', 'w', force_zip64=True
+        )
+        with recipes_file:
+            rows = iter_serialized_recipes(recipes, chunk_size)
+            for chunk in _writers[export_format](rows):
+                recipes_file.write(chunk)
+                if len(stream.buffer) >= STREAM_CHUNK_SIZE:
+                    yield stream.pop()
+
+        # Recipes can share an image, every file is added once
+        image_names = recipes.exclude(image='').exclude(image=None)\
+            .order_by('image').values_list('image', flat=True).distinct()
+        for image_name in image_names.iterator(chunk_size=chunk_size):
+            try:
+                image_file = storage.open(image_name)
+            except FileNotFoundError:
+                continue
+
+            with image_file, \
+                    archive.open(image_name, 'w', force_zip64=True) as f:
+                for chunk in image_file.chunks(STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+                    yield stream.pop()
+
+    yield stream.pop()
+
+
+def export_recipes(recipes, export_format, include_images=False,
+                   chunk_size=None, storage=None):
+    """Exports the recipes with their ingredients and steps.
+
+    Args:
+        recipes: queryset of the exported recipes
+        export_format: one of EXPORT_FORMATS
+
+    Keyword Args:
+        include_images: bundle the recipes file and the images into a zip
+        chunk_size: number of recipes loaded at once, by default
+            RECIPY_EXPORT_CHUNK_SIZE
+
+    Returns:
+        generator of bytes
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+
+    if chunk_size is None:
+        chunk_size = settings.RECIPY_EXPORT_CHUNK_SIZE
+
+    if include_images:
+        return iter_zip(
+            recipes, export_format, chunk_size, storage or default_storage
+        )
+
+    rows = iter_serialized_recipes(recipes, chunk_size)
+    return buffer_chunks(_writers[export_format](rows))
+
+
+def get_export_file_info(export_format, include_images=False):
+    """Returns the (file name, content type) tuple of the export."""
+    if include_images:
+        return 'recipes.zip', ZIP_CONTENT_TYPE
+
+    return f'recipes.{export_format}', EXPORT_FORMATS[export_format]
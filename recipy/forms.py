@@ -1,11 +1,17 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from django.forms import inlineformset_factory
 from django.utils.translation import gettext_lazy as _
 
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Row, Column
 
-from recipy.models import Recipe, Step, Ingredient
+from recipy.models import Recipe, Step, Ingredient, RecipeImport
+from recipy.pantry import update_ingredient_terms
+from recipy.quotas import get_remaining_quota
+from recipy.signals import recipe_children_changed
+from recipy.utils.forms import save_formset_in_bulk
 
 
 class RecipeForm(forms.ModelForm):
@@ -61,17 +67,47 @@ class RecipeForm(forms.ModelForm):
 
         return is_valid
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            return image
+
+        remaining_bytes = get_remaining_quota(self.instance.user, 'image_bytes')
+        # The uploaded image replaces the current one
+        if remaining_bytes is not None and \
+                image.size > remaining_bytes + self.instance.image_size:
+            raise forms.ValidationError(
+                _('The image exceeds your storage quota.'),
+                code='quota_exceeded',
+            )
+
+        return image
+
     def save(self, **kwargs):
-        # First save the base instance
-        saved_recipe = super().save(**kwargs)
+        """Saves the recipe and its steps and ingredients in one transaction.
+        The steps and ingredients are saved in bulk, see
+        recipy.utils.forms.save_formset_in_bulk."""
+        with transaction.atomic():
+            # First save the base instance
+            saved_recipe = super().save(**kwargs)
+
+            # Then save the formsets. The recipe is passed because the initial
+            # instance doesn't have PK in create forms.
+            steps_changed = save_formset_in_bulk(
+                self.step_formset, saved_recipe
+            )
+            ingredients_changed = save_formset_in_bulk(
+                self.ingredient_formset, saved_recipe
+            )
 
-        # Then save the formsets. Replace the instance with the saved one
-        # because the initial ones don't have PK in create forms.
-        self.step_formset.instance = saved_recipe
-        self.step_formset.save()
+            if ingredients_changed:
+                update_ingredient_terms([saved_recipe.pk])
+            if steps_changed or ingredients_changed:
+                recipe_children_changed.send(
+                    sender=Recipe, recipe=saved_recipe
+                )
 
-        self.ingredient_formset.instance = saved_recipe
-        self.ingredient_formset.save()
+        return saved_recipe
 
 
 class StepForm(forms.ModelForm):
@@ -155,3 +191,34 @@ class IngredientForm(forms.ModelForm):
 RecipeIngredientFormSet = inlineformset_factory(
     Recipe, Ingredient, form=IngredientForm, extra=0, can_delete=False
 )
+
+
+class RecipeImportForm(forms.ModelForm):
+
+    class Meta:
+        model = RecipeImport
+        fields = ('file', 'format')
+
+        labels = {
+            'file': _('File'),
+            'format': _('Format'),
+        }
+
+        help_texts = {
+            'file': _('Recipes exported from Recipy or in the same format. '
+                      'Images are not imported.'),
+        }
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user')
+        super().__init__(*args, **kwargs)
+
+        self.instance.user = user
+        self.fields['file'].required = True
+
+        self.helper = FormHelper()
+        self.helper.form_tag = False
+
+    def save(self, commit=True):
+        self.instance.source = self.cleaned_data['file'].name
+        return super().save(commit=commit)
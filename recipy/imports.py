@@ -0,0 +1,296 @@
+"""Bulk import of recipes from JSON Lines or CSV files in the formats of
+recipy.export.
+
+The file is read one record at a time. Every record is validated by the rules
+of RecipeForm and its step and ingredient formsets, i.e. the same rules as the
+recipes created in the UI, and the valid records are inserted in batches
+with bulk_create. The rejected records are stored as RecipeImportErrors
+together with their validation errors, see iter_error_file. The records
+beyond the recipe quota of the user are rejected as well, see recipy.quotas.
+
+Every batch is inserted in a transaction which also saves the checkpoint of
+the import, the number of processed records. An interrupted import resumes
+after its last committed batch, so no record is imported twice.
+
+Images aren't imported.
+
+Usage:
+    >>> from recipy.imports import run_import
+    >>>
+    >>> recipe_import = RecipeImport.objects.create(
+    >>>     user=user, format=RecipeImport.Format.JSONL, source=path
+    >>> )
+    >>> with open(path, 'rb') as f:
+    >>>     run_import(recipe_import, f)
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django import forms
+from django.conf import settings
+from django.db import transaction
+
+from recipy.changes import record_recipe_changes
+from recipy.forms import RecipeForm, StepForm, IngredientForm
+from recipy.models import (
+    Recipe, Step, Ingredient, RecipeChange, RecipeImport, RecipeImportError
+)
+from recipy.pantry import update_ingredient_terms
+from recipy.quotas import adjust_usage, get_remaining_quota
+from recipy.search import update_search_documents
+
+
+RECIPE_FIELDS = ('title', 'description', 'duration_minutes', 'is_public')
+
+
+def iter_jsonl_records(text_file):
+    """Yields (record, errors) tuples. The errors are None unless the record
+    couldn't be parsed."""
+    for line in text_file:
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {'line': line.rstrip('\r\n')}, \
+                {'__all__': [f'Invalid JSON: {e}']}
+            continue
+
+        if not isinstance(record, dict):
+            yield {'line': line.rstrip('\r\n')}, \
+                {'__all__': ['Expected a JSON object.']}
+            continue
+
+        yield record, None
+
+
+def iter_csv_records(text_file):
+    """Yields (record, errors) tuples. The steps and ingredients columns hold
+    JSON encoded lists."""
+    for row in csv.DictReader(text_file):
+        # Values without a column
+        row.pop(None, None)
+
+        errors = {}
+        for field_name in ('steps', 'ingredients'):
+            try:
+                row[field_name] = json.loads(row.get(field_name) or '[]')
+            except ValueError as e:
+                errors[field_name] = [f'Invalid JSON: {e}']
+
+        yield row, errors or None
+
+
+_readers = {
+    RecipeImport.Format.JSONL: iter_jsonl_records,
+    RecipeImport.Format.CSV: iter_csv_records,
+}
+
+
+class RecipeRecordForm(forms.ModelForm):
+    """RecipeForm without the formsets, the steps and ingredients of a record
+    are validated one form at a time."""
+
+    class Meta(RecipeForm.Meta):
+        fields = RECIPE_FIELDS
+
+
+class StepRecordForm(StepForm):
+
+    class Meta(StepForm.Meta):
+        exclude = ('recipe',)
+
+
+class IngredientRecordForm(IngredientForm):
+
+    class Meta(IngredientForm.Meta):
+        exclude = ('recipe',)
+
+
+# Forms of the child objects under the record fields holding their lists
+CHILD_FORMS = {
+    'steps': StepRecordForm,
+    'ingredients': IngredientRecordForm,
+}
+
+
+def get_form_errors(form):
+    """Returns the errors of the form as a dictionary of JSON serializable
+    values."""
+    return {
+        field_name: list(field_errors)
+        for field_name, field_errors in form.errors.items()
+    }
+
+
+def validate_record(record, user):
+    """Validates the record with the rules of RecipeForm and its step and
+    ingredient formsets.
+
+    Creating the formsets takes more time than validating the record, so the
+    recipe and every step and ingredient are validated by a form of their
+    own. The child forms are set up like the extra forms of the formsets:
+    empty forms are skipped and the name isn't required.
+
+    Returns:
+        (recipe, steps, ingredients, errors) tuple. The objects are unsaved
+        and None if the record is invalid.
+    """
+    recipe_form = RecipeRecordForm(
+        data={
+            field_name: record[field_name] for field_name in RECIPE_FIELDS
+            if record.get(field_name) is not None
+        },
+        instance=Recipe(user=user),
+    )
+    errors = {} if recipe_form.is_valid() else get_form_errors(recipe_form)
+
+    children = {}
+    for prefix, form_class in CHILD_FORMS.items():
+        children[prefix] = []
+        child_records = record.get(prefix) or []
+        if not isinstance(child_records, list) or \
+                not all(isinstance(child, dict) for child in child_records):
+            errors[prefix] = ['Expected a list of objects.']
+            continue
+
+        for index, child_record in enumerate(child_records):
+            form = form_class(
+                data={
+                    field_name: value for field_name, value
+                    in child_record.items() if value is not None
+                },
+                empty_permitted=True, use_required_attribute=False,
+                formset_form=True,
+            )
+            if not form.is_valid():
+                errors[f'{prefix}-{index}'] = get_form_errors(form)
+            elif form.has_changed():
+                children[prefix].append(form.instance)
+
+    if errors:
+        return None, None, None, errors
+
+    return (
+        recipe_form.instance, children['steps'], children['ingredients'],
+        None
+    )
+
+
+def run_import(recipe_import, file, batch_size=None, progress=None):
+    """Imports the records of the file which follow the checkpoint.
+
+    Args:
+        recipe_import: RecipeImport whose status, counts and checkpoint are
+            updated
+        file: binary file with the records in the format of the import
+
+    Keyword Args:
+        batch_size: number of records processed in a single transaction, by
+            default RECIPY_IMPORT_BATCH_SIZE
+        progress: called with the import after every committed batch
+    """
+    if batch_size is None:
+        batch_size = settings.RECIPY_IMPORT_BATCH_SIZE
+
+    recipe_import.status = RecipeImport.Status.RUNNING
+    recipe_import.last_error = ''
+    recipe_import.save(update_fields=('status', 'last_error', 'updated'))
+
+    text_file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    records = _readers[recipe_import.format](text_file)
+    records = islice(enumerate(records, start=1), recipe_import.checkpoint,
+                     None)
+
+    while batch := list(islice(records, batch_size)):
+        valid_records = []
+        rejected_records = []
+        for record_number, (record, errors) in batch:
+            if errors is None:
+                recipe, steps, ingredients, errors = validate_record(
+                    record, recipe_import.user
+                )
+            if errors is None:
+                valid_records.append(
+                    (record_number, record, recipe, steps, ingredients)
+                )
+            else:
+                rejected_records.append(RecipeImportError(
+                    recipe_import=recipe_import, record_number=record_number,
+                    record=record, errors=errors,
+                ))
+
+        _save_batch(recipe_import, valid_records, rejected_records,
+                    len(batch))
+        if progress is not None:
+            progress(recipe_import)
+
+    recipe_import.status = RecipeImport.Status.SUCCEEDED
+    recipe_import.save(update_fields=('status', 'updated'))
+
+
+def _save_batch(recipe_import, valid_records, rejected_records,
+                processed_count):
+    with transaction.atomic():
+        # None if the user can have any number of recipes. The usage stays
+        # locked until the batch is counted, so concurrent imports and
+        # creates can't exceed the quota together.
+        remaining_recipes = get_remaining_quota(
+            recipe_import.user, 'recipes', lock=True
+        )
+        if remaining_recipes is not None:
+            for record_number, record, *_ in valid_records[remaining_recipes:]:
+                rejected_records.append(RecipeImportError(
+                    recipe_import=recipe_import, record_number=record_number,
+                    record=record, errors={'__all__': [
+                        'You have reached the limit of recipes.'
+                    ]},
+                ))
+            valid_records = valid_records[:remaining_recipes]
+
+        recipes = Recipe.objects.bulk_create(
+            [recipe for _, _, recipe, _, _ in valid_records]
+        )
+
+        all_steps, all_ingredients = [], []
+        for _, _, recipe, steps, ingredients in valid_records:
+            for child in steps + ingredients:
+                child.recipe = recipe
+            all_steps += steps
+            all_ingredients += ingredients
+        Step.objects.bulk_create(all_steps)
+        Ingredient.objects.bulk_create(all_ingredients)
+
+        # Bulk creation doesn't send the signals which keep the denormalized
+        # data up to date
+        recipe_pks = [recipe.pk for recipe in recipes]
+        if recipe_pks:
+            Recipe.objects.filter(pk__in=recipe_pks)\
+                .update_computed_durations()
+            update_search_documents(recipe_pks)
+            update_ingredient_terms(recipe_pks)
+            record_recipe_changes(recipe_pks, RecipeChange.Action.CREATED)
+            adjust_usage(recipe_import.user_id, recipes=len(recipe_pks))
+
+        RecipeImportError.objects.bulk_create(rejected_records)
+
+        recipe_import.checkpoint += processed_count
+        recipe_import.imported_count += len(recipes)
+        recipe_import.rejected_count += len(rejected_records)
+        recipe_import.save(update_fields=(
+            'checkpoint', 'imported_count', 'rejected_count', 'updated'
+        ))
+
+
+def iter_error_file(recipe_import, chunk_size=1000):
+    """Yields the rejected records of the import as JSON Lines bytes."""
+    errors = recipe_import.errors.order_by('record_number')
+    for error in errors.iterator(chunk_size=chunk_size):
+        yield json.dumps({
+            'record_number': error.record_number,
+            'errors': error.errors,
+            'record': error.record,
+        }).encode() + b'\n'
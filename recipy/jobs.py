@@ -0,0 +1,156 @@
+"""A minimal job queue which uses the database as the broker.
+
+Tasks are plain functions registered with the task decorator. Their keyword
+arguments are stored as JSON in the Job model and they are executed by the
+run_jobs management command.
+
+Usage:
+    >>> from recipy.jobs import task, enqueue
+    >>>
+    >>> @task('send_newsletter')
+    >>> def send_newsletter(newsletter_id):
+    >>>     ...
+    >>>
+    >>> enqueue('send_newsletter', newsletter_id=1)
+
+Failed jobs are retried with an exponential delay until they run out of
+attempts (see RECIPY_JOBS setting). A task can raise PermanentJobError to fail
+the job right away.
+"""
+import logging
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from recipy.models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """Raised by tasks when retrying wouldn't help, e.g. invalid input."""
+    pass
+
+
+@dataclass
+class Task:
+    name: str
+    func: Callable
+    # Called with the task kwargs when the job fails for the last time
+    on_failure: Optional[Callable] = None
+
+
+_tasks = {}
+
+
+def task(name, on_failure=None):
+    """Registers the decorated function as a task with the given name."""
+    def decorator(func):
+        if name in _tasks:
+            raise ValueError(f'Task "{name}" is already registered.')
+
+        _tasks[name] = Task(name, func, on_failure)
+        return func
+
+    return decorator
+
+
+def enqueue(task_name, **payload) -> Job:
+    if task_name not in _tasks:
+        raise ValueError(f'Task "{task_name}" is not registered.')
+
+    return Job.objects.create(
+        task=task_name, payload=payload,
+        max_attempts=settings.RECIPY_JOBS['max_attempts'],
+    )
+
+
+def claim_next_job() -> Optional[Job]:
+    """Marks the next due job as running and returns it. Safe to call from
+    multiple workers at once because a job is claimed with a conditional
+    UPDATE which only one worker can win."""
+    now = timezone.now()
+    candidate_pks = Job.objects.filter(
+        status=Job.Status.PENDING, run_after__lte=now
+    ).order_by('run_after', 'pk').values_list('pk', flat=True)[:10]
+
+    for job_pk in candidate_pks:
+        claimed = Job.objects.filter(
+            pk=job_pk, status=Job.Status.PENDING
+        ).update(
+            status=Job.Status.RUNNING, locked_at=now,
+            attempts=F('attempts') + 1, updated=now,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_pk)
+
+    return None
+
+
+def run_job(job: Job):
+    registered_task = _tasks.get(job.task)
+    try:
+        if registered_task is None:
+            raise PermanentJobError(f'Task "{job.task}" is not registered.')
+
+        registered_task.func(**job.payload)
+    except Exception as e:
+        _handle_job_failure(job, registered_task, e)
+    else:
+        job.status = Job.Status.SUCCEEDED
+        job.locked_at = None
+        job.save(update_fields=('status', 'locked_at', 'updated'))
+
+
+def run_next_job() -> Optional[Job]:
+    """Runs the next due job. Returns None if there are no due jobs."""
+    job = claim_next_job()
+    if job is not None:
+        run_job(job)
+
+    return job
+
+
+def requeue_stale_jobs() -> int:
+    """Jobs left running by workers that died are made pending again."""
+    stale_after = timedelta(
+        seconds=settings.RECIPY_JOBS['stale_after_seconds']
+    )
+    return Job.objects.filter(
+        status=Job.Status.RUNNING, locked_at__lt=timezone.now() - stale_after,
+    ).update(status=Job.Status.PENDING, locked_at=None)
+
+
+def _handle_job_failure(job, registered_task, exception):
+    job.last_error = ''.join(traceback.format_exception(exception))
+    job.locked_at = None
+
+    retry = (
+        not isinstance(exception, PermanentJobError)
+        and job.attempts < job.max_attempts
+    )
+    if retry:
+        delay = settings.RECIPY_JOBS['retry_delay_seconds'] * \
+            2 ** (job.attempts - 1)
+        job.status = Job.Status.PENDING
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+        logger.warning(
+            'Job %s (%s) failed, retrying in %s seconds: %s',
+            job.pk, job.task, delay, exception,
+        )
+    else:
+        job.status = Job.Status.FAILED
+        logger.error('Job %s (%s) failed: %s', job.pk, job.task, exception)
+
+    job.save(update_fields=(
+        'status', 'run_after', 'locked_at', 'last_error', 'updated'
+    ))
+
+    if job.status == Job.Status.FAILED and registered_task and \
+            registered_task.on_failure:
+        registered_task.on_failure(**job.payload)
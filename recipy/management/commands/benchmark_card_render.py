@@ -0,0 +1,101 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.template import Context, Engine
+from django.template.backends.django import get_installed_libraries
+from django.utils.safestring import mark_safe
+
+from recipy.models import Recipe
+
+
+def make_engine(cached):
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+
+    return Engine(
+        dirs=settings.TEMPLATES[0]['DIRS'], loaders=loaders,
+        libraries=get_installed_libraries(),
+    )
+
+
+def prepare_recipes(cards):
+    """Unsaved recipes, rendering the cards doesn't need the database."""
+    user = get_user_model()(pk=1, username='benchmark-card-render')
+    return [
+        Recipe(pk=pk, user=user, title=f'Recipe {pk}',
+               description='Benchmark.', computed_duration_minutes=30)
+        for pk in range(1, cards + 1)
+    ]
+
+
+def render_cards(engine, recipes):
+    """Renders the user section of the recipe list the way a request with
+    none of the cards cached does."""
+    card_template = engine.get_template('recipy/recipe_card.html')
+    recipe_cards = [
+        (recipe, mark_safe(card_template.render(Context({
+            'recipe': recipe, 'is_owner': True,
+        }))))
+        for recipe in recipes
+    ]
+
+    return engine.get_template('recipy/recipe_cards.html').render(Context({
+        'recipe_cards': recipe_cards,
+        'section': 'user',
+        'csrf_token': 'benchmark-csrf-token',
+    }))
+
+
+class Command(BaseCommand):
+    help = 'Measures the time it takes to render the cards of the recipe ' \
+           'list with and without the cached template loader.'
+
+    loaders = {
+        'uncached': False,
+        'cached': True,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cards', type=int, default=settings.RECIPY_RECIPES_PER_PAGE,
+            help='Number of cards on the page. By default, '
+                 'RECIPY_RECIPES_PER_PAGE.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Number of times the page is rendered per loader.',
+        )
+
+    def handle(self, *args, **options):
+        cards = options['cards']
+        repeat = options['repeat']
+        if cards < 1 or repeat < 1:
+            raise CommandError('Cards and repeat have to be positive numbers.')
+
+        recipes = prepare_recipes(cards)
+        self.stdout.write(
+            f'Rendering {cards} recipe cards, {repeat} time(s) per loader.'
+        )
+        self.stdout.write(
+            f'{"Loader":<10} {"Page ms":>10} {"Card ms":>10}'
+        )
+
+        for loader_name, cached in self.loaders.items():
+            engine = make_engine(cached)
+            # The first render fills the cache of the cached loader
+            render_cards(engine, recipes)
+
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                render_cards(engine, recipes)
+                durations.append(time.perf_counter() - start)
+
+            page_ms = statistics.median(durations) * 1000
+            self.stdout.write(
+                f'{loader_name:<10} {page_ms:>10.2f} {page_ms / cards:>10.3f}'
+            )
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+
+from recipy.benchmarks.concurrency import (
+    READ_SCENARIOS, ASGIServerRunner, SlowClients, WSGIServerRunner,
+    make_session_cookie, run_load,
+)
+from recipy.benchmarks.datasets import DatasetConfig, seed_dataset
+from recipy.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Compares the throughput of the recipe read views under WSGI ' \
+           'and ASGI while slow clients hold connections open.'
+
+    servers = {
+        WSGIServerRunner.name: WSGIServerRunner,
+        ASGIServerRunner.name: ASGIServerRunner,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=DatasetConfig.users,
+            help='Number of users in the dataset.',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=200,
+            help='Number of recipes in the dataset.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=DatasetConfig.seed,
+            help='Seed of the dataset and of the requests.',
+        )
+        parser.add_argument(
+            '--clients', type=int, default=8,
+            help='Number of clients sending requests one at a time.',
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=8,
+            help='Number of connections which never finish their request.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Number of threads of the WSGI server.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=3,
+            help='Number of seconds the clients send requests per scenario.',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=5,
+            help='Number of seconds after which a request counts as an '
+                 'error.',
+        )
+        parser.add_argument(
+            '--sync-views', action='store_true',
+            help='Serve the sync views under ASGI as well, instead of the '
+                 'async views of RECIPY_ASGI_URLCONF.',
+        )
+        parser.add_argument(
+            '--server', choices=self.servers.keys(), action='append',
+            help='Run only the scenarios on this server. By default, both '
+                 'servers are used.',
+        )
+
+    def handle(self, *args, **options):
+        dataset_config = DatasetConfig(
+            users=options['users'], recipes=options['recipes'],
+            seed=options['seed'],
+        )
+        if min(dataset_config.users, dataset_config.recipes,
+               options['clients'], options['threads']) < 1 or \
+                min(options['duration'], options['timeout']) <= 0:
+            msg = 'Number of users, recipes, clients and threads, the '
+            msg += 'duration and the timeout have to be positive numbers.'
+            raise CommandError(msg)
+        if options['slow_clients'] < 0:
+            raise CommandError('Number of slow clients can not be negative.')
+
+        server_names = options['server'] or list(self.servers.keys())
+        if 'asgi' in server_names:
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                msg = 'The ASGI server needs uvicorn, install the packages '
+                msg += 'in requirements/local.txt.'
+                raise CommandError(msg)
+
+        test_settings = {'ALLOWED_HOSTS': ['*']}
+        if options['sync_views']:
+            test_settings['RECIPY_ASGI_URLCONF'] = settings.ROOT_URLCONF
+
+        # The benchmark runs on a throwaway test database, like the tests
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(**test_settings):
+                results = self.run_benchmark(
+                    dataset_config, server_names, options
+                )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.print_results(results)
+
+    def run_benchmark(self, dataset_config, server_names, options):
+        self.stdout.write(
+            f'Seeding {dataset_config.users} users and '
+            f'{dataset_config.recipes} recipes, {options["clients"]} '
+            f'client(s) and {options["slow_clients"]} slow client(s) per '
+            f'scenario...'
+        )
+        dataset = seed_dataset(dataset_config)
+
+        user = dataset.users[0]
+        context = {
+            'recipe_pks': list(
+                Recipe.objects.visible_to(user).order_by('pk')
+                .values_list('pk', flat=True)
+            ),
+        }
+        cookie = make_session_cookie(user)
+
+        results = {}
+        for server_name in server_names:
+            server = self.servers[server_name](threads=options['threads'])
+            try:
+                for scenario in READ_SCENARIOS:
+                    # Every scenario starts with cold caches
+                    for cache in caches.all():
+                        cache.clear()
+
+                    slow_clients = SlowClients(server.port,
+                                               options['slow_clients'])
+                    try:
+                        results[f'{server_name}:{scenario.name}'] = run_load(
+                            server.port, cookie, scenario, context,
+                            clients=options['clients'],
+                            duration=options['duration'],
+                            timeout=options['timeout'],
+                            seed=dataset_config.seed,
+                        )
+                    finally:
+                        slow_clients.close()
+            finally:
+                server.close()
+
+        return results
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"Scenario":<12} {"Requests":>8} {"Errors":>8} {"Req/s":>8} '
+            f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<12} {result.requests:>8} {result.errors:>8} '
+                f'{result.requests_per_second:>8.1f} {result.p50_ms:>8.1f} '
+                f'{result.p95_ms:>8.1f} {result.p99_ms:>8.1f}'
+            )
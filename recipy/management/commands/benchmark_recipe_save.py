@@ -0,0 +1,159 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from recipy.forms import RecipeForm
+from recipy.models import Recipe
+
+
+def prepare_formset_data(prefix, objects, fields):
+    formset_data = {
+        f'{prefix}-TOTAL_FORMS': len(objects),
+        f'{prefix}-INITIAL_FORMS': sum(1 for obj in objects if obj.get('id')),
+    }
+    for index, obj in enumerate(objects):
+        for field_name in ('id', *fields):
+            formset_data[f'{prefix}-{index}-{field_name}'] = \
+                obj.get(field_name, '')
+
+    return formset_data
+
+
+def prepare_recipe_form_data(steps, ingredients):
+    return {
+        'title': 'Benchmark recipe',
+        **prepare_formset_data(
+            'steps', steps, ('name', 'description', 'duration_minutes')
+        ),
+        **prepare_formset_data('ingredients', ingredients, ('name',)),
+    }
+
+
+def save_per_row(form):
+    """The previous RecipeForm.save - a query per step and ingredient, each
+    sending the model signals."""
+    saved_recipe = super(RecipeForm, form).save()
+
+    form.step_formset.instance = saved_recipe
+    form.step_formset.save()
+
+    form.ingredient_formset.instance = saved_recipe
+    form.ingredient_formset.save()
+
+    return saved_recipe
+
+
+def save_in_bulk(form):
+    return form.save()
+
+
+class Command(BaseCommand):
+    help = 'Compares the database round trips of saving a recipe with its ' \
+           'steps and ingredients one by one and in bulk.'
+
+    save_methods = {
+        'per row': save_per_row,
+        'bulk': save_in_bulk,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=50,
+            help='Number of steps and of ingredients of the recipe.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of times every scenario is run.',
+        )
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        if rows < 1 or repeat < 1:
+            raise CommandError('Rows and repeat have to be positive numbers.')
+
+        self.stdout.write(
+            f'Saving a recipe with {rows} steps and {rows} ingredients, '
+            f'{repeat} time(s) per scenario.'
+        )
+        self.stdout.write(
+            f'{"Scenario":<10} {"Method":<8} {"Queries":>8} {"Median ms":>10}'
+        )
+
+        for scenario in ('create', 'update'):
+            for method_name, save_method in self.save_methods.items():
+                query_counts, durations = [], []
+                for _ in range(repeat):
+                    queries_count, duration = self.run_scenario(
+                        scenario, save_method, rows
+                    )
+                    query_counts.append(queries_count)
+                    durations.append(duration)
+
+                self.stdout.write(
+                    f'{scenario:<10} {method_name:<8} '
+                    f'{max(query_counts):>8} '
+                    f'{statistics.median(durations) * 1000:>10.1f}'
+                )
+
+    def run_scenario(self, scenario, save_method, rows):
+        """Saves the recipe inside a transaction which is rolled back, so the
+        benchmark leaves no data behind.
+
+        Returns:
+            (number of queries, duration in seconds) of the save
+        """
+        with transaction.atomic():
+            user = get_user_model().objects.create(
+                username='benchmark-recipe-save'
+            )
+
+            steps = [
+                {'name': f'Step {i}', 'description': 'Stir well.',
+                 'duration_minutes': 5}
+                for i in range(rows)
+            ]
+            ingredients = [{'name': f'Ingredient {i}'} for i in range(rows)]
+
+            recipe = Recipe(user=user)
+            if scenario == 'update':
+                form = RecipeForm(
+                    user=user, instance=recipe,
+                    data=prepare_recipe_form_data(steps, ingredients),
+                )
+                recipe = save_in_bulk(self.validate(form))
+
+                # Every other step is changed
+                steps = list(recipe.steps.order_by('pk').values(
+                    'id', 'name', 'description', 'duration_minutes'
+                ))
+                for step in steps[::2]:
+                    step['duration_minutes'] += 1
+                ingredients = list(
+                    recipe.ingredients.order_by('pk').values('id', 'name')
+                )
+
+            form = self.validate(RecipeForm(
+                user=user, instance=recipe,
+                data=prepare_recipe_form_data(steps, ingredients),
+            ))
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                save_method(form)
+                duration = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        return len(queries), duration
+
+    @staticmethod
+    def validate(form):
+        if not form.is_valid():
+            raise CommandError(f'Invalid benchmark data: {form.errors}')
+
+        return form
@@ -0,0 +1,191 @@
+import os
+from dataclasses import asdict
+
+from django.core.cache import caches
+from django.core.management import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+
+from recipy.benchmarks.datasets import DatasetConfig, seed_dataset
+from recipy.benchmarks.runner import (
+    SCENARIOS, ClientDriver, WSGIServerDriver, compare_with_baseline,
+    load_baseline, run_scenario, save_baseline,
+)
+from recipy.models import Recipe
+
+
+DEFAULT_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'benchmarks', 'baseline.json',
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the recipe views on a synthetic dataset and compares ' \
+           'the results against a stored baseline.'
+
+    drivers = {
+        ClientDriver.name: ClientDriver,
+        WSGIServerDriver.name: WSGIServerDriver,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=DatasetConfig.users,
+            help='Number of users in the dataset.',
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=DatasetConfig.recipes,
+            help='Number of recipes in the dataset.',
+        )
+        parser.add_argument(
+            '--children', type=int, default=DatasetConfig.children,
+            help='Number of steps and of ingredients of every recipe.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=DatasetConfig.seed,
+            help='Seed of the dataset and of the requests.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Number of requests per scenario.',
+        )
+        parser.add_argument(
+            '--driver', choices=self.drivers.keys(), action='append',
+            help='Run only the scenarios through this driver. By default, '
+                 'all the drivers are used.',
+        )
+        parser.add_argument(
+            '--baseline', default=DEFAULT_BASELINE_PATH,
+            help='Path of the baseline file.',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Store the results as the new baseline instead of comparing '
+                 'them.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Allowed p95 latency increase over the baseline, e.g. 0.25 '
+                 'for 25 %%. Query counts may not increase at all.',
+        )
+
+    def handle(self, *args, **options):
+        dataset_config = DatasetConfig(
+            users=options['users'], recipes=options['recipes'],
+            children=options['children'], seed=options['seed'],
+        )
+        if min(dataset_config.users, dataset_config.recipes,
+               options['requests']) < 1:
+            msg = 'Number of users, recipes and requests have to be positive '
+            msg += 'numbers.'
+            raise CommandError(msg)
+
+        driver_names = options['driver'] or list(self.drivers.keys())
+
+        # The benchmark runs on a throwaway test database, like the tests
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=['*'],
+                RECIPY_VIEW_METRICS={
+                    'enabled': True, 'buffer_size': options['requests'],
+                    'slow_request_ms': None,
+                },
+            ):
+                results = self.run_benchmark(
+                    dataset_config, driver_names, options['requests']
+                )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.print_results(results)
+
+        if options['save_baseline']:
+            save_baseline(options['baseline'], dataset_config, results)
+            self.stdout.write(f'Saved the baseline to {options["baseline"]}.')
+            return
+
+        self.check_baseline(
+            options['baseline'], dataset_config, results, options['tolerance']
+        )
+
+    def run_benchmark(self, dataset_config, driver_names, requests):
+        self.stdout.write(
+            f'Seeding {dataset_config.users} users and '
+            f'{dataset_config.recipes} recipes with {dataset_config.children} '
+            f'steps and ingredients each...'
+        )
+        dataset = seed_dataset(dataset_config)
+
+        user = dataset.users[0]
+        context = {
+            'children': dataset_config.children,
+            'recipe_pks': list(
+                Recipe.objects.visible_to(user).order_by('pk')
+                .values_list('pk', flat=True)
+            ),
+            'own_recipe_pks': list(
+                user.recipes.order_by('pk').values_list('pk', flat=True)
+            ),
+        }
+
+        results = {}
+        for driver_name in driver_names:
+            driver = self.drivers[driver_name](user)
+            try:
+                for scenario in SCENARIOS:
+                    # Every scenario starts with cold caches
+                    for cache in caches.all():
+                        cache.clear()
+
+                    results[f'{driver_name}:{scenario.name}'] = run_scenario(
+                        driver, scenario, context, requests,
+                        seed=dataset_config.seed,
+                    )
+            finally:
+                driver.close()
+
+        return results
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"Scenario":<16} {"Requests":>8} {"Req/s":>8} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"p99 ms":>8} {"Queries":>8}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<16} {result.requests:>8} '
+                f'{result.requests_per_second:>8.1f} {result.p50_ms:>8.1f} '
+                f'{result.p95_ms:>8.1f} {result.p99_ms:>8.1f} '
+                f'{result.queries:>8}'
+            )
+
+    def check_baseline(self, path, dataset_config, results, tolerance):
+        if not os.path.exists(path):
+            self.stdout.write(
+                f'No baseline at {path}. Run with --save-baseline to store '
+                f'one.'
+            )
+            return
+
+        baseline = load_baseline(path)
+        if baseline['dataset'] != asdict(dataset_config):
+            msg = 'The baseline was recorded with a different dataset, the '
+            msg += 'results are not compared.'
+            self.stdout.write(self.style.WARNING(msg))
+            return
+
+        regressions = compare_with_baseline(
+            results, baseline['results'], tolerance
+        )
+        if regressions:
+            msg = 'Performance regressions compared to the baseline:\n'
+            msg += '\n'.join(regressions)
+            raise CommandError(msg)
+
+        self.stdout.write(self.style.SUCCESS('No regressions found.'))
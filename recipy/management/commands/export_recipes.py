@@ -0,0 +1,64 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from accounts.models import RecipyUser
+from recipy.export import EXPORT_FORMATS, export_recipes
+from recipy.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Exports the recipes of a user, or all the public recipes, with ' \
+           'their ingredients and steps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', help='Path of the file the export is written to.',
+        )
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument(
+            '--user', help='Username of the user whose recipes are exported.',
+        )
+        scope.add_argument(
+            '--public', action='store_true',
+            help='Export all the public recipes.',
+        )
+        parser.add_argument(
+            '--format', choices=EXPORT_FORMATS, default='jsonl',
+            help='Format of the exported recipes.',
+        )
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Bundle the recipes and their images into a zip archive.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=None,
+            help='Number of recipes loaded at once. By default, '
+                 'RECIPY_EXPORT_CHUNK_SIZE.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size is not None and chunk_size < 1:
+            raise CommandError('Chunk size has to be a positive number.')
+
+        if options['public']:
+            recipes = Recipe.objects.filter(is_public=True)
+        else:
+            user = RecipyUser.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'User "{options["user"]}" does not exist.')
+            recipes = Recipe.objects.filter(user=user)
+
+        start = time.perf_counter()
+        size = 0
+        with open(options['output'], 'wb') as f:
+            for chunk in export_recipes(recipes, options['format'],
+                                        options['images'], chunk_size):
+                f.write(chunk)
+                size += len(chunk)
+
+        msg = f'Successfully exported the recipes to "{options["output"]}" '
+        msg += f'({size / 1024:.0f} KiB) in '
+        msg += f'{time.perf_counter() - start:.1f} s.'
+        self.stdout.write(msg)
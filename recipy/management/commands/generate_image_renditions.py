@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+
+from recipy.models import Recipe
+from recipy.utils.cache import RecipeCardCache
+from recipy.utils.images import delete_renditions, generate_renditions
+
+
+def generate_recipe_renditions(recipe_pk, image_name):
+    """Runs in the worker processes. Doesn't touch the database, the results
+    are saved by the main process."""
+    try:
+        return recipe_pk, generate_renditions(image_name), None
+    except Exception as e:
+        return recipe_pk, None, f'{e.__class__.__name__}: {e}'
+
+
+class Command(BaseCommand):
+    help = 'Generates the resized copies of the recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate the renditions of all the images. By default, '
+                 'only the images without renditions are processed.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of worker processes. By default, the number of '
+                 'CPUs.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of images processed between database updates.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        batch_size = options['batch_size']
+        if workers < 1 or batch_size < 1:
+            msg = 'Number of workers and batch size have to be positive '
+            msg += 'numbers.'
+            raise CommandError(msg)
+
+        recipes = Recipe.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            recipes = recipes.filter(image_renditions={})
+        images = list(recipes.order_by('pk').values_list('pk', 'image'))
+        # Replaced by the new renditions, which never overwrite them
+        old_renditions = dict(recipes.values_list('pk', 'image_renditions'))
+
+        # Forked workers must not share the database connections of the main
+        # process.
+        connections.close_all()
+
+        card_cache = RecipeCardCache()
+        processed_count = failed_count = 0
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=django.setup) as executor:
+            for start in range(0, len(images), batch_size):
+                batch = images[start:start + batch_size]
+                results = executor.map(
+                    generate_recipe_renditions, *zip(*batch),
+                    chunksize=max(1, len(batch) // workers),
+                )
+
+                updated_recipes = []
+                for recipe_pk, renditions, error in results:
+                    if error:
+                        failed_count += 1
+                        self.stderr.write(f'Recipe {recipe_pk}: {error}')
+                    else:
+                        updated_recipes.append(Recipe(
+                            pk=recipe_pk, image_renditions=renditions,
+                            image_status=Recipe.ImageStatus.READY,
+                        ))
+
+                # bulk_update doesn't send the signals which invalidate the
+                # cached cards.
+                Recipe.objects.bulk_update(
+                    updated_recipes, ['image_renditions', 'image_status']
+                )
+                for recipe in updated_recipes:
+                    card_cache.invalidate(recipe.pk)
+                    delete_renditions(old_renditions[recipe.pk])
+                processed_count += len(updated_recipes)
+                self.stdout.write(
+                    f'Processed {processed_count + failed_count}/'
+                    f'{len(images)} images.'
+                )
+
+        msg = f'Successfully generated renditions for {processed_count} '
+        msg += f'image(s). '
+        if failed_count:
+            msg += f'{failed_count} image(s) failed.'
+        self.stdout.write(msg)
@@ -0,0 +1,135 @@
+import os
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from accounts.models import RecipyUser
+from recipy.imports import iter_error_file, run_import
+from recipy.models import RecipeImport
+
+
+class Command(BaseCommand):
+    help = 'Imports recipes with their ingredients and steps from a JSON ' \
+           'Lines or CSV file. Invalid records are written to an error file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the imported file.')
+        parser.add_argument(
+            '--user',
+            help='Username of the user the recipes are imported for. '
+                 'Required unless an import is resumed.',
+        )
+        parser.add_argument(
+            '--format', choices=RecipeImport.Format.values, default=None,
+            help='Format of the file. By default, guessed from the file '
+                 'extension.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Number of records inserted in a single transaction. By '
+                 'default, RECIPY_IMPORT_BATCH_SIZE.',
+        )
+        parser.add_argument(
+            '--error-file',
+            help='Path of the JSON Lines file the rejected records are '
+                 'written to. By default, the imported path with the '
+                 '".errors.jsonl" suffix.',
+        )
+        parser.add_argument(
+            '--resume', type=int, metavar='IMPORT_ID',
+            help='Continue an interrupted import of the same file after its '
+                 'last committed batch.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size is not None and batch_size < 1:
+            raise CommandError('Batch size has to be a positive number.')
+
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'File "{path}" does not exist.')
+
+        if options['resume']:
+            recipe_import = self.get_resumed_import(options['resume'], path)
+        else:
+            recipe_import = self.create_import(
+                path, options['user'], options['format']
+            )
+
+        self.stdout.write(
+            f'Import {recipe_import.pk}, resume it with '
+            f'--resume {recipe_import.pk} if it is interrupted.'
+        )
+
+        start = time.perf_counter()
+        imported_before = recipe_import.imported_count
+
+        def report_progress(progress_import):
+            rate = (progress_import.imported_count - imported_before) / \
+                (time.perf_counter() - start)
+            self.stdout.write(
+                f'Processed {progress_import.checkpoint} records: '
+                f'{progress_import.imported_count} imported, '
+                f'{progress_import.rejected_count} rejected '
+                f'({rate:.0f} recipes/s).'
+            )
+
+        try:
+            with open(path, 'rb') as f:
+                run_import(recipe_import, f, batch_size, report_progress)
+        except Exception as e:
+            recipe_import.status = RecipeImport.Status.FAILED
+            recipe_import.last_error = f'{e.__class__.__name__}: {e}'
+            recipe_import.save(
+                update_fields=('status', 'last_error', 'updated')
+            )
+            msg = f'Import failed after {recipe_import.checkpoint} records: '
+            msg += f'{recipe_import.last_error}'
+            raise CommandError(msg) from e
+
+        msg = f'Successfully imported {recipe_import.imported_count} '
+        msg += f'recipe(s) in {time.perf_counter() - start:.1f} s.'
+        if recipe_import.rejected_count:
+            error_file = options['error_file'] or f'{path}.errors.jsonl'
+            with open(error_file, 'wb') as f:
+                f.writelines(iter_error_file(recipe_import))
+            msg += f' {recipe_import.rejected_count} rejected record(s) '
+            msg += f'were written to "{error_file}".'
+        self.stdout.write(msg)
+
+    @staticmethod
+    def create_import(path, username, import_format):
+        if not username:
+            raise CommandError('User is required for a new import.')
+
+        user = RecipyUser.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f'User "{username}" does not exist.')
+
+        if import_format is None:
+            extension = os.path.splitext(path)[1].lstrip('.').lower()
+            if extension not in RecipeImport.Format.values:
+                msg = f'Unknown format of "{path}", please set the --format '
+                msg += f'option.'
+                raise CommandError(msg)
+            import_format = extension
+
+        return RecipeImport.objects.create(
+            user=user, source=os.path.abspath(path), format=import_format,
+        )
+
+    @staticmethod
+    def get_resumed_import(import_id, path):
+        recipe_import = RecipeImport.objects.select_related('user')\
+            .filter(pk=import_id).first()
+        if recipe_import is None:
+            raise CommandError(f'Import {import_id} does not exist.')
+        if recipe_import.status == RecipeImport.Status.SUCCEEDED:
+            raise CommandError(f'Import {import_id} has already finished.')
+        if recipe_import.source != os.path.abspath(path):
+            msg = f'Import {import_id} was started with '
+            msg += f'"{recipe_import.source}".'
+            raise CommandError(msg)
+
+        return recipe_import
@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipy.models import Recipe
+from recipy.pantry import update_ingredient_terms
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the ingredient index used by the pantry lookup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of recipes processed at once.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Batch size has to be a positive number.')
+
+        recipe_pks = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        for start in range(0, len(recipe_pks), batch_size):
+            update_ingredient_terms(recipe_pks[start:start + batch_size])
+
+        self.stdout.write(
+            f'Successfully rebuilt the ingredient index of '
+            f'{len(recipe_pks)} recipe(s).'
+        )
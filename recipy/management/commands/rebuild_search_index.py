@@ -0,0 +1,34 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipy.models import Recipe
+from recipy.search import update_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search documents of all the recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of documents saved in a single query.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Batch size has to be a positive number.')
+
+        recipe_pks = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+
+        updated_count = 0
+        for start in range(0, len(recipe_pks), batch_size):
+            updated_count += update_search_documents(
+                recipe_pks[start:start + batch_size], batch_size=batch_size
+            )
+            self.stdout.write(f'Rebuilt {updated_count} search document(s).')
+
+        self.stdout.write(
+            f'Successfully rebuilt {updated_count} search document(s).'
+        )
@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+
+from recipy.utils.cache import RecipeCardCache
+
+
+class Command(BaseCommand):
+    help = 'Shows the hit and miss counters of the recipe card cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Reset the counters after showing them.',
+        )
+
+    def handle(self, *args, **options):
+        card_cache = RecipeCardCache()
+        stats = card_cache.get_stats()
+
+        lookups = stats['hits'] + stats['misses']
+        hit_ratio = stats['hits'] / lookups if lookups else 0
+        self.stdout.write(f'Hits: {stats["hits"]}')
+        self.stdout.write(f'Misses: {stats["misses"]}')
+        self.stdout.write(f'Hit ratio: {hit_ratio:.2%}')
+
+        if options['reset']:
+            card_cache.reset_stats()
+            self.stdout.write('Successfully reset the counters.')
@@ -0,0 +1,71 @@
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+
+from recipy.models import Recipe
+from recipy.quotas import find_usage_drift, reconcile_usage
+
+
+class Command(BaseCommand):
+    help = 'Verifies and repairs the stored recipe and image usage of the ' \
+           'users, see recipy.quotas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report the users whose usage drifted without fixing '
+                 'them. Exits with an error if any are found.',
+        )
+        parser.add_argument(
+            '--measure-images', action='store_true',
+            help='Read the sizes of the recipe images from the storage '
+                 'before comparing the usage, e.g. for the images uploaded '
+                 'before the quotas existed.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of recipes whose image size is saved in a single '
+                 'query.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Batch size has to be a positive number.')
+
+        if options['measure_images']:
+            measured_count = self.measure_images(batch_size)
+            self.stdout.write(f'Measured {measured_count} image(s).')
+
+        if options['check']:
+            drifted_count = len(find_usage_drift())
+            if drifted_count:
+                msg = f'{drifted_count} user(s) have a wrong usage. Run the '
+                msg += f'command without --check to fix them.'
+                raise CommandError(msg)
+
+            self.stdout.write('The usage of all users is up to date.')
+        else:
+            # Recipes saved while the command runs can drift again, run it
+            # when the traffic is low
+            repaired_count = reconcile_usage()
+            self.stdout.write(
+                f'Successfully repaired the usage of {repaired_count} '
+                f'user(s).'
+            )
+
+    def measure_images(self, batch_size):
+        recipes = Recipe.objects.exclude(image='').only('pk', 'image')
+        measured_count = 0
+        batch = []
+        for recipe in recipes.iterator(chunk_size=batch_size):
+            name = recipe.image.name
+            recipe.image_size = default_storage.size(name) \
+                if default_storage.exists(name) else 0
+            batch.append(recipe)
+            if len(batch) == batch_size:
+                Recipe.objects.bulk_update(batch, ['image_size'])
+                measured_count += len(batch)
+                batch = []
+
+        Recipe.objects.bulk_update(batch, ['image_size'])
+        return measured_count + len(batch)
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+
+from recipy.jobs import run_next_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs the background jobs. Multiple workers can run at once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once there are no more due jobs instead of waiting '
+                 'for new ones.',
+        )
+        parser.add_argument(
+            '--max-jobs', type=int, default=None,
+            help='Exit after running this many jobs.',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = settings.RECIPY_JOBS['poll_interval_seconds']
+        max_jobs = options['max_jobs']
+
+        jobs_count = 0
+        try:
+            while max_jobs is None or jobs_count < max_jobs:
+                # Long-running workers need to drop the connections which the
+                # database server closed in the meantime.
+                close_old_connections()
+
+                requeued_count = requeue_stale_jobs()
+                if requeued_count:
+                    self.stdout.write(f'Requeued {requeued_count} stale job(s).')
+
+                job = run_next_job()
+                if job is None:
+                    if options['burst']:
+                        break
+
+                    time.sleep(poll_interval)
+                    continue
+
+                jobs_count += 1
+                self.stdout.write(
+                    f'Job {job.pk} ({job.task}): {job.get_status_display()}'
+                )
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(f'Ran {jobs_count} job(s).')
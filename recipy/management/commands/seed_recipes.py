@@ -0,0 +1,227 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from faker import Faker
+
+from accounts.models import RecipyUser
+from recipy.benchmarks.datasets import seed_recipes
+from recipy.pantry import invalidate_ingredient_index
+from recipy.utils.images import SEED_IMAGES_DIR, generate_renditions
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+_faker = None
+
+
+def seed_batch(batch_index, count, children, user_pks, images, seed,
+               public_ratio):
+    """Runs in the worker processes (or in the main one with a single
+    worker). Every batch has its own seed, so the data doesn't depend on
+    which worker creates it.
+
+    Returns:
+        (batch index, number of created recipes)
+    """
+    global _faker
+    if _faker is None:
+        _faker = Faker()
+
+    batch_seed = seed + batch_index
+    _faker.seed_instance(batch_seed)
+    rng = random.Random(batch_seed)
+
+    users = [RecipyUser(pk=user_pk) for user_pk in user_pks]
+    with transaction.atomic():
+        recipe_pks = seed_recipes(
+            users, count, children, _faker, rng, public_ratio=public_ratio,
+            images=images, batch_size=count,
+        )
+
+    return batch_index, len(recipe_pks)
+
+
+class Command(BaseCommand):
+    help = 'Generates realistic recipes with steps and ingredients to ' \
+           'reproduce the behaviour of large databases locally.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Number of recipes to create.',
+        )
+        parser.add_argument(
+            '--children', type=int, default=10,
+            help='Number of steps and the number of ingredients of every '
+                 'recipe.',
+        )
+        parser.add_argument(
+            '--users', type=int, default=10,
+            help='Number of users owning the recipes in addition to the demo '
+                 'user.',
+        )
+        parser.add_argument(
+            '--users-password',
+            help='Password of the additional users. By default, they are '
+                 'created with an unusable password and can\'t log in.',
+        )
+        parser.add_argument(
+            '--public-ratio', type=float, default=0.3,
+            help='Share of the recipes which are public.',
+        )
+        parser.add_argument(
+            '--images',
+            help='Directory of sample images which are copied into the media '
+                 'storage once and shared by the recipes. By default, the '
+                 'recipes have no images.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed of the random data.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of worker processes. By default, the number of '
+                 'CPUs. SQLite always uses a single one.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of recipes created in a single transaction.',
+        )
+
+    def handle(self, *args, **options):
+        recipes_count = options['recipes']
+        children = options['children']
+        workers = options['workers']
+        batch_size = options['batch_size']
+        if min(recipes_count, workers, batch_size) < 1 or children < 0:
+            msg = 'Number of recipes, children, workers and batch size have '
+            msg += 'to be positive numbers.'
+            raise CommandError(msg)
+        if not 0 <= options['public_ratio'] <= 1:
+            raise CommandError('Public ratio has to be between 0 and 1.')
+
+        if connection.vendor == 'sqlite' and workers > 1:
+            # SQLite allows a single writer at a time, the other workers
+            # would only wait for the lock.
+            self.stdout.write('SQLite database, using a single worker.')
+            workers = 1
+
+        user_pks = self.get_user_pks(options['users'],
+                                     options['users_password'])
+        images = self.copy_images(options['images']) \
+            if options['images'] else []
+
+        batches = [
+            (batch_index, min(batch_size, recipes_count - start))
+            for batch_index, start in
+            enumerate(range(0, recipes_count, batch_size))
+        ]
+        task_args = [
+            (batch_index, count, children, user_pks, images, options['seed'],
+             options['public_ratio'])
+            for batch_index, count in batches
+        ]
+
+        start = time.perf_counter()
+        created_count = 0
+        for _, count in self.run_batches(task_args, workers):
+            created_count += count
+            self.report_progress(
+                created_count, recipes_count, children, start
+            )
+
+        # The workers can't reach the cache of this process if it's local
+        # memory.
+        invalidate_ingredient_index()
+
+        duration = time.perf_counter() - start
+        rows_count = created_count * (1 + children * 2)
+        msg = f'Successfully created {created_count} recipes with '
+        msg += f'{created_count * children} steps and '
+        msg += f'{created_count * children} ingredients in {duration:.1f} s '
+        msg += f'({rows_count / duration:.0f} rows/s).'
+        self.stdout.write(msg)
+
+    @staticmethod
+    def run_batches(task_args, workers):
+        if workers == 1:
+            for args in task_args:
+                yield seed_batch(*args)
+            return
+
+        # Forked workers must not share the database connections of the main
+        # process.
+        connections.close_all()
+
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=django.setup) as executor:
+            yield from executor.map(seed_batch, *zip(*task_args))
+
+    def report_progress(self, created_count, recipes_count, children, start):
+        rows_count = created_count * (1 + children * 2)
+        rate = rows_count / (time.perf_counter() - start)
+        self.stdout.write(
+            f'Created {created_count}/{recipes_count} recipes '
+            f'({rate:.0f} rows/s).'
+        )
+
+    def get_user_pks(self, users_count, users_password=None):
+        """Returns the PKs of the demo user and the seed users, creating the
+        missing ones. The seed users get an unusable password unless
+        users_password is given."""
+        username = settings.RECIPY_DEMO_USER['username']
+
+        if not RecipyUser.objects.filter(username=username).exists():
+            RecipyUser.objects.create_user(
+                username, password=settings.RECIPY_DEMO_USER['password']
+            )
+
+        # Hashing is deliberately slow, so the hash is computed only once
+        usernames = [f'{username}-seed-{i}' for i in range(users_count)]
+        password_hash = make_password(users_password)
+        RecipyUser.objects.bulk_create([
+            RecipyUser(username=seed_username, password=password_hash)
+            for seed_username in usernames
+        ], ignore_conflicts=True)
+
+        return list(
+            RecipyUser.objects.filter(username__in=[username, *usernames])
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def copy_images(self, images_dir):
+        """Copies the sample images into the media storage and generates
+        their renditions. They are shared by all the seeded recipes, so they
+        are never deleted with one, see SEED_IMAGES_DIR.
+
+        Returns:
+            list of (image name, renditions) tuples
+        """
+        paths = sorted(
+            path for path in Path(images_dir).iterdir()
+            if path.suffix.lower() in IMAGE_EXTENSIONS
+        ) if Path(images_dir).is_dir() else []
+        if not paths:
+            raise CommandError(f'No images found in "{images_dir}".')
+
+        images = []
+        for path in paths:
+            with path.open('rb') as f:
+                image_name = default_storage.save(
+                    f'{SEED_IMAGES_DIR}{path.name}', File(f)
+                )
+            images.append((image_name, generate_renditions(image_name)))
+
+        self.stdout.write(f'Copied {len(images)} sample image(s).')
+        return images
@@ -0,0 +1,57 @@
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Max
+
+from recipy.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Backfills and verifies the computed durations of the recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report the recipes with an outdated computed duration '
+                 'without fixing them. Exits with an error if any are found.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of recipes processed in a single query.',
+        )
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Batch size has to be a positive number.')
+
+        max_pk = Recipe.objects.aggregate(Max('pk'))['pk__max'] or 0
+
+        outdated_count = 0
+        for start_pk in range(0, max_pk + 1, batch_size):
+            batch = Recipe.objects.filter(
+                pk__gte=start_pk, pk__lt=start_pk + batch_size
+            )
+            outdated_pks = list(
+                batch.with_outdated_computed_duration()
+                .values_list('pk', flat=True)
+            )
+            if not outdated_pks:
+                continue
+
+            outdated_count += len(outdated_pks)
+            if not check_only:
+                Recipe.objects.filter(pk__in=outdated_pks)\
+                    .update_computed_durations()
+
+        if check_only:
+            if outdated_count:
+                msg = f'{outdated_count} recipe(s) have an outdated computed '
+                msg += f'duration. Run the command without --check to fix '
+                msg += f'them.'
+                raise CommandError(msg)
+
+            self.stdout.write('All computed durations are up to date.')
+        else:
+            self.stdout.write(
+                f'Successfully updated {outdated_count} computed duration(s).'
+            )
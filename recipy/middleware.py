@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from recipy.utils.metrics import RequestMetrics, view_metrics
+
+logger = logging.getLogger(__name__)
+
+# QueryTimer of the request being processed, see ViewMetricsMiddleware. The
+# context is copied to the threads which run the queries of async requests.
+current_query_timer = ContextVar('current_query_timer', default=None)
+
+
+class QueryTimer:
+    """Database execute wrapper which counts the queries and their time."""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper which times the query with the QueryTimer of
+    the current request, if there is one."""
+    query_timer = current_query_timer.get()
+    if query_timer is None:
+        return execute(sql, params, many, context)
+
+    return query_timer(execute, sql, params, many, context)
+
+
+def install_query_timer(connection, **kwargs):
+    """Adds time_query to the execute wrappers of the connection. It goes
+    first, so that the wrappers added by execute_wrapper are removed from
+    the end as usual."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+class ViewMetricsMiddleware:
+    """Records the total latency, the number and time of the database queries
+    and the template render time of every request, grouped by the URL name of
+    the view. The metrics are kept in recipy.utils.metrics.view_metrics and
+    shown on the staff-only view metrics page.
+
+    Opt-in with the RECIPY_VIEW_METRICS setting:
+        - enabled: the middleware is removed from the chain if False
+        - buffer_size: number of the last requests kept per view
+        - slow_request_ms: requests slower than this are logged, None turns
+            the logging off
+
+    Should be placed near the top of MIDDLEWARE so that the latency includes
+    the other middleware. Supports both sync and async requests, so it
+    doesn't move the async views to a thread under ASGI. The database
+    connections belong to the threads which run the queries, so the queries
+    are timed by a wrapper installed on every connection (see time_query).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = settings.RECIPY_VIEW_METRICS
+        if not config['enabled']:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.slow_request_ms = config['slow_request_ms']
+
+        for connection in connections.all():
+            install_query_timer(connection)
+        connection_created.connect(install_query_timer)
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Marks the middleware as async, like MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with self.record_metrics(request):
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        with self.record_metrics(request):
+            response = await self.get_response(request)
+        return response
+
+    @contextmanager
+    def record_metrics(self, request):
+        """Records the metrics of the request processed in the block."""
+        query_timer = QueryTimer()
+        request.template_render_ms = 0
+
+        start = time.perf_counter()
+        token = current_query_timer.set(query_timer)
+        try:
+            yield
+        finally:
+            current_query_timer.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        # Requests which didn't match any URL are grouped together
+        resolver_match = request.resolver_match
+        view_name = 'unresolved'
+        if resolver_match is not None:
+            view_name = resolver_match.view_name
+
+        request_metrics = RequestMetrics(
+            total_ms=total_ms, db_ms=query_timer.duration * 1000,
+            render_ms=request.template_render_ms,
+            queries=query_timer.queries,
+        )
+        view_metrics.record(view_name, request_metrics)
+
+        if self.slow_request_ms is not None and \
+                total_ms > self.slow_request_ms:
+            logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, '
+                'template rendered in %.1f ms',
+                request.method, request.path, view_name, total_ms,
+                request_metrics.queries, request_metrics.db_ms,
+                request_metrics.render_ms,
+            )
+
+    def process_template_response(self, request, response):
+        # Template responses are rendered right after the template response
+        # middleware is processed
+        start = time.perf_counter()
+
+        def record_render_time(rendered_response):
+            request.template_render_ms = (time.perf_counter() - start) * 1000
+
+        response.add_post_render_callback(record_render_time)
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware which supports async requests as well.
+
+    WhiteNoiseMiddleware is sync-only, so under ASGI Django would run the
+    rest of the middleware and the async views in a thread adapted back to
+    async. This one keeps the async requests on the event loop, the static
+    files are looked up in memory (or on disk with autorefresh, in a thread).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Marks the middleware as async, like MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(
+                request.path_info
+            )
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class ASGIURLConfMiddleware:
+    """Resolves the requests served under ASGI with RECIPY_ASGI_URLCONF,
+    which routes the recipe read paths to their async views.
+
+    Under WSGI the middleware is removed from the chain and the sync views of
+    ROOT_URLCONF are served, an async view would only add a thread switch and
+    an event loop to every request there. Should be placed last in
+    MIDDLEWARE, where it gets the async handler of the views under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not asyncio.iscoroutinefunction(get_response):
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        # Marks the middleware as async, like MiddlewareMixin
+        self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    async def __call__(self, request):
+        request.urlconf = settings.RECIPY_ASGI_URLCONF
+        return await self.get_response(request)
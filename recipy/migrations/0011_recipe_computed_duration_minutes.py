@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def backfill_computed_duration_minutes(apps, schema_editor):
+    Recipe = apps.get_model('recipy', 'Recipe')
+    Step = apps.get_model('recipy', 'Step')
+
+    Recipe.objects.update(computed_duration_minutes=Subquery(
+        Step.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe').annotate(total=Sum('duration_minutes'))
+        .values('total')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipy', '0010_alter_ingredient_measure_alter_ingredient_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='computed_duration_minutes',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(
+            backfill_computed_duration_minutes, migrations.RunPython.noop
+        ),
+    ]
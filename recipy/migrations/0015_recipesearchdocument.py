@@ -0,0 +1,115 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# The full-text index is specific to the database, so it is created with raw
+# SQL. See recipy.search for the queries that use it.
+FULL_TEXT_INDEX_SQL = {
+    'postgresql': {
+        'forward': [
+            "ALTER TABLE recipy_recipesearchdocument ADD COLUMN search_vector "
+            "tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', body), 'B')) STORED",
+            "CREATE INDEX recipy_recipesearch_vector_idx "
+            "ON recipy_recipesearchdocument USING GIN (search_vector)",
+        ],
+        'reverse': [
+            "DROP INDEX recipy_recipesearch_vector_idx",
+            "ALTER TABLE recipy_recipesearchdocument DROP COLUMN search_vector",
+        ],
+    },
+    'sqlite': {
+        'forward': [
+            # External content table - the text is stored only once, in
+            # recipy_recipesearchdocument, and the triggers keep the index in
+            # sync with it.
+            "CREATE VIRTUAL TABLE recipy_recipesearch_fts USING fts5("
+            "title, body, content='recipy_recipesearchdocument', "
+            "content_rowid='recipe_id', "
+            "tokenize='porter unicode61 remove_diacritics 2')",
+            "CREATE TRIGGER recipy_recipesearch_fts_insert "
+            "AFTER INSERT ON recipy_recipesearchdocument BEGIN "
+            "INSERT INTO recipy_recipesearch_fts(rowid, title, body) "
+            "VALUES (new.recipe_id, new.title, new.body); END",
+            "CREATE TRIGGER recipy_recipesearch_fts_delete "
+            "AFTER DELETE ON recipy_recipesearchdocument BEGIN "
+            "INSERT INTO recipy_recipesearch_fts"
+            "(recipy_recipesearch_fts, rowid, title, body) "
+            "VALUES ('delete', old.recipe_id, old.title, old.body); END",
+            "CREATE TRIGGER recipy_recipesearch_fts_update "
+            "AFTER UPDATE ON recipy_recipesearchdocument BEGIN "
+            "INSERT INTO recipy_recipesearch_fts"
+            "(recipy_recipesearch_fts, rowid, title, body) "
+            "VALUES ('delete', old.recipe_id, old.title, old.body); "
+            "INSERT INTO recipy_recipesearch_fts(rowid, title, body) "
+            "VALUES (new.recipe_id, new.title, new.body); END",
+        ],
+        'reverse': [
+            "DROP TRIGGER recipy_recipesearch_fts_update",
+            "DROP TRIGGER recipy_recipesearch_fts_delete",
+            "DROP TRIGGER recipy_recipesearch_fts_insert",
+            "DROP TABLE recipy_recipesearch_fts",
+        ],
+    },
+}
+
+
+def create_full_text_index(apps, schema_editor):
+    sql = FULL_TEXT_INDEX_SQL.get(schema_editor.connection.vendor, {})
+    for statement in sql.get('forward', []):
+        schema_editor.execute(statement)
+
+
+def drop_full_text_index(apps, schema_editor):
+    sql = FULL_TEXT_INDEX_SQL.get(schema_editor.connection.vendor, {})
+    for statement in sql.get('reverse', []):
+        schema_editor.execute(statement)
+
+
+def create_search_documents(apps, schema_editor):
+    Recipe = apps.get_model('recipy', 'Recipe')
+    RecipeSearchDocument = apps.get_model('recipy', 'RecipeSearchDocument')
+
+    documents = []
+    recipes = Recipe.objects.prefetch_related('ingredients', 'steps')
+    for recipe in recipes.iterator(chunk_size=1000):
+        body = [recipe.description]
+        body += [ingredient.name for ingredient in recipe.ingredients.all()]
+        for step in recipe.steps.all():
+            body += [step.name, step.description]
+
+        documents.append(RecipeSearchDocument(
+            recipe_id=recipe.pk, title=recipe.title,
+            body='\n'.join(filter(None, body)),
+        ))
+
+        if len(documents) >= 1000:
+            RecipeSearchDocument.objects.bulk_create(documents)
+            documents = []
+
+    RecipeSearchDocument.objects.bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipy', '0014_job_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='recipy.recipe')),
+                ('title', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+        migrations.RunPython(
+            create_search_documents, migrations.RunPython.noop
+        ),
+    ]
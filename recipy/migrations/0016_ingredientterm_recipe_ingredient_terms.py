@@ -0,0 +1,25 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipy', '0015_recipesearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_terms',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='recipes', to='recipy.ingredientterm'),
+        ),
+    ]
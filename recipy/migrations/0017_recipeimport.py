@@ -0,0 +1,46 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipy', '0016_ingredientterm_recipe_ingredient_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(blank=True, null=True, upload_to='imports/')),
+                ('source', models.CharField(blank=True, default='', max_length=255)),
+                ('format', models.CharField(choices=[('jsonl', 'JSON Lines'), ('csv', 'CSV')], max_length=255)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='PENDING', max_length=255)),
+                ('checkpoint', models.PositiveIntegerField(default=0)),
+                ('imported_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeImportError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_number', models.PositiveIntegerField()),
+                ('record', models.JSONField(blank=True, default=dict)),
+                ('errors', models.JSONField(default=dict)),
+                ('recipe_import', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errors', to='recipy.recipeimport')),
+            ],
+            options={
+                'ordering': ('record_number',),
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_created_to_updated(apps, schema_editor):
+    Recipe = apps.get_model('recipy', 'Recipe')
+    Recipe.objects.update(updated=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipy', '0017_recipeimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        # The real modification times are unknown
+        migrations.RunPython(
+            copy_created_to_updated, migrations.RunPython.noop
+        ),
+    ]
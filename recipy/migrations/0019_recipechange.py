@@ -0,0 +1,39 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+def record_existing_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipy', 'Recipe')
+    RecipeChange = apps.get_model('recipy', 'RecipeChange')
+    RecipeChange.objects.bulk_create([
+        RecipeChange(recipe_pk=pk, user_pk=user_pk, action='UPDATED',
+                     is_public=is_public, was_public=is_public)
+        for pk, user_pk, is_public in Recipe.objects.order_by('pk')
+        .values_list('pk', 'user_id', 'is_public').iterator()
+    ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipy', '0018_recipe_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('recipe_pk', models.PositiveIntegerField()),
+                ('user_pk', models.PositiveIntegerField()),
+                ('action', models.CharField(choices=[('UPDATED', 'Updated'), ('DELETED', 'Deleted')], max_length=255)),
+                ('is_public', models.BooleanField(default=False)),
+                ('was_public', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # The clients sync the existing recipes from the beginning of the feed
+        migrations.RunPython(
+            record_existing_recipes, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def create_usage(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    RecipeUsage = apps.get_model('recipy', 'RecipeUsage')
+    RecipeUsage.objects.bulk_create([
+        RecipeUsage(user_id=pk, recipe_count=recipe_count)
+        for pk, recipe_count in User.objects.order_by()
+        .annotate(recipe_count=Count('recipes'))
+        .values_list('pk', 'recipe_count').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('recipy', '0019_recipechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.PositiveIntegerField(default=0)),
+                ('image_bytes', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_size',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        # The image sizes are measured by the reconcile_recipe_usage command,
+        # reading every image from the storage would make the migration slow
+        migrations.RunPython(create_usage, migrations.RunPython.noop),
+    ]
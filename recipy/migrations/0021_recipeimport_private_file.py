@@ -0,0 +1,44 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:22
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+import recipy.utils.storage
+
+
+def move_import_files(apps, schema_editor):
+    """Moves the files of the unfinished imports out of MEDIA_ROOT, where
+    they were served, and deletes the rest."""
+    RecipeImport = apps.get_model('recipy', 'RecipeImport')
+    storage = recipy.utils.storage.ImportsStorage()
+    recipe_imports = RecipeImport.objects.exclude(file='').exclude(file=None)
+    for recipe_import in recipe_imports.iterator():
+        old_name = recipe_import.file.name
+        new_name = None
+        if recipe_import.status in ('PENDING', 'RUNNING') and \
+                default_storage.exists(old_name):
+            with default_storage.open(old_name) as f:
+                new_name = storage.save(
+                    recipy.utils.storage.get_import_file_name(
+                        recipe_import, old_name
+                    ), f
+                )
+
+        RecipeImport.objects.filter(pk=recipe_import.pk)\
+            .update(file=new_name)
+        default_storage.delete(old_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipy', '0020_recipeusage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeimport',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=recipy.utils.storage.ImportsStorage(), upload_to=recipy.utils.storage.get_import_file_name),
+        ),
+        migrations.RunPython(move_import_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipy', '0021_recipeimport_private_file'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipechange',
+            name='action',
+            field=models.CharField(choices=[('CREATED', 'Created'), ('UPDATED', 'Updated'), ('DELETED', 'Deleted')], max_length=255),
+        ),
+    ]
@@ -1,8 +1,13 @@
+from enum import Enum
+
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import Sum
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from recipy.utils.storage import ImportsStorage, get_import_file_name
+
 
 def humanize_duration(duration_minutes: int) -> str:
     if duration_minutes > 60:
@@ -12,36 +17,179 @@ def humanize_duration(duration_minutes: int) -> str:
         return f'{duration_minutes}{_("min")}'
 
 
+def step_duration_sum_subquery():
+    """Subquery that sums the durations of the steps of the outer recipe."""
+    return Subquery(
+        Step.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe').annotate(total=Sum('duration_minutes'))
+        .values('total')
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def visible_to(self, user, action=None):
+        """Filters the recipes the user is allowed to access.
+
+        The policies are applied in SQL, so the recipes the user can't
+        access are never loaded:
+            - Anonymous users can't access any recipe
+            - All users are allowed to read public recipes
+            - Only the authors of the recipes are allowed to modify them
+
+        New ways of granting access, e.g. recipes shared with a user or a
+        group, belong here as additional conditions joined to the recipes,
+        so that every view and API which lists or loads recipes applies
+        them.
+
+        Args:
+            user: user accessing the recipes
+            action: Recipe.Action, by default READ
+        """
+        if action is None:
+            action = Recipe.Action.READ
+
+        if not user.is_authenticated:
+            return self.none()
+
+        if action == Recipe.Action.READ:
+            return self.filter(Q(user=user) | Q(is_public=True))
+        elif action == Recipe.Action.MODIFY:
+            return self.filter(user=user)
+
+        msg = f'"{action}" is not a supported action. '
+        raise NotImplementedError(msg)
+
+    def with_outdated_computed_duration(self):
+        """Filters the recipes whose computed_duration_minutes doesn't match
+        the sum of their step durations."""
+        return self.annotate(
+            step_duration_sum=step_duration_sum_subquery()
+        ).filter(
+            Q(computed_duration_minutes__isnull=True,
+              step_duration_sum__isnull=False) |
+            Q(computed_duration_minutes__isnull=False,
+              step_duration_sum__isnull=True) |
+            # The negation is true when both are NULL, which is up to date
+            Q(~Q(computed_duration_minutes=F('step_duration_sum')),
+              computed_duration_minutes__isnull=False,
+              step_duration_sum__isnull=False)
+        )
+
+    def update_computed_durations(self):
+        """Recalculates computed_duration_minutes in a single query."""
+        return self.update(
+            computed_duration_minutes=step_duration_sum_subquery()
+        )
+
+    def touch(self):
+        """Marks the recipes as changed without sending the save signals,
+        e.g. after their steps or ingredients changed."""
+        return self.update(updated=timezone.now())
+
+
 class Recipe(models.Model):
+
+    class Action(Enum):
+        """Actions of the access policies, see RecipeQuerySet.visible_to."""
+        READ = 'read'
+        MODIFY = 'modify'  # write or delete
+
+    class ImageStatus(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        PROCESSING = 'PROCESSING', _('Processing')
+        READY = 'READY', _('Ready')
+        FAILED = 'FAILED', _('Failed')
+
     title = models.CharField(max_length=255)
     description = models.TextField(default='', blank=True)
     duration_minutes = models.IntegerField(blank=True, null=True)
+    # Sum of the step durations. Kept up to date by the signal handlers in
+    # recipy.signals so that displaying the duration doesn't hit the database.
+    computed_duration_minutes = models.IntegerField(
+        blank=True, null=True, editable=False, db_index=True
+    )
 
     image = models.ImageField(upload_to='uploads/', blank=True, null=True)
+    # Resized copies of the image, see recipy.utils.images.generate_renditions
+    image_renditions = models.JSONField(default=dict, blank=True,
+                                        editable=False)
+    # Uploaded images are processed in the background, see recipy.tasks
+    image_status = models.CharField(max_length=255, choices=ImageStatus.choices,
+                                    default=ImageStatus.READY, editable=False)
+    # Size of the stored image in bytes, counted towards the image quota of
+    # the author, see recipy.quotas
+    image_size = models.PositiveBigIntegerField(default=0, editable=False)
 
     is_public = models.BooleanField(default=False)
     user = models.ForeignKey(
         get_user_model(), on_delete=models.CASCADE, related_name='recipes'
     )
 
+    created = models.DateTimeField(auto_now_add=True)
+    # Also bumped when the steps or ingredients change, see recipy.signals.
+    # The ETags of the API are derived from it.
+    updated = models.DateTimeField(auto_now=True)
+
+    # Normalized ingredient names, i.e. the inverted index used by the pantry
+    # lookup. Kept up to date by RecipeForm, see recipy.pantry.
+    ingredient_terms = models.ManyToManyField(
+        'IngredientTerm', blank=True, editable=False, related_name='recipes'
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Used by the keyset pagination of the recipe list sections
+            models.Index(fields=['user', 'created', 'id'],
+                         name='recipe_user_created_idx'),
+            models.Index(fields=['is_public', 'created', 'id'],
+                         name='recipe_public_created_idx'),
+        ]
+
     def __str__(self):
         return str(self.title)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered to detect image changes on save
+        instance._loaded_image_name = instance.__dict__.get('image')
+        # Remembered to tell the other users when the recipe stops being
+        # public, see recipy.changes
+        instance._loaded_is_public = instance.__dict__.get('is_public')
+        return instance
+
+    def image_has_changed(self) -> bool:
+        loaded_image_name = getattr(self, '_loaded_image_name', None)
+        return (self.image.name or None) != (loaded_image_name or None)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The post_save signal handlers still see the change
+        self._loaded_image_name = self.image.name
+
     def get_duration_display(self) -> str:
         """Returns a human readable duration."""
         if self.duration_minutes is None:
-            if self.steps.exists():
-                all_step_duration_minutes = self.steps.aggregate(Sum(
-                    'duration_minutes'))['duration_minutes__sum']
-                if all_step_duration_minutes is None:
-                    return ''
-                return humanize_duration(all_step_duration_minutes)
-
-            else:
+            if self.computed_duration_minutes is None:
                 return ''
 
+            return humanize_duration(self.computed_duration_minutes)
+
         return humanize_duration(self.duration_minutes)
 
+    def update_computed_duration(self):
+        """Recalculates the sum of the step durations and stores it without
+        triggering the recipe save signals."""
+        self.computed_duration_minutes = self.steps.aggregate(
+            Sum('duration_minutes')
+        )['duration_minutes__sum']
+        Recipe.objects.filter(pk=self.pk).update(
+            computed_duration_minutes=self.computed_duration_minutes
+        )
+
 
 class Ingredient(models.Model):
 
@@ -81,3 +229,166 @@ class Step(models.Model):
             return ''
 
         return humanize_duration(self.duration_minutes)
+
+
+class IngredientTerm(models.Model):
+    """Normalized ingredient name, e.g. "Fresh tomatoes" becomes "tomato".
+    See recipy.pantry.normalize_ingredient_name."""
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return str(self.name)
+
+
+class RecipeSearchDocument(models.Model):
+    """Text of the recipe and its ingredients and steps, indexed for full-text
+    search. Kept up to date by recipy.search.
+
+    The full-text index itself depends on the database and is created in the
+    migrations: a GIN-indexed tsvector column on PostgreSQL and an FTS5
+    virtual table on SQLite.
+    """
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE,
+                                  primary_key=True,
+                                  related_name='search_document')
+    title = models.TextField(default='', blank=True)
+    body = models.TextField(default='', blank=True)
+
+    def __str__(self):
+        return str(self.title)
+
+
+class RecipeUsage(models.Model):
+    """Number of recipes and image bytes of a user, checked against the
+    quotas. Kept up to date by recipy.quotas, so enforcing a quota doesn't
+    count the recipes."""
+    user = models.OneToOneField(
+        get_user_model(), on_delete=models.CASCADE, primary_key=True,
+        related_name='recipe_usage'
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    image_bytes = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user} ({self.recipe_count} recipes, ' \
+               f'{self.image_bytes} image bytes)'
+
+
+class Job(models.Model):
+    """Background job stored in the database, see recipy.jobs."""
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        SUCCEEDED = 'SUCCEEDED', _('Succeeded')
+        FAILED = 'FAILED', _('Failed')
+
+    task = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=255, choices=Status.choices,
+                              default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(default='', blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Used by the workers when looking for the next job
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} ({self.get_status_display()})'
+
+
+class RecipeImport(models.Model):
+    """Bulk import of recipes from a JSON Lines or CSV file, see
+    recipy.imports."""
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('Pending')
+        RUNNING = 'RUNNING', _('Running')
+        SUCCEEDED = 'SUCCEEDED', _('Succeeded')
+        FAILED = 'FAILED', _('Failed')
+
+    class Format(models.TextChoices):
+        JSONL = 'jsonl', _('JSON Lines')
+        CSV = 'csv', _('CSV')
+
+    user = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE,
+        related_name='recipe_imports'
+    )
+    # Uploaded file, stored under a random name outside of MEDIA_ROOT and
+    # deleted when the import finishes. Imports started from the command line
+    # read a local file instead, its path is the source.
+    file = models.FileField(upload_to=get_import_file_name,
+                            storage=ImportsStorage(), blank=True, null=True)
+    source = models.CharField(max_length=255, default='', blank=True)
+    format = models.CharField(max_length=255, choices=Format.choices)
+
+    status = models.CharField(max_length=255, choices=Status.choices,
+                              default=Status.PENDING)
+    # Number of the records processed by the committed batches. Saved in the
+    # transaction of every batch, so an interrupted import resumes after the
+    # last committed record.
+    checkpoint = models.PositiveIntegerField(default=0)
+    imported_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(default='', blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.source} ({self.get_status_display()})'
+
+
+class RecipeImportError(models.Model):
+    """Rejected record of an import with the validation errors."""
+    recipe_import = models.ForeignKey(RecipeImport, on_delete=models.CASCADE,
+                                      related_name='errors')
+    # Position of the record in the file, starting at 1
+    record_number = models.PositiveIntegerField()
+    record = models.JSONField(default=dict, blank=True)
+    errors = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ('record_number',)
+
+    def __str__(self):
+        return f'{self.recipe_import} #{self.record_number}'
+
+
+class RecipeChange(models.Model):
+    """Entry of the change feed the clients synchronize the recipes with, see
+    recipy.changes. The ID is the sequence number of the change."""
+
+    class Action(models.TextChoices):
+        CREATED = 'CREATED', _('Created')
+        UPDATED = 'UPDATED', _('Updated')
+        DELETED = 'DELETED', _('Deleted')
+
+    id = models.BigAutoField(primary_key=True)
+    # Plain values instead of foreign keys, the changes outlive the recipes
+    # and their authors
+    recipe_pk = models.PositiveIntegerField()
+    user_pk = models.PositiveIntegerField()
+    action = models.CharField(max_length=255, choices=Action.choices)
+    # Visibility of the recipe after and before the change. The other users
+    # see the changes of the recipes which are or were public.
+    is_public = models.BooleanField(default=False)
+    was_public = models.BooleanField(default=False)
+
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'#{self.pk} {self.get_action_display()} recipe ' \
+               f'{self.recipe_pk}'
@@ -0,0 +1,306 @@
+"""Pantry lookup - finds the recipes which can be made with the ingredients on
+hand.
+
+Ingredient names are normalized into a vocabulary of IngredientTerms and every
+recipe is linked to the terms of its ingredients (Recipe.ingredient_terms).
+That many-to-many table is the inverted index from a term to the recipes
+using it. It's updated when a recipe is saved with RecipeForm or imported, and
+after any other ingredient save or delete once the transaction commits.
+
+Matching is done in memory. Every process loads the index into arrays of
+recipe IDs per term and reloads it only when the index version in the cache
+changes, i.e. after some recipe's terms changed.
+
+Usage:
+    >>> from recipy.pantry import find_recipes_by_ingredients
+    >>>
+    >>> matches = find_recipes_by_ingredients(request.user, ['eggs', 'flour'])
+    >>> matches[0].recipe, matches[0].coverage
+"""
+import re
+import threading
+import uuid
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from recipy.models import Recipe, Ingredient, IngredientTerm
+
+
+# Words which describe the ingredient, but don't change what it is
+DESCRIPTIVE_WORDS = {
+    'chopped', 'cooked', 'diced', 'dried', 'fresh', 'frozen', 'grated',
+    'ground', 'large', 'medium', 'minced', 'of', 'peeled', 'raw', 'ripe',
+    'sliced', 'small', 'whole',
+}
+
+INDEX_VERSION_KEY = 'recipy:pantry:index-version'
+
+# The visible recipes are picked from the ranked list in chunks, each one 4
+# times larger than the previous one. The worst matches beyond the last chunk
+# are never shown, so a user who can see few of the recipes doesn't cost more
+# than this number of queries.
+MAX_VISIBILITY_CHUNKS = 3
+
+
+def singularize(word):
+    """Naive English singular form, good enough to match "eggs" and "egg"."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith('oes'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and \
+            not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+
+    return word
+
+
+def normalize_ingredient_name(name):
+    """Turns an ingredient name into a term, e.g. "2 Fresh Tomatoes" becomes
+    "tomato". Returns an empty string if nothing is left."""
+    # Letters only, quantities and punctuation are dropped
+    words = re.findall(r'[^\W\d_]+', name.lower())
+    words = [
+        singularize(word) for word in words if word not in DESCRIPTIVE_WORDS
+    ]
+    return ' '.join(words)[:IngredientTerm._meta.get_field('name').max_length]
+
+
+def get_or_create_terms(term_names):
+    """Returns a dictionary of the term names and PKs, creating the missing
+    terms."""
+    IngredientTerm.objects.bulk_create(
+        [IngredientTerm(name=term_name) for term_name in term_names],
+        ignore_conflicts=True,
+    )
+    return dict(
+        IngredientTerm.objects.filter(name__in=term_names)
+        .values_list('name', 'pk')
+    )
+
+
+def update_ingredient_terms(recipe_pks):
+    """Links the recipes to the terms of their ingredients in a constant
+    number of queries. Called after the ingredients are saved."""
+    recipe_term_names = {
+        (recipe_pk, normalize_ingredient_name(name))
+        for recipe_pk, name in Ingredient.objects.filter(
+            recipe__in=recipe_pks
+        ).values_list('recipe', 'name')
+    }
+    recipe_term_names = {
+        (recipe_pk, term_name) for recipe_pk, term_name in recipe_term_names
+        if term_name
+    }
+
+    term_pks = get_or_create_terms(
+        {term_name for _, term_name in recipe_term_names}
+    )
+    new_links = {
+        (recipe_pk, term_pks[term_name])
+        for recipe_pk, term_name in recipe_term_names
+    }
+
+    RecipeTerm = Recipe.ingredient_terms.through
+    old_links = {
+        (recipe_pk, term_pk): link_pk
+        for link_pk, recipe_pk, term_pk in RecipeTerm.objects.filter(
+            recipe__in=recipe_pks
+        ).values_list('pk', 'recipe', 'ingredientterm')
+    }
+
+    removed_link_pks = [
+        link_pk for link, link_pk in old_links.items() if link not in new_links
+    ]
+    added_links = new_links - old_links.keys()
+    if not removed_link_pks and not added_links:
+        return
+
+    RecipeTerm.objects.filter(pk__in=removed_link_pks).delete()
+    RecipeTerm.objects.bulk_create([
+        RecipeTerm(recipe_id=recipe_pk, ingredientterm_id=term_pk)
+        for recipe_pk, term_pk in added_links
+    ])
+    invalidate_ingredient_index()
+
+
+_pending = threading.local()
+
+
+def schedule_ingredient_terms_update(recipe_pk):
+    """Updates the terms of the recipe once the current transaction commits,
+    or right away outside of a transaction. Used when the ingredients are
+    saved one by one, e.g. in the admin."""
+    if not hasattr(_pending, 'recipe_pks'):
+        _pending.recipe_pks = set()
+
+    _pending.recipe_pks.add(recipe_pk)
+    # See recipy.search.schedule_search_document_update
+    transaction.on_commit(_update_pending_ingredient_terms)
+
+
+def _update_pending_ingredient_terms():
+    recipe_pks = _pending.recipe_pks
+    _pending.recipe_pks = set()
+    if recipe_pks:
+        update_ingredient_terms(recipe_pks)
+
+
+def invalidate_ingredient_index():
+    """Makes all the processes reload the index. Deferred until the current
+    transaction commits, otherwise the index could be reloaded without the
+    new changes."""
+    transaction.on_commit(
+        lambda: cache.set(INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    )
+
+
+@dataclass
+class PantryMatch:
+    recipe: Recipe
+    # Number of the recipe's ingredient terms which are on hand
+    matched_count: int
+    term_count: int
+
+    @property
+    def coverage(self) -> float:
+        return self.matched_count / self.term_count
+
+    @property
+    def missing_count(self) -> int:
+        return self.term_count - self.matched_count
+
+
+class IngredientIndex:
+    """In-memory copy of the inverted index.
+
+    Attributes:
+        postings: dictionary of term PKs and sorted arrays of the PKs of the
+            recipes using the term
+        term_counts: number of terms of each recipe, indexed by recipe PK
+    """
+
+    def __init__(self, postings, term_counts):
+        self.postings = postings
+        self.term_counts = term_counts
+
+    @classmethod
+    def load(cls):
+        max_recipe_pk = Recipe.objects.aggregate(Max('pk'))['pk__max'] or 0
+        term_counts = array('H', [0]) * (max_recipe_pk + 1)
+
+        postings = defaultdict(lambda: array('q'))
+        rows = Recipe.ingredient_terms.through.objects.order_by(
+            'ingredientterm_id', 'recipe_id'
+        ).values_list('ingredientterm_id', 'recipe_id')
+        for term_pk, recipe_pk in rows.iterator(chunk_size=10000):
+            # Recipes created after max_recipe_pk was read are left out
+            # until the next reload.
+            if recipe_pk <= max_recipe_pk:
+                postings[term_pk].append(recipe_pk)
+                term_counts[recipe_pk] += 1
+
+        return cls(dict(postings), term_counts)
+
+    def rank(self, term_pks):
+        """Finds the recipes using any of the terms.
+
+        Returns:
+            list of (recipe PK, matched term count, recipe term count) tuples,
+            the recipes with the highest share of matched terms first
+        """
+        matched_counts = Counter()
+        for term_pk in set(term_pks):
+            matched_counts.update(self.postings.get(term_pk, ()))
+
+        ranked = [
+            (recipe_pk, matched_count, self.term_counts[recipe_pk])
+            for recipe_pk, matched_count in matched_counts.items()
+        ]
+        ranked.sort(key=lambda match: (
+            -match[1] / match[2], -match[1], -match[0]
+        ))
+        return ranked
+
+
+_index = None
+_index_version = None
+
+
+def get_ingredient_index():
+    """Returns the index of this process, reloaded if it's out of date."""
+    global _index, _index_version
+
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        cache.add(INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(INDEX_VERSION_KEY)
+
+    if _index is None or version != _index_version:
+        _index = IngredientIndex.load()
+        _index_version = version
+
+    return _index
+
+
+def find_recipes_by_ingredients(user, ingredient_names, limit=None):
+    """Finds the recipes the user can see (their own and the public ones)
+    which use any of the ingredients.
+
+    Args:
+        user: user who is looking for recipes
+        ingredient_names: names of the ingredients on hand
+
+    Keyword Args:
+        limit: max number of results, by default RECIPY_PANTRY_RESULTS_LIMIT
+
+    Returns:
+        list of PantryMatch, the recipes with the most ingredients on hand
+        (relative to the number of their ingredients) first
+    """
+    if limit is None:
+        limit = settings.RECIPY_PANTRY_RESULTS_LIMIT
+
+    term_names = {
+        normalize_ingredient_name(name) for name in ingredient_names
+    } - {''}
+    if not term_names:
+        return []
+
+    term_pks = IngredientTerm.objects.filter(name__in=term_names)\
+        .values_list('pk', flat=True)
+    ranked = get_ingredient_index().rank(term_pks)
+
+    # The index doesn't know who can see the recipes, so the visible ones are
+    # picked from the ranked list in chunks.
+    visible_recipes = Recipe.objects.visible_to(user).select_related('user')
+    chunk_size = limit * 4
+
+    matches = []
+    start = 0
+    for _ in range(MAX_VISIBILITY_CHUNKS):
+        chunk = ranked[start:start + chunk_size]
+        if not chunk:
+            break
+
+        start += chunk_size
+        chunk_size *= 4
+        recipes = visible_recipes.in_bulk(
+            [recipe_pk for recipe_pk, _, _ in chunk]
+        )
+
+        for recipe_pk, matched_count, term_count in chunk:
+            if recipe_pk in recipes:
+                matches.append(PantryMatch(
+                    recipes[recipe_pk], matched_count, term_count
+                ))
+                if len(matches) == limit:
+                    return matches
+
+    return matches
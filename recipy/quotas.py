@@ -0,0 +1,196 @@
+"""Per-user quotas of the number of recipes and of the image bytes.
+
+The usage of every user is stored in a RecipeUsage row and adjusted with
+single UPDATE queries whenever recipes are created or deleted or their images
+change (see recipy.signals), so enforcing a quota doesn't count the recipes.
+The code which bypasses the signals, e.g. bulk_create, calls adjust_usage
+itself. Any drift is repaired by the reconcile_recipe_usage
+command.
+
+The limits are configured with the RECIPY_QUOTAS setting:
+    - default: limits of all the users
+    - groups: limits of the members of the groups, by group name. A user in
+        several groups gets the highest limit of each quota.
+    - users: limits of individual users, by username. They take precedence
+        over the group limits.
+A limit of None means unlimited. Quotas missing from the groups and users
+fall back to the default ones.
+
+Usage:
+    >>> from recipy.quotas import get_remaining_quota
+    >>>
+    >>> if get_remaining_quota(user, 'recipes') == 0:
+    >>>     messages.warning(request, 'You have reached the recipe limit.')
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest
+
+from recipy.models import Recipe, RecipeUsage
+
+
+QUOTAS = ('recipes', 'image_bytes')
+
+# Usage field of every quota
+_usage_fields = {
+    'recipes': 'recipe_count',
+    'image_bytes': 'image_bytes',
+}
+
+
+def get_limits(user):
+    """Returns the limits of the user as a dictionary of quota names and
+    limits. None means unlimited."""
+    config = settings.RECIPY_QUOTAS
+    limits = {quota: config['default'].get(quota) for quota in QUOTAS}
+
+    group_limits = config.get('groups')
+    if group_limits:
+        group_names = user.groups.filter(name__in=group_limits.keys())\
+            .values_list('name', flat=True)
+        for quota in QUOTAS:
+            values = [
+                group_limits[name][quota] for name in group_names
+                if quota in group_limits[name]
+            ]
+            if values:
+                limits[quota] = None if None in values else max(values)
+
+    limits.update(config.get('users', {}).get(user.get_username(), {}))
+    return limits
+
+
+def get_usage(user):
+    """Returns the RecipeUsage of the user. Unsaved if the user has no usage
+    yet."""
+    return RecipeUsage.objects.filter(user=user).first() or \
+        RecipeUsage(user=user)
+
+
+def lock_usage(user):
+    """Returns the RecipeUsage of the user, locked until the end of the
+    current transaction. Concurrent transactions locking it wait, so a quota
+    check and the insert which follows it can't be passed by two of them at
+    once. An UPDATE takes the lock because, unlike select_for_update, it also
+    serializes the writers on SQLite."""
+    usage = RecipeUsage.objects.filter(user=user)
+    if not usage.update(recipe_count=F('recipe_count')):
+        RecipeUsage.objects.bulk_create(
+            [RecipeUsage(user=user)], ignore_conflicts=True
+        )
+        usage.update(recipe_count=F('recipe_count'))
+
+    return usage.get()
+
+
+def get_remaining_quota(user, quota, lock=False):
+    """Returns how much of the quota the user has left, or None if the quota
+    is unlimited.
+
+    Args:
+        user: user whose quota is checked
+        quota: name of the quota, see QUOTAS
+        lock: True to lock the usage until the end of the transaction (see
+            lock_usage), so that the check and the insert are atomic
+    """
+    limit = get_limits(user)[quota]
+    if limit is None:
+        return None
+
+    usage = lock_usage(user) if lock else get_usage(user)
+    used = getattr(usage, _usage_fields[quota])
+    return max(limit - used, 0)
+
+
+def adjust_usage(user_pk, recipes=0, image_bytes=0):
+    """Adds the numbers, negative to subtract, to the usage of the user in a
+    single query. Concurrent adjustments don't overwrite each other."""
+    if not recipes and not image_bytes:
+        return
+
+    usage = RecipeUsage.objects.filter(user_id=user_pk)
+    # The counters never go below zero, even if they drifted
+    updated = usage.update(
+        recipe_count=Greatest(F('recipe_count') + recipes, 0),
+        image_bytes=Greatest(F('image_bytes') + image_bytes, 0),
+    )
+    if updated or (recipes <= 0 and image_bytes <= 0):
+        # Nothing to subtract from. The usage of a deleted user could have
+        # been deleted already.
+        return
+
+    # The first recipe of the user. A concurrent request could create the
+    # usage in the meantime, so it's created empty and updated.
+    RecipeUsage.objects.bulk_create(
+        [RecipeUsage(user_id=user_pk)], ignore_conflicts=True
+    )
+    usage.update(
+        recipe_count=Greatest(F('recipe_count') + recipes, 0),
+        image_bytes=Greatest(F('image_bytes') + image_bytes, 0),
+    )
+
+
+def adjust_usage_of_recipes(recipe_pks, sign=1):
+    """Adds the recipes, or subtracts them with sign -1, to the usage of
+    their authors. Should be called after the recipes are created or before
+    they are deleted."""
+    totals = Recipe._base_manager.filter(pk__in=recipe_pks).order_by()\
+        .values('user').annotate(recipes=Count('pk'),
+                                 image_bytes=Sum('image_size'))
+    for total in totals:
+        adjust_usage(
+            total['user'], recipes=sign * total['recipes'],
+            image_bytes=sign * (total['image_bytes'] or 0),
+        )
+
+
+def get_actual_usage():
+    """Returns the usage computed from the recipes as a dictionary of user
+    PKs and (recipe count, image bytes) tuples. Users without recipes are
+    left out."""
+    totals = Recipe._base_manager.order_by().values('user').annotate(
+        recipes=Count('pk'), image_bytes=Sum('image_size'),
+    )
+    return {
+        total['user']: (total['recipes'], total['image_bytes'] or 0)
+        for total in totals.iterator()
+    }
+
+
+def find_usage_drift():
+    """Compares the stored usage with the recipes.
+
+    Returns:
+        dictionary of the PKs of the users whose usage is wrong and their
+        actual (recipe count, image bytes) tuples
+    """
+    actual_usage = defaultdict(lambda: (0, 0), get_actual_usage())
+    stored_usage = {
+        user_pk: (recipe_count, image_bytes)
+        for user_pk, recipe_count, image_bytes in RecipeUsage.objects
+        .values_list('user', 'recipe_count', 'image_bytes').iterator()
+    }
+
+    drift = {}
+    for user_pk in actual_usage.keys() | stored_usage.keys():
+        if stored_usage.get(user_pk, (0, 0)) != actual_usage[user_pk]:
+            drift[user_pk] = actual_usage[user_pk]
+
+    return drift
+
+
+def reconcile_usage():
+    """Repairs the drifted usage. Returns the number of repaired users."""
+    drift = find_usage_drift()
+    RecipeUsage.objects.bulk_create(
+        [
+            RecipeUsage(user_id=user_pk, recipe_count=recipe_count,
+                        image_bytes=image_bytes)
+            for user_pk, (recipe_count, image_bytes) in drift.items()
+        ],
+        update_conflicts=True, unique_fields=['user'],
+        update_fields=['recipe_count', 'image_bytes'], batch_size=1000,
+    )
+    return len(drift)
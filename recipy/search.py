@@ -0,0 +1,219 @@
+"""Full-text search of the recipes.
+
+Every recipe has a RecipeSearchDocument holding the text of the recipe and
+its ingredients and steps. The documents are indexed by the database:
+    - PostgreSQL: weighted tsvector column with a GIN index
+    - SQLite: FTS5 virtual table kept in sync by triggers
+Other databases fall back to a (slow) case-insensitive substring search.
+
+The documents are rebuilt when a recipe or its ingredients or steps change.
+The rebuild is deferred until the transaction commits so that saving a recipe
+with all of its steps rebuilds the document only once.
+
+Usage:
+    >>> from recipy.search import search_recipes
+    >>>
+    >>> recipes = search_recipes(request.user, 'chicken soup')
+"""
+import re
+import threading
+from functools import reduce
+from operator import and_
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import Prefetch, Q
+from django.db.models.expressions import RawSQL
+
+from recipy.models import Recipe, RecipeSearchDocument, Ingredient, Step
+
+
+def get_query_terms(query):
+    """Splits the search query into lowercase words. Any punctuation is
+    dropped, so the terms are safe to use in the full-text query syntax."""
+    return re.findall(r'\w+', query.lower())
+
+
+def get_visibility_condition(user, recipe_pk_column):
+    """Builds the SQL condition which limits the recipes to the ones the user
+    can see. It's compiled from RecipeQuerySet.visible_to, so the raw search
+    queries apply the same access policies as the rest of the app.
+
+    Args:
+        user: user who is searching
+        recipe_pk_column: column of the outer query holding the recipe PK
+
+    Returns:
+        (SQL, params) tuple, or None if the user can't see any recipe
+    """
+    visible_recipes = Recipe.objects.visible_to(user).filter(
+        pk=RawSQL(recipe_pk_column, ())
+    ).values('pk')
+    try:
+        sql, params = visible_recipes.query.sql_with_params()
+    except EmptyResultSet:
+        return None
+
+    return f'EXISTS ({sql})', list(params)
+
+
+def _search_sqlite(user, terms, limit):
+    # Every term is matched as a prefix and all of them have to match.
+    # The title is weighted 10 times more than the body.
+    visibility_condition = get_visibility_condition(
+        user, 'recipy_recipesearch_fts.rowid'
+    )
+    if visibility_condition is None:
+        return []
+
+    visibility_sql, visibility_params = visibility_condition
+    match_query = ' '.join(f'"{term}"*' for term in terms)
+    sql = f'''
+        SELECT recipy_recipesearch_fts.rowid
+        FROM recipy_recipesearch_fts
+        WHERE recipy_recipesearch_fts MATCH %s
+            AND {visibility_sql}
+        ORDER BY bm25(recipy_recipesearch_fts, 10.0, 1.0)
+        LIMIT %s
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match_query, *visibility_params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_postgresql(user, terms, limit):
+    visibility_condition = get_visibility_condition(user, 'd.recipe_id')
+    if visibility_condition is None:
+        return []
+
+    visibility_sql, visibility_params = visibility_condition
+    ts_query = ' & '.join(f'{term}:*' for term in terms)
+    sql = f'''
+        SELECT d.recipe_id
+        FROM recipy_recipesearchdocument d
+        WHERE d.search_vector @@ to_tsquery('english', %s)
+            AND {visibility_sql}
+        ORDER BY ts_rank(d.search_vector, to_tsquery('english', %s)) DESC
+        LIMIT %s
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql, [ts_query, *visibility_params, ts_query, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_fallback(user, terms, limit):
+    term_filters = [
+        Q(search_document__title__icontains=term) |
+        Q(search_document__body__icontains=term)
+        for term in terms
+    ]
+    return list(
+        Recipe.objects.visible_to(user)
+        .filter(reduce(and_, term_filters))
+        .order_by('-created', '-pk').values_list('pk', flat=True)[:limit]
+    )
+
+
+_search_backends = {
+    'postgresql': _search_postgresql,
+    'sqlite': _search_sqlite,
+}
+
+
+def search_recipes(user, query, limit=None):
+    """Searches the recipes the user can see, i.e. their own and the public
+    ones.
+
+    Args:
+        user: user who is searching
+        query: search words, all of them have to match as a word prefix
+
+    Keyword Args:
+        limit: max number of results, by default RECIPY_SEARCH_RESULTS_LIMIT
+
+    Returns:
+        list of the recipes, the best matches first
+    """
+    terms = get_query_terms(query)
+    if not terms:
+        return []
+
+    if limit is None:
+        limit = settings.RECIPY_SEARCH_RESULTS_LIMIT
+
+    search_backend = _search_backends.get(connection.vendor, _search_fallback)
+    recipe_pks = search_backend(user, terms, limit)
+
+    # The author is shown on the search results
+    recipes = Recipe.objects.select_related('user').in_bulk(recipe_pks)
+    return [recipes[pk] for pk in recipe_pks if pk in recipes]
+
+
+def build_search_document(recipe):
+    """Expects the ingredients and steps to be prefetched."""
+    body = [recipe.description]
+    body += [ingredient.name for ingredient in recipe.ingredients.all()]
+    for step in recipe.steps.all():
+        body += [step.name, step.description]
+
+    return RecipeSearchDocument(
+        recipe=recipe, title=recipe.title, body='\n'.join(filter(None, body)),
+    )
+
+
+def update_search_documents(recipe_pks, batch_size=1000):
+    """Rebuilds the search documents of the recipes. Returns the number of
+    updated documents."""
+    recipes = Recipe.objects.filter(pk__in=recipe_pks).only(
+        'pk', 'title', 'description'
+    ).prefetch_related(
+        Prefetch('ingredients', Ingredient.objects.only('recipe', 'name')
+                 .order_by('pk')),
+        Prefetch('steps', Step.objects.only('recipe', 'name', 'description')
+                 .order_by('pk')),
+    ).order_by('pk')
+
+    updated_count = 0
+    documents = []
+    for recipe in recipes.iterator(chunk_size=batch_size):
+        documents.append(build_search_document(recipe))
+        if len(documents) >= batch_size:
+            updated_count += _save_search_documents(documents)
+            documents = []
+
+    updated_count += _save_search_documents(documents)
+    return updated_count
+
+
+def _save_search_documents(documents):
+    RecipeSearchDocument.objects.bulk_create(
+        documents, update_conflicts=True, unique_fields=['recipe'],
+        update_fields=['title', 'body'],
+    )
+    return len(documents)
+
+
+_pending = threading.local()
+
+
+def schedule_search_document_update(recipe_pk):
+    """Rebuilds the search document of the recipe once the current transaction
+    commits, or right away outside of a transaction."""
+    if not hasattr(_pending, 'recipe_pks'):
+        _pending.recipe_pks = set()
+
+    _pending.recipe_pks.add(recipe_pk)
+    # Every call registers the callback because the previously registered one
+    # is discarded if its transaction is rolled back. Only the first callback
+    # to run has anything left to do.
+    transaction.on_commit(_update_pending_search_documents)
+
+
+def _update_pending_search_documents():
+    recipe_pks = _pending.recipe_pks
+    _pending.recipe_pks = set()
+    if recipe_pks:
+        update_search_documents(recipe_pks)
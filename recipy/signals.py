@@ -0,0 +1,235 @@
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from recipy.changes import record_recipe_change, record_recipe_changes
+from recipy.jobs import enqueue
+from recipy.models import (
+    Recipe, Step, Ingredient, RecipeChange, RecipeImport, RecipeUsage
+)
+from recipy.pantry import schedule_ingredient_terms_update
+from recipy.quotas import adjust_usage
+from recipy.search import schedule_search_document_update
+from recipy.utils.cache import RecipeCardCache
+from recipy.utils.images import delete_renditions
+
+# Sent with the recipe argument after steps or ingredients of the recipe were
+# saved in bulk, e.g. by RecipeForm. Bulk saves don't send the model signals.
+recipe_children_changed = Signal()
+
+
+def is_recipe_cascade(origin):
+    """Returns True if the deletion was started by deleting recipes. In that
+    case, there is no point in updating the recipes that are being deleted."""
+    if isinstance(origin, QuerySet):
+        return origin.model is Recipe
+
+    return isinstance(origin, Recipe)
+
+
+_pending = threading.local()
+
+
+def schedule_computed_duration_update(recipe_pk):
+    """Recalculates the computed duration of the recipe once the current
+    transaction commits, or right away outside of a transaction. The steps
+    saved one by one in a transaction, e.g. by the admin inlines, then cost
+    a single query."""
+    if not hasattr(_pending, 'recipe_pks'):
+        _pending.recipe_pks = set()
+
+    _pending.recipe_pks.add(recipe_pk)
+    # See recipy.search.schedule_search_document_update
+    transaction.on_commit(_update_pending_computed_durations)
+
+
+def _update_pending_computed_durations():
+    recipe_pks = _pending.recipe_pks
+    _pending.recipe_pks = set()
+    if recipe_pks:
+        Recipe.objects.filter(pk__in=recipe_pks).update_computed_durations()
+        # The cards show the duration
+        card_cache = RecipeCardCache()
+        for recipe_pk in recipe_pks:
+            card_cache.invalidate(recipe_pk)
+
+
+@receiver(post_save, sender=Step)
+@receiver(post_delete, sender=Step)
+def update_recipe_duration_on_step_change(sender, instance, origin=None,
+                                          **kwargs):
+    if is_recipe_cascade(origin):
+        return
+
+    schedule_computed_duration_update(instance.recipe_id)
+
+
+@receiver(recipe_children_changed)
+def update_recipe_duration_on_children_change(sender, recipe, **kwargs):
+    recipe.update_computed_duration()
+
+
+@receiver(pre_save, sender=Recipe)
+def mark_recipe_image_pending(sender, instance, **kwargs):
+    """Until the new image is processed, the recipe is shown with a
+    placeholder image. Saved together with the recipe."""
+    if instance.image_has_changed():
+        instance.image_status = Recipe.ImageStatus.PENDING \
+            if instance.image else Recipe.ImageStatus.READY
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_image_processing(sender, instance, **kwargs):
+    """The image is processed in the background (see recipy.tasks) so that the
+    request can return as soon as the original is stored. The job also
+    deletes the renditions of the replaced image and updates the image
+    size, so it's scheduled when the image is removed too."""
+    if instance.image_has_changed():
+        enqueue('process_recipe_image', recipe_id=instance.pk,
+                image_name=instance.image.name or '')
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image_renditions(sender, instance, **kwargs):
+    delete_renditions(instance.image_renditions)
+
+
+@receiver(post_delete, sender=RecipeImport)
+def delete_recipe_import_file(sender, instance, **kwargs):
+    # The file of an unfinished import, e.g. of a deleted user
+    if instance.file:
+        instance.file.delete(save=False)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_recipe_usage(sender, instance, created, **kwargs):
+    # Saves adjust_usage from creating the usage with the first recipe
+    if created:
+        RecipeUsage.objects.bulk_create(
+            [RecipeUsage(user=instance)], ignore_conflicts=True
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def update_usage_on_recipe_save(sender, instance, created, **kwargs):
+    # The image bytes are counted when the image is processed, see
+    # recipy.tasks.process_recipe_image
+    if created:
+        adjust_usage(instance.user_id, recipes=1)
+
+
+@receiver(post_delete, sender=Recipe)
+def update_usage_on_recipe_delete(sender, instance, **kwargs):
+    adjust_usage(instance.user_id, recipes=-1,
+                 image_bytes=-instance.image_size)
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_document_on_recipe_save(sender, instance, **kwargs):
+    schedule_search_document_update(instance.pk)
+
+
+@receiver(post_save, sender=Step)
+@receiver(post_delete, sender=Step)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def update_search_document_on_child_change(sender, instance, origin=None,
+                                           **kwargs):
+    if is_recipe_cascade(origin):
+        return
+
+    schedule_search_document_update(instance.recipe_id)
+
+
+@receiver(recipe_children_changed)
+def update_search_document_on_children_change(sender, recipe, **kwargs):
+    schedule_search_document_update(recipe.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def update_ingredient_terms_on_ingredient_change(sender, instance,
+                                                 origin=None, **kwargs):
+    if is_recipe_cascade(origin):
+        return
+
+    schedule_ingredient_terms_update(instance.recipe_id)
+
+
+@receiver(post_save, sender=Step)
+@receiver(post_delete, sender=Step)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def touch_recipe_on_child_change(sender, instance, origin=None, **kwargs):
+    if is_recipe_cascade(origin):
+        return
+
+    Recipe.objects.filter(pk=instance.recipe_id).touch()
+
+
+@receiver(recipe_children_changed)
+def touch_recipe_on_children_change(sender, recipe, **kwargs):
+    Recipe.objects.filter(pk=recipe.pk).touch()
+
+
+@receiver(post_save, sender=Recipe)
+def record_change_on_recipe_save(sender, instance, created, **kwargs):
+    if created:
+        record_recipe_change(instance, RecipeChange.Action.CREATED,
+                             was_public=False)
+    else:
+        # Unknown if the visibility wasn't loaded, in that case the other
+        # users are told about the change in any case
+        was_public = getattr(instance, '_loaded_is_public', None) is not False
+        record_recipe_change(instance, was_public=was_public)
+    instance._loaded_is_public = instance.is_public
+
+
+@receiver(post_delete, sender=Recipe)
+def record_change_on_recipe_delete(sender, instance, **kwargs):
+    record_recipe_change(instance, RecipeChange.Action.DELETED)
+
+
+@receiver(post_save, sender=Step)
+@receiver(post_delete, sender=Step)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def record_change_on_child_change(sender, instance, origin=None, **kwargs):
+    if is_recipe_cascade(origin):
+        return
+
+    record_recipe_changes([instance.recipe_id])
+
+
+@receiver(recipe_children_changed)
+def record_change_on_children_change(sender, recipe, **kwargs):
+    record_recipe_change(recipe)
+
+
+# The card cache handlers are connected last so that the cards are invalidated
+# after all the denormalized data shown on them is updated.
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_card_on_recipe_change(sender, instance, **kwargs):
+    RecipeCardCache().invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Step)
+@receiver(post_delete, sender=Step)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_recipe_card_on_child_change(sender, instance, origin=None,
+                                           **kwargs):
+    if is_recipe_cascade(origin):
+        return
+
+    RecipeCardCache().invalidate(instance.recipe_id)
+
+
+@receiver(recipe_children_changed)
+def invalidate_recipe_card_on_children_change(sender, recipe, **kwargs):
+    RecipeCardCache().invalidate(recipe.pk)
@@ -0,0 +1,28 @@
+// Closure - no need to expose any of these functions globally.
+(() => {
+    /**
+     * Button which loads the next page of a paginated list in place.
+     *
+     * The button needs to be inside a container with the "load-more" class.
+     * When clicked, the container is replaced with the HTML returned from the
+     * URL in the data-fragment-url attribute. That HTML contains the next
+     * page and, if there is one, a new "load more" button.
+     *
+     * The href of the button is used as a fallback when JavaScript is
+     * disabled.
+     */
+    $(document).on('click', '.load-more-btn', function (e) {
+        e.preventDefault();
+
+        const button = $(e.currentTarget);
+        const fragmentUrl = button.attr('data-fragment-url');
+        if (!fragmentUrl) {
+            throw new Error('data-fragment-url not set on the element!');
+        }
+
+        button.addClass('disabled');
+        $.get(fragmentUrl)
+            .done((html) => button.closest('.load-more').replaceWith(html))
+            .fail(() => button.removeClass('disabled'));
+    });
+})();
@@ -0,0 +1,28 @@
+// Closure - no need to expose any of these functions globally.
+(() => {
+    /**
+     * Modal shared by several buttons, e.g. the delete confirmation modal
+     * of the recipe list (see render_delete_confirmation_modal).
+     *
+     * When the modal is opened by a button with the data-form-action
+     * attribute, the form of the modal is pointed at that URL and its submit
+     * button is enabled. The data-modal-title attribute, if set, replaces
+     * the title of the modal.
+     */
+    $(document).on('show.bs.modal', '.modal', function (e) {
+        const button = $(e.relatedTarget);
+        const formAction = button.attr('data-form-action');
+        if (!formAction) {
+            return;
+        }
+
+        const modal = $(e.currentTarget);
+        modal.find('form').attr('action', formAction);
+        modal.find('button[type="submit"]').prop('disabled', false);
+
+        const modalTitle = button.attr('data-modal-title');
+        if (modalTitle) {
+            modal.find('.modal-title').text(modalTitle);
+        }
+    });
+})();
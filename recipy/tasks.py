@@ -0,0 +1,129 @@
+import csv
+
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from recipy.changes import record_recipe_changes
+from recipy.imports import run_import
+from recipy.jobs import task, PermanentJobError
+from recipy.models import Recipe, RecipeImport
+from recipy.quotas import adjust_usage
+from recipy.utils.cache import RecipeCardCache
+from recipy.utils.images import (
+    normalize_image, generate_renditions, delete_renditions
+)
+
+
+def mark_recipe_image_failed(recipe_id, image_name):
+    Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_status=Recipe.ImageStatus.FAILED
+    )
+    RecipeCardCache().invalidate(recipe_id)
+
+
+def remove_recipe_image(recipe_id):
+    current_image = Recipe.objects.filter(
+        Q(image='') | Q(image=None), pk=recipe_id
+    )
+    old_image = current_image.values_list(
+        'user_id', 'image_size', 'image_renditions'
+    ).first()
+    if old_image is None:
+        return
+
+    user_pk, image_size, old_renditions = old_image
+    if current_image.update(image_renditions={}, image_size=0):
+        adjust_usage(user_pk, image_bytes=-image_size)
+        delete_renditions(old_renditions)
+
+
+@task('process_recipe_image', on_failure=mark_recipe_image_failed)
+def process_recipe_image(recipe_id, image_name):
+    """Validates and normalizes the uploaded image, generates its renditions
+    and deletes the ones of the replaced image. Scheduled when the image of a
+    recipe changes, image_name is empty if the image was removed."""
+    if not image_name:
+        remove_recipe_image(recipe_id)
+        return
+
+    # The image could have been replaced or removed since the job was created.
+    # In that case, there is a newer job or nothing to do.
+    current_image = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    if not current_image.update(image_status=Recipe.ImageStatus.PROCESSING):
+        return
+
+    try:
+        normalized_image_name = normalize_image(image_name)
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        raise PermanentJobError(f'Invalid image "{image_name}": {e}') from e
+
+    renditions = generate_renditions(normalized_image_name)
+
+    # The normalized image takes the place of the replaced one in the usage
+    user_pk, image_size, old_renditions = current_image.values_list(
+        'user_id', 'image_size', 'image_renditions'
+    ).first() or (None, 0, {})
+    normalized_image_size = default_storage.size(normalized_image_name)
+
+    updated = current_image.update(
+        image=normalized_image_name, image_renditions=renditions,
+        image_status=Recipe.ImageStatus.READY, updated=timezone.now(),
+        image_size=normalized_image_size,
+    )
+    if updated:
+        # Only now that the recipe points at the normalized copy, the upload
+        # can't be lost
+        default_storage.delete(image_name)
+        delete_renditions(old_renditions)
+        adjust_usage(user_pk, image_bytes=normalized_image_size - image_size)
+        record_recipe_changes([recipe_id])
+    else:
+        default_storage.delete(normalized_image_name)
+        delete_renditions(renditions)
+
+    RecipeCardCache().invalidate(recipe_id)
+
+
+def delete_import_file(import_id):
+    """The uploaded file contains private recipes, so it's kept only until
+    the import finishes."""
+    recipe_import = RecipeImport.objects.filter(pk=import_id)\
+        .exclude(file='').exclude(file=None).first()
+    if recipe_import is not None:
+        recipe_import.file.delete(save=False)
+        RecipeImport.objects.filter(pk=import_id).update(file=None)
+
+
+def mark_recipe_import_failed(import_id):
+    RecipeImport.objects.filter(pk=import_id).update(
+        status=RecipeImport.Status.FAILED
+    )
+    delete_import_file(import_id)
+
+
+@task('import_recipes', on_failure=mark_recipe_import_failed)
+def import_recipes(import_id):
+    """Imports the uploaded recipes file. A retried job resumes after the
+    checkpoint of the import."""
+    recipe_import = RecipeImport.objects.select_related('user')\
+        .filter(pk=import_id).first()
+    if recipe_import is None or \
+            recipe_import.status == RecipeImport.Status.SUCCEEDED:
+        return
+
+    try:
+        with recipe_import.file.open('rb') as f:
+            run_import(recipe_import, f)
+    except Exception as e:
+        RecipeImport.objects.filter(pk=import_id).update(
+            last_error=f'{e.__class__.__name__}: {e}'
+        )
+        # The file won't get any better by retrying
+        if isinstance(e, (UnicodeDecodeError, csv.Error)):
+            raise PermanentJobError(f'Invalid file: {e}') from e
+        raise
+
+    if recipe_import.status == RecipeImport.Status.SUCCEEDED:
+        delete_import_file(import_id)
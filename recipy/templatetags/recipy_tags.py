@@ -1,9 +1,18 @@
+from crispy_forms.utils import render_crispy_form
 from django import template
+from django.apps import apps
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.template.defaulttags import CsrfTokenNode
 from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
-from recipy.utils.templates import get_id_for_model_instance
+from recipy.models import Recipe
+from recipy.utils.images import RENDITION_FORMATS, get_srcset
+from recipy.utils.templates import get_id_for_model, get_id_for_model_instance
 
 register = template.Library()
 
@@ -13,19 +22,55 @@ def setting(setting_name):
     return getattr(settings, setting_name, '')
 
 
-@register.inclusion_tag('recipy/modal.html')
-def render_modal(model_instance, **kwargs):
+# The modal markup is built with format_html instead of inclusion tag
+# templates. The delete modal and button are rendered for every card of the
+# recipe list and rendering a template for each of them took most of the time
+# of rendering the cards.
+MODAL_HTML = (
+    '<div class="modal fade" id="{modal_id}" tabindex="-1" role="dialog" '
+    'aria-labelledby="#{modal_id}-label" aria-hidden="true">'
+    '<div class="modal-dialog {extra_modal_classes}" role="document">'
+    '<div class="modal-content">'
+    '<div class="modal-header">'
+    '<h5 class="modal-title" id="{modal_id}-label">{modal_title}</h5>'
+    '<button type="button" class="close" data-dismiss="modal" '
+    'aria-label="Close"><span aria-hidden="true">&times;</span></button>'
+    '</div>'
+    '<div class="modal-body">{form}{modal_text}</div>'
+    '<div class="modal-footer">'
+    '<button type="button" class="btn btn-secondary" data-dismiss="modal">'
+    '{close_btn_text}</button>'
+    '<button type="submit" class="btn btn-{submit_btn_color}" '
+    'form="{modal_id}-form"{submit_btn_disabled}>{submit_btn_text}</button>'
+    '</div>'
+    '</div>'
+    '</div>'
+    '</div>'
+)
+
+MODAL_BTN_HTML = (
+    '<{btn_element} role="button" class="{btn_classes}" data-toggle="modal" '
+    'data-target="#{modal_id}"{data}>{icon}{btn_text}</{btn_element}>'
+)
+
+
+@register.simple_tag(takes_context=True)
+def render_modal(context, model_instance, **kwargs):
     """Renders a modal (hidden) for a model instance.
 
     Args:
+        context: template context, the CSRF token is taken from it
         model_instance: instance of some model on which the operation is
             taking place
 
     Keyword Args:
+        modal_id: HTML id of the modal. By default, built from the model
+            instance and the action prefix.
         form_action: this is the URL that gets triggered when modal submit
             button is clicked. Modal submission submits a form. This form is
             by default empty (only contains CSRF field), but you can override
-            it using form kwarg.
+            it using form kwarg. An empty string renders the form without the
+            action, e.g. for a script to set it.
         action_prefix: used in building the modal HTML id. If you have
             multiple modals for the same model instance, this should be used
             to differentiate the modals. By default, empty string.
@@ -41,23 +86,46 @@ def render_modal(model_instance, **kwargs):
         extra_modal_classes: HTML classes that will be added to the main
             modal div
     """
-    model_verbose_name = model_instance._meta.verbose_name
-
-    # Set default values
-    action_prefix = kwargs.setdefault('action_prefix', '')
-    kwargs.setdefault('modal_title', model_verbose_name)
-    kwargs.setdefault('submit_btn_color', 'primary')
-    kwargs.setdefault('submit_btn_text', _('OK'))
-    kwargs.setdefault('submit_btn_disabled', False)
-
-    # Set required values
-    modal_id = get_id_for_model_instance(model_instance, action_prefix)
-    kwargs.update(modal_id=modal_id)
+    modal_id = kwargs.get('modal_id') or get_id_for_model_instance(
+        model_instance, kwargs.get('action_prefix', '')
+    )
 
-    return kwargs
+    form_html = ''
+    form_action = kwargs.get('form_action')
+    if form_action is not None:
+        form = kwargs.get('form')
+        if form:
+            fields_html = render_crispy_form(form, context=context)
+        else:
+            fields_html = CsrfTokenNode().render(context)
+
+        action_html = ''
+        if form_action:
+            action_html = format_html(' action="{}"', form_action)
+
+        form_html = format_html(
+            '<form id="{}-form" method="post"{}>{}</form>',
+            modal_id, action_html, fields_html,
+        )
+
+    return format_html(
+        MODAL_HTML,
+        modal_id=modal_id,
+        extra_modal_classes=kwargs.get('extra_modal_classes', ''),
+        modal_title=kwargs.get('modal_title',
+                               model_instance._meta.verbose_name),
+        form=form_html,
+        modal_text=kwargs.get('modal_text', ''),
+        close_btn_text=_('Close'),
+        submit_btn_color=kwargs.get('submit_btn_color') or 'primary',
+        submit_btn_disabled=mark_safe(
+            ' disabled' if kwargs.get('submit_btn_disabled') else ''
+        ),
+        submit_btn_text=kwargs.get('submit_btn_text', _('OK')),
+    )
 
 
-@register.inclusion_tag('recipy/modal_btn.html')
+@register.simple_tag
 def show_modal_btn(model_instance, **kwargs):
     """Shows a button which displays the modal. You need to render the modal
     somewhere in order to be able to use this button.
@@ -80,51 +148,127 @@ def show_modal_btn(model_instance, **kwargs):
         btn_classes: classes that will be added on the button (<a>)
             element. By default, 'btn'.
         btn_element: button HTML attribute, by default 'a' (<a>)
+        modal_id: HTML id of the modal. By default, built from the model
+            instance and the action prefix.
+        data: dictionary of data-* attributes of the button, e.g. for a script
+            which fills in a modal shared by several buttons
     """
-    # Set default values
-    action_prefix = kwargs.setdefault('action_prefix', '')
-    btn_small = kwargs.setdefault('btn_small', True)
-    btn_color = kwargs.setdefault('btn_color', 'primary')
-    kwargs.setdefault('btn_text', '')
+    btn_classes = kwargs.get('btn_classes')
+    if btn_classes is None:
+        # Sometimes, <a> has left margin of 5, so we remove that. Also,
+        # sometimes, the text is gray instead of white so we force white text.
+        btn_classes = f'btn btn-{kwargs.get("btn_color", "primary")} ml-0 '
+        btn_classes += 'text-white'
+        if kwargs.get('btn_small', True):
+            btn_classes += ' btn-sm'
+
+    modal_id = kwargs.get('modal_id') or get_id_for_model_instance(
+        model_instance, kwargs.get('action_prefix', '')
+    )
 
-    # Sometimes, <a> has left margin of 5, so we remove that. Also, sometimes,
-    # the text is gray instead of white so we force white text.
-    btn_classes = f'btn btn-{btn_color} ml-0 text-white '
-    if btn_small:
-        btn_classes += 'btn-sm '
-    kwargs.setdefault('btn_classes', btn_classes)
-    kwargs.setdefault('btn_element', 'a')
+    data_html = format_html_join(
+        '', ' data-{}="{}"', (kwargs.get('data') or {}).items()
+    )
 
-    # Set required values
-    modal_id = get_id_for_model_instance(model_instance, action_prefix)
-    kwargs.update(modal_id=modal_id)
+    icon_html = ''
+    if kwargs.get('btn_fa_icon_class'):
+        icon_html = format_html('<i class="fa {}"></i>',
+                                kwargs['btn_fa_icon_class'])
+
+    return format_html(
+        MODAL_BTN_HTML,
+        btn_element=kwargs.get('btn_element', 'a'),
+        btn_classes=btn_classes,
+        modal_id=modal_id,
+        data=data_html,
+        icon=icon_html,
+        btn_text=kwargs.get('btn_text', ''),
+    )
 
-    return kwargs
 
+@register.simple_tag(takes_context=True)
+def render_delete_confirmation_modal(context, model):
+    """Renders the delete confirmation modal shared by all the instances of
+    the model. The buttons of show_delete_confirmation_modal_btn fill in the
+    URL of the deleted instance when the modal is shown (see
+    recipy/static/recipy/js/modal_form_action.js), so a page needs a single
+    modal no matter how many instances it lists.
+
+    Args:
+        context: template context, the CSRF token is taken from it
+        model: model class, instance or label, e.g. 'recipy.Recipe'
+    """
+    if isinstance(model, str):
+        model = apps.get_model(model)
 
-@register.inclusion_tag('recipy/modal.html')
-def render_delete_confirmation_modal(model_instance, form_action):
     modal_title = \
         _('Are you sure you want to delete this %(model_name)s?') % \
-        {'model_name': model_instance._meta.verbose_name}
+        {'model_name': model._meta.verbose_name}
 
+    # The submit button is enabled once the form action is filled in
     return render_modal(
-        model_instance, form_action=form_action, action_prefix='confirm-delete',
+        context, model, form_action='',
+        modal_id=get_id_for_model(model, 'confirm-delete'),
         modal_title=modal_title,
         modal_text=_('Deleting is a permanent action. Are you sure?'),
         submit_btn_color='danger', submit_btn_text=_('Delete'),
+        submit_btn_disabled=True,
     )
 
 
-@register.inclusion_tag('recipy/modal_btn.html')
-def show_delete_confirmation_modal_btn(model_instance, btn_text=''):
+@register.simple_tag
+def show_delete_confirmation_modal_btn(model_instance, form_action,
+                                       btn_text=''):
+    """Shows a button which opens the delete confirmation modal of the model
+    (see render_delete_confirmation_modal) for the instance.
+
+    Args:
+        model_instance: deleted instance
+        form_action: URL of the view which deletes the instance, e.g. a
+            DirectDeleteView
+        btn_text: text of the button. Empty by default
+    """
     return show_modal_btn(
-        model_instance, action_prefix='confirm-delete',
-        btn_text=btn_text, btn_color='danger',
-        btn_fa_icon_class='fa-trash'
+        model_instance, btn_text=btn_text, btn_color='danger',
+        btn_fa_icon_class='fa-trash',
+        modal_id=get_id_for_model(model_instance, 'confirm-delete'),
+        data={
+            'form-action': form_action,
+            'modal-title':
+                _('Are you sure you want to delete "%(object)s"?') %
+                {'object': model_instance},
+        },
     )
 
 
+@register.simple_tag(takes_context=True)
+def recipe_list_page_url(context, section, cursor, fragment=False):
+    """Returns the URL of the recipe list with the section at the cursor.
+    The cursors of the other sections are kept from the current request, so
+    loading more recipes of one section doesn't reset the others.
+
+    Args:
+        context: template context, the request is taken from it
+        section: recipe list section, e.g. 'user'
+        cursor: cursor of the page of the section
+        fragment: whether to return the URL of only the cards of the
+            section, see RecipeListMoreView
+    """
+    query = context['request'].GET.copy()
+    for key in ('section', 'cursor', f'{section}_cursor'):
+        query.pop(key, None)
+
+    if fragment:
+        url = reverse('recipy:recipes-list-more')
+        query['section'] = section
+        query['cursor'] = cursor
+    else:
+        url = reverse('recipy:recipes-list')
+        query[f'{section}_cursor'] = cursor
+
+    return f'{url}?{query.urlencode()}'
+
+
 @register.simple_tag
 def element_id(element_name):
     elements = {
@@ -159,3 +303,50 @@ def recipe_image_url(recipe):
         return recipe.image.url
     else:
         return static('recipy/img/recipe.jpg')
+
+
+@register.simple_tag
+def recipe_picture(recipe, alt='', css_class='', sizes=None):
+    """Renders the recipe image as a <picture> element which lets the browser
+    choose the smallest rendition that fits (see RECIPY_IMAGE_RENDITIONS).
+    Falls back to a plain <img> if the recipe has no renditions. While the
+    image is being processed, a placeholder is shown.
+
+    Args:
+        recipe: recipe whose image is shown
+        alt: alternative text of the image
+        css_class: classes added to the <img> element
+        sizes: value of the sizes attribute. By default, the one in the
+            RECIPY_IMAGE_RENDITIONS setting.
+    """
+    # Until the processing finishes, the renditions can be the ones of the
+    # replaced or removed image
+    renditions = recipe.image_renditions if recipe.image and \
+        recipe.image_status == Recipe.ImageStatus.READY else {}
+    if not renditions:
+        if recipe.image and recipe.image_status != Recipe.ImageStatus.READY:
+            image_url = static('recipy/img/recipe.jpg')
+        else:
+            image_url = recipe_image_url(recipe)
+
+        return format_html(
+            '<img class="{}" src="{}" alt="{}" loading="lazy">',
+            css_class, image_url, alt,
+        )
+
+    sizes = sizes or settings.RECIPY_IMAGE_RENDITIONS['sizes']
+
+    # The largest JPEG is the fallback for browsers without srcset support
+    jpeg_renditions = renditions['jpeg']
+    largest_width = max(jpeg_renditions, key=int)
+    fallback_url = default_storage.url(jpeg_renditions[largest_width])
+
+    return format_html(
+        '<picture>'
+        '<source type="{}" srcset="{}" sizes="{}">'
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" alt="{}" '
+        'loading="lazy">'
+        '</picture>',
+        RENDITION_FORMATS['webp'][1], get_srcset(renditions, 'webp'), sizes,
+        css_class, fallback_url, get_srcset(renditions, 'jpeg'), sizes, alt,
+    )
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from recipy.forms import RecipeForm
+from recipy.models import Recipe, Step, Ingredient
+
+
+class RecipeUpdatedTests(TestCase):
+
+    def setUp(self):
+        self.recipe = baker.make(Recipe)
+        self.old = timezone.now() - timedelta(days=1)
+        Recipe.objects.update(updated=self.old)
+
+    def assertTouched(self):
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated, self.old)
+
+    def test_touched_on_step_change(self):
+        step = baker.make(Step, recipe=self.recipe)
+        self.assertTouched()
+
+        Recipe.objects.update(updated=self.old)
+        step.delete()
+        self.assertTouched()
+
+    def test_touched_on_ingredient_change(self):
+        baker.make(Ingredient, recipe=self.recipe)
+        self.assertTouched()
+
+    def test_touched_on_bulk_save(self):
+        form = RecipeForm(user=self.recipe.user, instance=self.recipe, data={
+            'title': self.recipe.title,
+            'steps-TOTAL_FORMS': 0, 'steps-INITIAL_FORMS': 0,
+            'ingredients-TOTAL_FORMS': 1, 'ingredients-INITIAL_FORMS': 0,
+            'ingredients-0-name': 'Eggs',
+        })
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertTouched()
+
+
+@override_settings(RECIPY_RECIPES_PER_PAGE=2)
+class RecipeApiTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.other_user = baker.make(get_user_model())
+        self.client.force_login(self.user)
+
+        self.recipe = baker.make(Recipe, user=self.user, title='Pancakes')
+        baker.make(Step, recipe=self.recipe, name='Mix')
+        baker.make(Ingredient, recipe=self.recipe, name='Eggs')
+        self.public_recipe = baker.make(
+            Recipe, user=self.other_user, is_public=True
+        )
+        self.private_recipe = baker.make(Recipe, user=self.other_user)
+
+    def test_list(self):
+        url = reverse('recipy:api-recipes-list')
+        response = self.client.get(url)
+        data = response.json()
+
+        self.assertEqual(
+            {self.recipe.pk, self.public_recipe.pk},
+            {recipe['id'] for recipe in data['results']},
+        )
+        self.assertIsNone(data['next_cursor'])
+
+        response = self.client.get(url, {'scope': 'mine'})
+        self.assertEqual(['Pancakes'],
+                         [r['title'] for r in response.json()['results']])
+        pancakes = response.json()['results'][0]
+        self.assertEqual('Mix', pancakes['steps'][0]['name'])
+        self.assertEqual('Eggs', pancakes['ingredients'][0]['name'])
+
+    def test_list_pagination(self):
+        baker.make(Recipe, user=self.user, _quantity=2)
+        url = reverse('recipy:api-recipes-list')
+
+        first_page = self.client.get(url).json()
+        second_page = self.client.get(
+            url, {'cursor': first_page['next_cursor']}
+        ).json()
+
+        self.assertEqual(2, len(first_page['results']))
+        self.assertEqual(2, len(second_page['results']))
+        self.assertIsNone(second_page['next_cursor'])
+
+        response = self.client.get(url, {'cursor': 'invalid'})
+        self.assertEqual(400, response.status_code)
+
+    def test_list_not_modified(self):
+        url = reverse('recipy:api-recipes-list')
+        etag = self.client.get(url)['ETag']
+
+        # The page with the timestamps, the session and the user are cached
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+
+        baker.make(Step, recipe=self.recipe)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+    def test_detail(self):
+        url = reverse('recipy:api-recipe-detail', args=(self.recipe.pk,))
+        response = self.client.get(url)
+
+        self.assertEqual('Pancakes', response.json()['title'])
+        self.assertIn('private', response['Cache-Control'])
+
+        # The recipe with the timestamp, the session and the user are cached
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(304, response.status_code)
+
+    def test_detail_access(self):
+        response = self.client.get(reverse(
+            'recipy:api-recipe-detail', args=(self.public_recipe.pk,)
+        ))
+        self.assertEqual(200, response.status_code)
+
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse(
+                'recipy:api-recipe-detail', args=(self.private_recipe.pk,)
+            ))
+        self.assertEqual(403, response.status_code)
+
+        self.client.logout()
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse('recipy:api-recipes-list'))
+        self.assertEqual(403, response.status_code)
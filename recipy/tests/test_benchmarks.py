@@ -0,0 +1,105 @@
+from importlib.util import find_spec
+from unittest import skipUnless
+
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from recipy.benchmarks.concurrency import (
+    READ_SCENARIOS, ASGIServerRunner, SlowClients, WSGIServerRunner,
+    make_session_cookie, run_load,
+)
+from recipy.benchmarks.datasets import DatasetConfig, seed_dataset
+from recipy.benchmarks.runner import (
+    SCENARIOS, ClientDriver, ScenarioResult, compare_with_baseline,
+    run_scenario,
+)
+from recipy.models import Recipe, Step
+
+
+@override_settings(RECIPY_VIEW_METRICS={
+    'enabled': True, 'buffer_size': 10, 'slow_request_ms': None,
+})
+class BenchmarkTests(TestCase):
+
+    def test_seed_dataset(self):
+        dataset = seed_dataset(DatasetConfig(users=2, recipes=5, children=3))
+
+        self.assertEqual(2, len(dataset.users))
+        self.assertEqual(5, Recipe.objects.count())
+        self.assertEqual(15, Step.objects.count())
+        # The denormalized data is built as well
+        self.assertFalse(
+            Recipe.objects.filter(computed_duration_minutes=None).exists()
+        )
+        self.assertFalse(
+            Recipe.objects.filter(search_document=None).exists()
+        )
+
+    def test_scenarios(self):
+        dataset = seed_dataset(DatasetConfig(users=1, recipes=3, children=2))
+        user = dataset.users[0]
+        context = {
+            'children': 2,
+            'recipe_pks': dataset.recipe_pks,
+            'own_recipe_pks': dataset.recipe_pks,
+        }
+
+        driver = ClientDriver(user)
+        for scenario in SCENARIOS:
+            with self.subTest(scenario=scenario.name):
+                result = run_scenario(driver, scenario, context, requests=2)
+
+                self.assertEqual(2, result.requests)
+                self.assertGreater(result.queries, 0)
+                self.assertGreaterEqual(result.p99_ms, result.p50_ms)
+
+    def test_compare_with_baseline(self):
+        baseline = {
+            'client:list': {'queries': 4, 'p95_ms': 10},
+            'client:detail': {'queries': 5, 'p95_ms': 10},
+        }
+        results = {
+            'client:list': ScenarioResult(10, 100, 5, 12, 12, queries=4),
+            'client:detail': ScenarioResult(10, 100, 5, 13, 13, queries=6),
+            # Not in the baseline
+            'client:create': ScenarioResult(10, 100, 5, 10, 10, queries=20),
+        }
+
+        regressions = compare_with_baseline(results, baseline, tolerance=0.25)
+
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(all(
+            regression.startswith('client:detail')
+            for regression in regressions
+        ))
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+
+    def setUp(self):
+        dataset = seed_dataset(DatasetConfig(users=1, recipes=3, children=1))
+        self.context = {'recipe_pks': dataset.recipe_pks}
+        self.cookie = make_session_cookie(dataset.users[0])
+        self.scenario = READ_SCENARIOS[0]
+
+    def run_load(self, server_class, slow_clients):
+        server = server_class(threads=1)
+        self.addCleanup(server.close)
+        clients = SlowClients(server.port, slow_clients)
+        self.addCleanup(clients.close)
+
+        return run_load(server.port, self.cookie, self.scenario, self.context,
+                        clients=1, duration=0.5, timeout=0.5)
+
+    def test_wsgi_server_is_blocked_by_slow_clients(self):
+        result = self.run_load(WSGIServerRunner, slow_clients=1)
+
+        self.assertEqual(0, result.requests)
+        self.assertGreater(result.errors, 0)
+
+    @skipUnless(find_spec('uvicorn'), 'uvicorn is not installed.')
+    def test_asgi_server_is_not_blocked_by_slow_clients(self):
+        result = self.run_load(ASGIServerRunner, slow_clients=1)
+
+        self.assertGreater(result.requests, 0)
+        self.assertEqual(0, result.errors)
@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import translation
+from model_bakery import baker
+
+from recipy.models import Recipe, Step, Ingredient
+from recipy.utils.cache import RecipeCardCache, render_recipe_cards
+
+
+class RecipeCardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.recipe = baker.make(Recipe, title='Pancakes', is_public=True)
+
+    def render_card(self, variant=RecipeCardCache.PUBLIC):
+        recipe = Recipe.objects.select_related('user').get(pk=self.recipe.pk)
+        [(_, card)] = render_recipe_cards([recipe], variant)
+        return card
+
+    def test_cards_are_cached(self):
+        self.render_card()
+        self.render_card()
+
+        self.assertEqual(
+            {'hits': 1, 'misses': 1}, RecipeCardCache().get_stats()
+        )
+
+    def test_variants_are_cached_separately(self):
+        owner_card = self.render_card(RecipeCardCache.OWNER)
+        public_card = self.render_card(RecipeCardCache.PUBLIC)
+
+        self.assertIn('fa-edit', owner_card)
+        self.assertNotIn('fa-edit', public_card)
+        self.assertEqual(
+            {'hits': 0, 'misses': 2}, RecipeCardCache().get_stats()
+        )
+
+    def test_languages_are_cached_separately(self):
+        self.render_card()
+        with translation.override('de'):
+            self.render_card()
+
+        self.assertEqual(
+            {'hits': 0, 'misses': 2}, RecipeCardCache().get_stats()
+        )
+
+    def test_invalidated_on_recipe_change(self):
+        self.render_card()
+
+        self.recipe.title = 'Waffles'
+        self.recipe.save()
+
+        self.assertIn('Waffles', self.render_card())
+
+    def test_recipe_changed_after_loading_is_not_cached_stale(self):
+        stale_recipe = Recipe.objects.select_related('user')\
+            .get(pk=self.recipe.pk)
+        self.recipe.title = 'Waffles'
+        self.recipe.save()
+
+        [(_, card)] = render_recipe_cards(
+            [stale_recipe], RecipeCardCache.PUBLIC
+        )
+
+        self.assertIn('Waffles', card)
+        self.assertIn('Waffles', self.render_card())
+
+    def test_deleted_recipe_is_not_cached(self):
+        recipe = Recipe.objects.select_related('user').get(pk=self.recipe.pk)
+        Recipe.objects.filter(pk=self.recipe.pk).delete()
+
+        [(_, card)] = render_recipe_cards([recipe], RecipeCardCache.PUBLIC)
+
+        self.assertIn('Pancakes', card)
+        self.assertEqual(
+            {}, RecipeCardCache().get_many(
+                [recipe.pk], RecipeCardCache.PUBLIC, translation.get_language()
+            )
+        )
+
+    def test_invalidated_on_step_and_ingredient_changes(self):
+        self.render_card()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            step = baker.make(Step, recipe=self.recipe, duration_minutes=42)
+        self.assertIn('42', self.render_card())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            step.delete()
+        self.assertNotIn('42', self.render_card())
+
+        baker.make(Ingredient, recipe=self.recipe)
+        self.render_card()
+
+        self.assertEqual(
+            {'hits': 0, 'misses': 4}, RecipeCardCache().get_stats()
+        )
+
+    def test_reset_stats(self):
+        self.render_card()
+        RecipeCardCache().reset_stats()
+
+        self.assertEqual(
+            {'hits': 0, 'misses': 0}, RecipeCardCache().get_stats()
+        )
+
+    def test_recipe_list_uses_cache(self):
+        user = baker.make(get_user_model())
+        baker.make(Recipe, user=user)
+        self.client.force_login(user)
+
+        self.client.get(reverse('recipy:recipes-list'))
+        response = self.client.get(reverse('recipy:recipes-list'))
+
+        self.assertContains(response, 'Pancakes')
+        self.assertEqual(
+            {'hits': 2, 'misses': 2}, RecipeCardCache().get_stats()
+        )
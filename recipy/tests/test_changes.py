@@ -0,0 +1,168 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_bakery import baker
+
+from recipy.changes import get_recipe_changes
+from recipy.models import Recipe, Step, Ingredient, RecipeChange
+from recipy.utils.purge import delete_recipes_in_bulk
+
+
+class RecipeChangeTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.other_user = baker.make(get_user_model())
+        self.recipe = baker.make(Recipe, user=self.user, is_public=True)
+
+    def get_actions(self, user, since=0):
+        changes, _, _ = get_recipe_changes(user, since)
+        return [(change.recipe_pk, change.action) for change in changes]
+
+    def test_changes_are_recorded(self):
+        since = RecipeChange.objects.latest('pk').pk
+
+        step = baker.make(Step, recipe=self.recipe)
+        baker.make(Ingredient, recipe=self.recipe)
+        step.delete()
+
+        self.assertEqual(
+            [RecipeChange.Action.UPDATED] * 3,
+            list(RecipeChange.objects.filter(pk__gt=since)
+                 .values_list('action', flat=True))
+        )
+        # Only the latest change of a recipe is returned
+        self.assertEqual(
+            [(self.recipe.pk, RecipeChange.Action.UPDATED)],
+            self.get_actions(self.user, since)
+        )
+
+    def test_create(self):
+        since = RecipeChange.objects.latest('pk').pk
+        recipe = baker.make(Recipe, user=self.user, is_public=True)
+        self.assertEqual(
+            [(recipe.pk, RecipeChange.Action.CREATED)],
+            self.get_actions(self.other_user, since)
+        )
+
+        # Still new to a client which syncs after the update
+        recipe.save()
+        self.assertEqual(
+            [(recipe.pk, RecipeChange.Action.CREATED)],
+            self.get_actions(self.user, since)
+        )
+        since = RecipeChange.objects.latest('pk').pk
+        recipe.save()
+        self.assertEqual(
+            [(recipe.pk, RecipeChange.Action.UPDATED)],
+            self.get_actions(self.user, since)
+        )
+
+    def test_delete(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('recipy:recipe-delete',
+                                 args=(self.recipe.pk,)))
+
+        self.assertFalse(Recipe.objects.exists())
+        for user in (self.user, self.other_user):
+            self.assertEqual(
+                [(self.recipe.pk, RecipeChange.Action.DELETED)],
+                self.get_actions(user)
+            )
+
+    def test_bulk_delete(self):
+        delete_recipes_in_bulk([self.recipe.pk])
+
+        self.assertEqual(
+            [(self.recipe.pk, RecipeChange.Action.DELETED)],
+            self.get_actions(self.other_user)
+        )
+
+    def test_visibility(self):
+        private_recipe = baker.make(Recipe, user=self.user)
+        self.assertEqual([self.recipe.pk, private_recipe.pk],
+                         [pk for pk, _ in self.get_actions(self.user)])
+        self.assertEqual([self.recipe.pk],
+                         [pk for pk, _ in self.get_actions(self.other_user)])
+
+        # The other users have to drop the recipe which isn't public anymore
+        since = RecipeChange.objects.latest('pk').pk
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.is_public = False
+        recipe.save()
+
+        self.assertEqual(
+            [(self.recipe.pk, RecipeChange.Action.DELETED)],
+            self.get_actions(self.other_user, since)
+        )
+        self.assertEqual(
+            [(self.recipe.pk, RecipeChange.Action.UPDATED)],
+            self.get_actions(self.user, since)
+        )
+
+        # Later changes of the private recipe are hidden
+        since = RecipeChange.objects.latest('pk').pk
+        recipe.save()
+        self.assertEqual([], self.get_actions(self.other_user, since))
+
+        # The recipe is new to the other users once it's public again
+        recipe.is_public = True
+        recipe.save()
+        self.assertEqual(
+            [(self.recipe.pk, RecipeChange.Action.CREATED)],
+            self.get_actions(self.other_user, since)
+        )
+        self.assertEqual(
+            [(self.recipe.pk, RecipeChange.Action.UPDATED)],
+            self.get_actions(self.user, since)
+        )
+
+
+@override_settings(RECIPY_CHANGES_PAGE_SIZE=2)
+class RecipeApiChangesTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.client.force_login(self.user)
+        self.url = reverse('recipy:api-recipe-changes')
+
+    def test_sync(self):
+        recipes = baker.make(Recipe, user=self.user, _quantity=3)
+
+        first_page = self.client.get(self.url).json()
+        self.assertEqual([recipe.pk for recipe in recipes[:2]],
+                         [change['id'] for change in first_page['changes']])
+        self.assertTrue(first_page['has_more'])
+        self.assertEqual(recipes[0].title,
+                         first_page['changes'][0]['recipe']['title'])
+        self.assertEqual({'created'}, {
+            change['action'] for change in first_page['changes']
+        })
+
+        second_page = self.client.get(
+            self.url, {'since': first_page['next_since']}
+        ).json()
+        self.assertEqual([recipes[2].pk],
+                         [change['id'] for change in second_page['changes']])
+        self.assertFalse(second_page['has_more'])
+
+        # Nothing changed since the last sync
+        since = second_page['next_since']
+        response = self.client.get(self.url, {'since': since}).json()
+        self.assertEqual([], response['changes'])
+        self.assertEqual(since, response['next_since'])
+
+        deleted_pk = recipes[1].pk
+        recipes[1].delete()
+        response = self.client.get(self.url, {'since': since}).json()
+        self.assertEqual(
+            [{'sequence': response['next_since'], 'id': deleted_pk,
+              'action': 'deleted', 'recipe': None}],
+            response['changes']
+        )
+
+    def test_invalid_since(self):
+        for since in ('invalid', '-1'):
+            with self.assertLogs('django.request', 'WARNING'):
+                response = self.client.get(self.url, {'since': since})
+            self.assertEqual(400, response.status_code)
@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command, CommandError
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from model_bakery import baker
+
+from accounts.models import RecipyUser
+from recipy.models import Recipe, Step, Ingredient, RecipeSearchDocument
+from recipy.tests.test_images import make_image_file
+
+
+class UpdateRecipeDurationsCommandTests(TestCase):
+
+    def setUp(self):
+        self.recipe = baker.make(Recipe)
+        baker.make(Step, recipe=self.recipe, duration_minutes=5, _quantity=2)
+        # Simulate drift caused by writes that bypass the signals
+        Recipe.objects.update(computed_duration_minutes=None)
+
+    def test_check_reports_outdated_durations(self):
+        with self.assertRaises(CommandError):
+            call_command('update_recipe_durations', '--check', stdout=StringIO())
+
+    def test_backfill(self):
+        call_command('update_recipe_durations', '--batch-size', '1',
+                     stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(10, self.recipe.computed_duration_minutes)
+        call_command('update_recipe_durations', '--check', stdout=StringIO())
+
+    def test_recipes_without_step_durations_are_up_to_date(self):
+        call_command('update_recipe_durations', stdout=StringIO())
+        baker.make(Recipe)
+        baker.make(Step, recipe=baker.make(Recipe), duration_minutes=None)
+
+        self.assertFalse(
+            Recipe.objects.with_outdated_computed_duration().exists()
+        )
+        call_command('update_recipe_durations', '--check', stdout=StringIO())
+
+
+class BenchmarkRecipeSaveCommandTests(TestCase):
+
+    def test_benchmark_leaves_no_data(self):
+        stdout = StringIO()
+        call_command('benchmark_recipe_save', '--rows', '3', '--repeat', '1',
+                     stdout=stdout)
+
+        self.assertIn('bulk', stdout.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BenchmarkCardRenderCommandTests(TestCase):
+
+    def test_benchmark(self):
+        stdout = StringIO()
+        call_command('benchmark_card_render', '--cards', '2', '--repeat', '1',
+                     stdout=stdout)
+
+        self.assertIn('cached', stdout.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_card_render', '--cards', '0',
+                         stdout=StringIO())
+
+
+class SeedRecipesCommandTests(TestCase):
+
+    def test_seed(self):
+        stdout = StringIO()
+        call_command('seed_recipes', '--recipes', '5', '--children', '2',
+                     '--users', '2', '--batch-size', '2', '--workers', '1',
+                     stdout=stdout)
+
+        self.assertIn('rows/s', stdout.getvalue())
+        self.assertEqual(5, Recipe.objects.count())
+        self.assertEqual(10, Step.objects.count())
+        self.assertEqual(10, Ingredient.objects.count())
+        self.assertEqual(5, RecipeSearchDocument.objects.count())
+        self.assertEqual(3, RecipyUser.objects.count())
+        self.assertFalse(
+            Recipe.objects.filter(computed_duration_minutes=None).exists()
+        )
+
+    def test_seed_reuses_users(self):
+        for _ in range(2):
+            call_command('seed_recipes', '--recipes', '1', '--users', '2',
+                         '--workers', '1', stdout=StringIO())
+
+        self.assertEqual(3, RecipyUser.objects.count())
+        self.assertEqual(2, Recipe.objects.count())
+
+    def test_seed_users_password(self):
+        call_command('seed_recipes', '--recipes', '1', '--users', '1',
+                     '--workers', '1', stdout=StringIO())
+        call_command('seed_recipes', '--recipes', '1', '--users', '2',
+                     '--users-password', 'secret', '--workers', '1',
+                     stdout=StringIO())
+
+        seed_users = RecipyUser.objects.filter(username__contains='-seed-')
+        self.assertFalse(
+            seed_users.get(username__endswith='-0').has_usable_password()
+        )
+        self.assertTrue(
+            seed_users.get(username__endswith='-1').check_password('secret')
+        )
+
+    def test_seed_with_sample_images(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        images_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, images_dir)
+        Path(images_dir, 'photo.jpg').write_bytes(make_image_file().read())
+
+        with override_settings(MEDIA_ROOT=media_root):
+            call_command('seed_recipes', '--recipes', '3', '--images',
+                         images_dir, '--workers', '1', stdout=StringIO())
+
+            image_names = set(Recipe.objects.values_list('image', flat=True))
+            self.assertEqual(1, len(image_names))
+            self.assertTrue(default_storage.exists(image_names.pop()))
+            self.assertFalse(
+                Recipe.objects.filter(image_renditions={}).exists()
+            )
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_recipes', '--images', '/nonexistent',
+                         stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('seed_recipes', '--recipes', '0', stdout=StringIO())
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_bakery import baker
+
+from recipy.export import export_recipes
+from recipy.models import Recipe, Step, Ingredient
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model(), username='cook')
+        self.other_user = baker.make(get_user_model())
+        self.recipe = baker.make(
+            Recipe, user=self.user, title='Pancakes', description='Fluffy',
+        )
+        baker.make(Ingredient, recipe=self.recipe, name='Flour', quantity=0.5,
+                   measure=Ingredient.Measure.KG)
+        baker.make(Step, recipe=self.recipe, name='Mix', duration_minutes=5)
+        baker.make(Recipe, user=self.other_user, is_public=True, _quantity=2)
+        baker.make(Recipe, user=self.other_user, is_public=False)
+
+    @staticmethod
+    def read(chunks):
+        return b''.join(chunks)
+
+    def test_jsonl(self):
+        # A chunk size smaller than the number of recipes
+        content = self.read(export_recipes(
+            Recipe.objects.all(), 'jsonl', chunk_size=2
+        ))
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(4, len(rows))
+        self.assertEqual(self.recipe.pk, rows[0]['id'])
+        self.assertEqual('cook', rows[0]['author'])
+        self.assertEqual(
+            [{'name': 'Flour', 'quantity': 0.5, 'measure': 'KG'}],
+            rows[0]['ingredients'],
+        )
+        self.assertEqual('Mix', rows[0]['steps'][0]['name'])
+
+    def test_csv(self):
+        content = self.read(export_recipes(
+            Recipe.objects.filter(user=self.user), 'csv'
+        ))
+
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(1, len(rows))
+        self.assertEqual('Pancakes', rows[0]['title'])
+        self.assertEqual('Flour', json.loads(rows[0]['ingredients'])[0]['name'])
+
+    def test_queries_per_chunk(self):
+        # A single query (cursor) for the recipes with their authors and a
+        # query for the ingredients and the steps of every chunk
+        with self.assertNumQueries(5):
+            self.read(export_recipes(
+                Recipe.objects.all(), 'jsonl', chunk_size=2
+            ))
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            export_recipes(Recipe.objects.all(), 'xml')
+
+    def test_zip_with_images(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            image_name = default_storage.save(
+                'uploads/pancakes.jpg', ContentFile(b'image')
+            )
+            Recipe.objects.filter(pk=self.recipe.pk).update(image=image_name)
+            # A missing image file is left out
+            baker.make(Recipe, user=self.user, image='uploads/missing.jpg')
+
+            content = self.read(export_recipes(
+                Recipe.objects.filter(user=self.user), 'jsonl',
+                include_images=True,
+            ))
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(
+                ['recipes.jsonl', image_name], archive.namelist()
+            )
+            self.assertEqual(b'image', archive.read(image_name))
+            rows = archive.read('recipes.jsonl').splitlines()
+            self.assertEqual(image_name, json.loads(rows[0])['image'])
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        url = reverse('recipy:recipe-export')
+
+        response = self.client.get(url)
+        self.assertEqual('application/jsonl', response['Content-Type'])
+        self.assertIn('recipes.jsonl', response['Content-Disposition'])
+        rows = self.read(response.streaming_content).splitlines()
+        self.assertEqual(1, len(rows))
+
+        response = self.client.get(url, {'format': 'csv', 'scope': 'public'})
+        rows = self.read(response.streaming_content).decode().splitlines()
+        # Header and the 2 public recipes, the private one is left out
+        self.assertEqual(3, len(rows))
+
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(url, {'format': 'xml'})
+        self.assertEqual(400, response.status_code)
+
+    def test_view_zip(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('recipy:recipe-export'), {'images': '1'}
+        )
+        self.assertEqual('application/zip', response['Content-Type'])
+        content = self.read(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(['recipes.jsonl'], archive.namelist())
+
+    def test_command(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        output = os.path.join(output_dir, 'recipes.csv')
+
+        call_command('export_recipes', output, '--public', '--format', 'csv',
+                     stdout=StringIO())
+
+        with open(output, newline='') as f:
+            self.assertEqual(2, len(list(csv.DictReader(f))))
+
+        with self.assertRaises(CommandError):
+            call_command('export_recipes', output, '--user', 'nobody',
+                         stdout=StringIO())
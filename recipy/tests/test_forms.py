@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from recipy.forms import RecipeForm
+from recipy.models import Recipe, Step, Ingredient
+
+
+def prepare_formset_data(prefix, forms_data, initial_forms_data=()):
+    """Initial forms have to include the ID of the object."""
+    all_forms_data = [*initial_forms_data, *forms_data]
+    formset_data = {
+        f'{prefix}-TOTAL_FORMS': len(all_forms_data),
+        f'{prefix}-INITIAL_FORMS': len(initial_forms_data),
+    }
+    for index, form_data in enumerate(all_forms_data):
+        for field_name, value in form_data.items():
+            formset_data[f'{prefix}-{index}-{field_name}'] = value
+
+    return formset_data
+
+
+def prepare_recipe_form_data(steps_data, ingredients_data,
+                             initial_steps_data=(),
+                             initial_ingredients_data=(), **recipe_data):
+    return {
+        'title': 'Recipe',
+        **recipe_data,
+        **prepare_formset_data('steps', steps_data, initial_steps_data),
+        **prepare_formset_data('ingredients', ingredients_data,
+                               initial_ingredients_data),
+    }
+
+
+class RecipeFormTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+
+    def save_form(self, data, instance=None):
+        form = RecipeForm(user=self.user, data=data, instance=instance)
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.save()
+
+    def count_create_queries(self, rows_count):
+        data = prepare_recipe_form_data(
+            [{'name': f'Step {i}', 'duration_minutes': 1}
+             for i in range(rows_count)],
+            [{'name': f'Ingredient {i}'} for i in range(rows_count)],
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.save_form(data)
+
+        return len(queries)
+
+    def test_create_query_count_is_constant(self):
+        self.assertEqual(
+            self.count_create_queries(2), self.count_create_queries(50)
+        )
+
+    def test_create(self):
+        recipe = self.save_form(prepare_recipe_form_data(
+            [{'name': 'Boil', 'duration_minutes': 5},
+             {'name': 'Serve', 'duration_minutes': 1}],
+            [{'name': 'Eggs'}],
+        ))
+
+        self.assertEqual(2, recipe.steps.count())
+        self.assertEqual(1, recipe.ingredients.count())
+        self.assertEqual(6, recipe.computed_duration_minutes)
+        self.assertEqual(
+            6, Recipe.objects.get(pk=recipe.pk).computed_duration_minutes
+        )
+
+    def test_update_saves_changed_rows_only(self):
+        recipe = baker.make(Recipe, user=self.user, title='Recipe')
+        steps = baker.make(Step, recipe=recipe, duration_minutes=5,
+                           description='', _quantity=2)
+        ingredient = baker.make(Ingredient, recipe=recipe, quantity=None,
+                                measure=None)
+
+        steps_data = [
+            {'id': step.pk, 'name': step.name, 'description': '',
+             'duration_minutes': 5}
+            for step in steps
+        ]
+        steps_data[1]['duration_minutes'] = 10
+        ingredients_data = [
+            {'id': ingredient.pk, 'name': ingredient.name}
+        ]
+
+        with mock.patch.object(Step.objects, 'bulk_update') as bulk_update:
+            with mock.patch.object(Ingredient.objects, 'bulk_update') \
+                    as ingredient_bulk_update:
+                self.save_form(prepare_recipe_form_data(
+                    [], [], initial_steps_data=steps_data,
+                    initial_ingredients_data=ingredients_data,
+                ), instance=recipe)
+
+        bulk_update.assert_called_once_with([mock.ANY], {'duration_minutes'})
+        self.assertEqual(steps[1].pk, bulk_update.call_args[0][0][0].pk)
+        ingredient_bulk_update.assert_not_called()
+
+    def test_save_is_atomic(self):
+        data = prepare_recipe_form_data(
+            [{'name': 'Boil'}], [{'name': 'Eggs'}]
+        )
+
+        with mock.patch.object(Ingredient.objects, 'bulk_create',
+                               side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.save_form(data)
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Step.objects.exists())
@@ -0,0 +1,259 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from model_bakery import baker
+from PIL import Image
+
+from recipy.models import Job, Recipe
+from recipy.tasks import process_recipe_image
+from recipy.utils.purge import delete_recipes_in_bulk
+
+
+def run_jobs():
+    call_command('run_jobs', '--burst', stdout=StringIO())
+
+
+def make_recipe_with_processed_image(**kwargs):
+    recipe = baker.make(Recipe, **kwargs)
+    run_jobs()
+    recipe.refresh_from_db()
+    return recipe
+
+
+def make_image_file(width=800, height=400, name='photo.jpg',
+                    color='orange'):
+    """Creates a JPEG image with EXIF data which says that the image needs to
+    be rotated by 90 degrees."""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    exif[0x010F] = 'Phone maker'  # Make
+
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(
+        buffer, 'JPEG', exif=exif.tobytes()
+    )
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(RECIPY_IMAGE_RENDITIONS={
+    'widths': (100, 200, 1000),
+    'quality': 80,
+    'sizes': '33vw',
+    'max_original_size': 600,
+})
+class ImageRenditionTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_image_processed_in_background(self):
+        recipe = baker.make(Recipe, image=make_image_file())
+        recipe.refresh_from_db()
+        self.assertEqual(Recipe.ImageStatus.PENDING, recipe.image_status)
+        self.assertEqual({}, recipe.image_renditions)
+
+        run_jobs()
+
+        recipe.refresh_from_db()
+        self.assertEqual(Recipe.ImageStatus.READY, recipe.image_status)
+        # 1000px is wider than the image (400px after rotating)
+        self.assertEqual({'100', '200'}, set(recipe.image_renditions['webp']))
+        self.assertEqual({'100', '200'}, set(recipe.image_renditions['jpeg']))
+
+        with default_storage.open(recipe.image_renditions['jpeg']['200']) as f:
+            with Image.open(f) as rendition:
+                # Rotated according to the EXIF orientation
+                self.assertEqual((200, 400), rendition.size)
+                self.assertEqual(0, len(rendition.getexif()))
+
+    def test_original_image_normalized(self):
+        recipe = make_recipe_with_processed_image(
+            image=make_image_file(1200, 300)
+        )
+
+        with default_storage.open(recipe.image.name) as f:
+            with Image.open(f) as image:
+                # Rotated and downsized to max_original_size
+                self.assertEqual((150, 600), image.size)
+                self.assertEqual(0, len(image.getexif()))
+
+    def test_upload_kept_until_normalized_image_saved(self):
+        recipe = baker.make(Recipe, image=make_image_file())
+        upload_name = recipe.image.name
+
+        with mock.patch.object(default_storage, 'save',
+                               side_effect=OSError('Disk full')):
+            with self.assertRaises(OSError):
+                process_recipe_image(recipe.pk, upload_name)
+
+        recipe.refresh_from_db()
+        self.assertEqual(upload_name, recipe.image.name)
+        self.assertTrue(default_storage.exists(upload_name))
+
+        process_recipe_image(recipe.pk, upload_name)
+
+        recipe.refresh_from_db()
+        self.assertNotEqual(upload_name, recipe.image.name)
+        self.assertTrue(default_storage.exists(recipe.image.name))
+        self.assertFalse(default_storage.exists(upload_name))
+
+    def test_invalid_image(self):
+        recipe = baker.make(Recipe, image=SimpleUploadedFile(
+            'photo.jpg', b'not an image', 'image/jpeg'
+        ))
+        with self.assertLogs('recipy.jobs', 'ERROR'):
+            run_jobs()
+
+        recipe.refresh_from_db()
+        self.assertEqual(Recipe.ImageStatus.FAILED, recipe.image_status)
+
+    def test_small_image_gets_one_rendition(self):
+        # 80px wide after rotating
+        recipe = make_recipe_with_processed_image(image=make_image_file(40, 80))
+        self.assertEqual({'80'}, set(recipe.image_renditions['webp']))
+
+    def test_renditions_replaced_on_image_change(self):
+        recipe = make_recipe_with_processed_image(image=make_image_file())
+        old_rendition = recipe.image_renditions['webp']['100']
+
+        recipe.image = make_image_file(name='other.jpg')
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(Recipe.ImageStatus.PENDING, recipe.image_status)
+        self.assertTrue(
+            Job.objects.filter(status=Job.Status.PENDING).exists()
+        )
+
+        run_jobs()
+        recipe.refresh_from_db()
+        self.assertFalse(default_storage.exists(old_rendition))
+        self.assertTrue(
+            default_storage.exists(recipe.image_renditions['webp']['100'])
+        )
+
+    def test_renditions_deleted_on_image_removal(self):
+        recipe = make_recipe_with_processed_image(image=make_image_file())
+        old_rendition = recipe.image_renditions['webp']['100']
+        template = Template('{% load recipy_tags %}{% recipe_picture recipe %}')
+
+        recipe.image = None
+        recipe.save()
+        # The renditions are deleted by the job, they aren't shown until then
+        self.assertNotIn('<picture>',
+                         template.render(Context({'recipe': recipe})))
+
+        run_jobs()
+        recipe.refresh_from_db()
+        self.assertEqual({}, recipe.image_renditions)
+        self.assertFalse(default_storage.exists(old_rendition))
+
+    def test_renditions_of_images_with_the_same_stem(self):
+        red_recipe = make_recipe_with_processed_image(
+            image=make_image_file(name='photo.jpg', color='red')
+        )
+        blue_recipe = make_recipe_with_processed_image(
+            image=make_image_file(name='photo.png', color='blue')
+        )
+
+        self.assertNotEqual(red_recipe.image_renditions['jpeg']['100'],
+                            blue_recipe.image_renditions['jpeg']['100'])
+        for recipe, color in ((red_recipe, (255, 0, 0)),
+                              (blue_recipe, (0, 0, 255))):
+            name = recipe.image_renditions['jpeg']['100']
+            with default_storage.open(name) as f:
+                with Image.open(f) as rendition:
+                    pixel = rendition.convert('RGB').getpixel((50, 50))
+            self.assertTrue(
+                all(abs(a - b) < 10 for a, b in zip(color, pixel)), pixel
+            )
+
+        red_recipe.delete()
+        self.assertTrue(all(
+            default_storage.exists(name)
+            for names in blue_recipe.image_renditions.values()
+            for name in names.values()
+        ))
+
+    def test_generate_all_renditions_again(self):
+        recipe = make_recipe_with_processed_image(image=make_image_file())
+        old_renditions = recipe.image_renditions
+
+        call_command('generate_image_renditions', '--all', '--workers', '1',
+                     stdout=StringIO())
+
+        recipe.refresh_from_db()
+        self.assertTrue(
+            default_storage.exists(recipe.image_renditions['webp']['100'])
+        )
+        self.assertFalse(
+            default_storage.exists(old_renditions['webp']['100'])
+        )
+
+    def test_renditions_deleted_with_recipe(self):
+        recipe = make_recipe_with_processed_image(image=make_image_file())
+        rendition = recipe.image_renditions['webp']['100']
+
+        recipe.delete()
+        self.assertFalse(default_storage.exists(rendition))
+
+    def test_renditions_deleted_with_recipes_in_bulk(self):
+        recipe = make_recipe_with_processed_image(image=make_image_file())
+        rendition = recipe.image_renditions['webp']['100']
+
+        delete_recipes_in_bulk([recipe.pk])
+        self.assertFalse(default_storage.exists(rendition))
+
+    def test_recipe_picture_tag(self):
+        recipe = make_recipe_with_processed_image(image=make_image_file())
+        template = Template(
+            '{% load recipy_tags %}{% recipe_picture recipe alt="Tasty" %}'
+        )
+        html = template.render(Context({'recipe': recipe}))
+
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('-100w.webp 100w, ', html)
+        self.assertIn('-200w.jpg 200w"', html)
+        self.assertIn('sizes="33vw"', html)
+        self.assertIn('alt="Tasty"', html)
+
+    def test_recipe_picture_tag_without_image(self):
+        recipe = baker.make(Recipe)
+        template = Template(
+            '{% load recipy_tags %}{% recipe_picture recipe %}'
+        )
+        html = template.render(Context({'recipe': recipe}))
+
+        self.assertIn('recipy/img/recipe.jpg', html)
+        self.assertNotIn('srcset', html)
+
+    def test_recipe_picture_tag_placeholder_while_processing(self):
+        recipe = baker.make(Recipe, image=make_image_file())
+        recipe.refresh_from_db()
+        template = Template(
+            '{% load recipy_tags %}{% recipe_picture recipe %}'
+        )
+        html = template.render(Context({'recipe': recipe}))
+
+        self.assertIn('recipy/img/recipe.jpg', html)
+        self.assertNotIn(recipe.image.url, html)
+
+    def test_generate_image_renditions_command(self):
+        recipe = make_recipe_with_processed_image(image=make_image_file())
+        Recipe.objects.update(image_renditions={})
+
+        call_command('generate_image_renditions', '--workers', '2',
+                     stdout=StringIO())
+
+        recipe.refresh_from_db()
+        self.assertEqual({'100', '200'}, set(recipe.image_renditions['webp']))
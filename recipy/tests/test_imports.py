@@ -0,0 +1,262 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_bakery import baker
+
+from recipy.export import export_recipes
+from recipy.imports import iter_error_file, run_import
+from recipy.models import (
+    Recipe, Step, Ingredient, RecipeChange, RecipeImport,
+    RecipeSearchDocument, RecipeUsage,
+)
+
+
+def make_jsonl(*records):
+    return b''.join(json.dumps(record).encode() + b'\n' for record in records)
+
+
+class ImportTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+
+    def run_import(self, content, import_format='jsonl', **kwargs):
+        recipe_import = RecipeImport.objects.create(
+            user=self.user, format=import_format, source='test',
+        )
+        run_import(recipe_import, io.BytesIO(content), **kwargs)
+        return recipe_import
+
+    def test_import_exported_recipes(self):
+        other_user = baker.make(get_user_model())
+        recipe = baker.make(Recipe, user=other_user, title='Pancakes')
+        baker.make(Step, recipe=recipe, duration_minutes=5, _quantity=2)
+        baker.make(Ingredient, recipe=recipe, name='Eggs',
+                   measure=Ingredient.Measure.PIECE)
+
+        for import_format in ('jsonl', 'csv'):
+            content = b''.join(export_recipes(
+                Recipe.objects.filter(user=other_user), import_format
+            ))
+            recipe_import = self.run_import(content, import_format)
+
+            self.assertEqual(RecipeImport.Status.SUCCEEDED,
+                             recipe_import.status)
+            self.assertEqual(1, recipe_import.imported_count)
+
+        imported = Recipe.objects.filter(user=self.user)
+        self.assertEqual(2, imported.count())
+        for imported_recipe in imported:
+            self.assertEqual('Pancakes', imported_recipe.title)
+            self.assertEqual(2, imported_recipe.steps.count())
+            self.assertEqual(
+                ['Eggs'], [i.name for i in imported_recipe.ingredients.all()]
+            )
+            self.assertEqual(10, imported_recipe.computed_duration_minutes)
+            self.assertTrue(RecipeSearchDocument.objects.filter(
+                recipe=imported_recipe
+            ).exists())
+            self.assertTrue(imported_recipe.ingredient_terms.exists())
+            self.assertEqual(
+                [RecipeChange.Action.CREATED],
+                list(RecipeChange.objects.filter(
+                    recipe_pk=imported_recipe.pk
+                ).values_list('action', flat=True))
+            )
+
+    def test_invalid_records_are_rejected(self):
+        content = make_jsonl(
+            {'title': 'Soup', 'steps': [{'name': 'Boil'}]},
+            {'description': 'No title'},
+            {'title': 'Bad duration', 'duration_minutes': 'long'},
+            {'title': 'Bad measure', 'ingredients': [{'measure': 'CUP'}]},
+            {'title': 'Bad steps', 'steps': 'Boil'},
+        ) + b'{invalid\n'
+
+        recipe_import = self.run_import(content)
+
+        self.assertEqual(1, recipe_import.imported_count)
+        self.assertEqual(5, recipe_import.rejected_count)
+        self.assertEqual(6, recipe_import.checkpoint)
+        errors = [
+            json.loads(line)
+            for line in b''.join(iter_error_file(recipe_import)).splitlines()
+        ]
+        self.assertEqual([2, 3, 4, 5, 6],
+                         [error['record_number'] for error in errors])
+        self.assertIn('title', errors[0]['errors'])
+        self.assertIn('duration_minutes', errors[1]['errors'])
+        self.assertIn('measure', errors[2]['errors']['ingredients-0'])
+        self.assertEqual('No title', errors[0]['record']['description'])
+
+    def test_resume_after_failure(self):
+        content = make_jsonl(*[{'title': f'Recipe {i}'} for i in range(5)])
+        recipe_import = RecipeImport.objects.create(
+            user=self.user, format='jsonl', source='test',
+        )
+
+        # The second batch fails
+        with mock.patch('recipy.imports.update_search_documents',
+                        side_effect=[2, RuntimeError('Database went away')]):
+            with self.assertRaises(RuntimeError):
+                run_import(recipe_import, io.BytesIO(content), batch_size=2)
+
+        recipe_import.refresh_from_db()
+        self.assertEqual(2, recipe_import.checkpoint)
+        self.assertEqual(2, Recipe.objects.count())
+
+        run_import(recipe_import, io.BytesIO(content), batch_size=2)
+
+        self.assertEqual(RecipeImport.Status.SUCCEEDED, recipe_import.status)
+        self.assertEqual(5, recipe_import.imported_count)
+        self.assertEqual(
+            [f'Recipe {i}' for i in range(5)],
+            list(Recipe.objects.order_by('pk').values_list('title', flat=True))
+        )
+
+    def test_recipe_quota(self):
+        baker.make(Recipe, user=self.user)
+        content = make_jsonl(*[{'title': f'Recipe {i}'} for i in range(4)])
+
+        with override_settings(RECIPY_QUOTAS={
+            'default': {'recipes': 3}, 'users': {}
+        }):
+            recipe_import = self.run_import(content, batch_size=3)
+
+        self.assertEqual(2, recipe_import.imported_count)
+        self.assertEqual(2, recipe_import.rejected_count)
+        self.assertEqual(
+            3, RecipeUsage.objects.get(user=self.user).recipe_count
+        )
+
+
+class ImportViewTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.client.force_login(self.user)
+
+        self.media_root = tempfile.mkdtemp()
+        self.imports_root = tempfile.mkdtemp()
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, RECIPY_IMPORTS_ROOT=self.imports_root,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.imports_root)
+
+    def test_upload_is_imported_in_background(self):
+        content = make_jsonl({'title': 'Soup'}, {'description': 'No title'})
+        response = self.client.post(reverse('recipy:recipe-import'), {
+            'file': SimpleUploadedFile('recipes.jsonl', content),
+            'format': 'jsonl',
+        })
+
+        recipe_import = RecipeImport.objects.get()
+        self.assertRedirects(response, reverse(
+            'recipy:recipe-import-detail', args=(recipe_import.pk,)
+        ))
+        self.assertEqual('recipes.jsonl', recipe_import.source)
+        # Stored under a random name, out of the served media files
+        self.assertNotIn('recipes', recipe_import.file.name)
+        self.assertEqual([recipe_import.file.name],
+                         os.listdir(self.imports_root))
+        self.assertEqual([], os.listdir(self.media_root))
+
+        call_command('run_jobs', '--burst', stdout=StringIO())
+
+        recipe_import.refresh_from_db()
+        self.assertEqual(RecipeImport.Status.SUCCEEDED, recipe_import.status)
+        # Deleted when the import finishes
+        self.assertFalse(recipe_import.file)
+        self.assertEqual([], os.listdir(self.imports_root))
+        self.assertEqual(['Soup'], [r.title for r in self.user.recipes.all()])
+
+        response = self.client.get(reverse(
+            'recipy:recipe-import-errors', args=(recipe_import.pk,)
+        ))
+        errors = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(1, len(errors))
+
+    def test_file_of_failed_import_is_deleted(self):
+        self.client.post(reverse('recipy:recipe-import'), {
+            'file': SimpleUploadedFile('recipes.jsonl', b'\xff\xfe'),
+            'format': 'jsonl',
+        })
+
+        with self.assertLogs('recipy.jobs', 'ERROR'):
+            call_command('run_jobs', '--burst', stdout=StringIO())
+
+        recipe_import = RecipeImport.objects.get()
+        self.assertEqual(RecipeImport.Status.FAILED, recipe_import.status)
+        self.assertFalse(recipe_import.file)
+        self.assertEqual([], os.listdir(self.imports_root))
+
+    def test_imports_of_other_users_are_hidden(self):
+        recipe_import = baker.make(RecipeImport)
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse(
+                'recipy:recipe-import-detail', args=(recipe_import.pk,)
+            ))
+        self.assertEqual(404, response.status_code)
+
+    def test_demo_user_cannot_import(self):
+        demo_user = baker.make(
+            get_user_model(), username=settings.RECIPY_DEMO_USER['username']
+        )
+        self.client.force_login(demo_user)
+
+        response = self.client.get(reverse('recipy:recipe-import'))
+        self.assertRedirects(response, reverse('recipy:recipes-list'))
+
+
+class ImportCommandTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model(), username='cook')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'recipes.jsonl')
+        with open(self.path, 'wb') as f:
+            f.write(make_jsonl({'title': 'Soup'}, {'title': ''}))
+
+    def test_import(self):
+        stdout = StringIO()
+        call_command('import_recipes', self.path, '--user', 'cook',
+                     stdout=stdout)
+
+        self.assertEqual(1, self.user.recipes.count())
+        with open(f'{self.path}.errors.jsonl', 'rb') as f:
+            self.assertEqual(2, json.loads(f.readline())['record_number'])
+
+        recipe_import = RecipeImport.objects.get()
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', self.path, '--resume',
+                         recipe_import.pk, stdout=StringIO())
+
+    def test_resume(self):
+        recipe_import = RecipeImport.objects.create(
+            user=self.user, format='jsonl', checkpoint=1, imported_count=1,
+            source=os.path.abspath(self.path),
+            status=RecipeImport.Status.FAILED,
+        )
+
+        call_command('import_recipes', self.path, '--resume',
+                     recipe_import.pk, stdout=StringIO())
+
+        recipe_import.refresh_from_db()
+        self.assertEqual(RecipeImport.Status.SUCCEEDED, recipe_import.status)
+        self.assertEqual(1, recipe_import.rejected_count)
+        self.assertFalse(self.user.recipes.exists())
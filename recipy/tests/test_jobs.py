@@ -0,0 +1,102 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recipy import jobs
+from recipy.models import Job
+
+calls = []
+
+
+@jobs.task('test_task')
+def _test_task(value):
+    calls.append(value)
+
+
+@jobs.task('test_failing_task', on_failure=lambda value: calls.append('fail'))
+def _test_failing_task(value):
+    raise RuntimeError('Something went wrong')
+
+
+@jobs.task('test_permanently_failing_task')
+def _test_permanently_failing_task():
+    raise jobs.PermanentJobError('Invalid input')
+
+
+@override_settings(RECIPY_JOBS={
+    'max_attempts': 2,
+    'retry_delay_seconds': 10,
+    'poll_interval_seconds': 0,
+    'stale_after_seconds': 60,
+})
+class JobTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_job(self):
+        job = jobs.enqueue('test_task', value=1)
+        self.assertEqual(job, jobs.run_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(Job.Status.SUCCEEDED, job.status)
+        self.assertEqual(1, job.attempts)
+        self.assertEqual([1], calls)
+        self.assertIsNone(jobs.run_next_job())
+
+    def test_enqueue_unknown_task(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('unknown_task')
+
+    def test_failed_job_is_retried(self):
+        job = jobs.enqueue('test_failing_task', value=1)
+        with self.assertLogs('recipy.jobs', 'WARNING'):
+            jobs.run_next_job()
+
+        job.refresh_from_db()
+        self.assertEqual(Job.Status.PENDING, job.status)
+        self.assertIn('Something went wrong', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        # Not due yet
+        self.assertIsNone(jobs.run_next_job())
+
+        future = timezone.now() + timedelta(seconds=11)
+        with mock.patch('django.utils.timezone.now', return_value=future), \
+                self.assertLogs('recipy.jobs', 'ERROR'):
+            jobs.run_next_job()
+
+        job.refresh_from_db()
+        self.assertEqual(Job.Status.FAILED, job.status)
+        self.assertEqual(2, job.attempts)
+        self.assertEqual(['fail'], calls)
+
+    def test_permanent_error_is_not_retried(self):
+        job = jobs.enqueue('test_permanently_failing_task')
+        with self.assertLogs('recipy.jobs', 'ERROR'):
+            jobs.run_next_job()
+
+        job.refresh_from_db()
+        self.assertEqual(Job.Status.FAILED, job.status)
+        self.assertEqual(1, job.attempts)
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue('test_task', value=1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.Status.RUNNING,
+            locked_at=timezone.now() - timedelta(seconds=61),
+        )
+
+        self.assertEqual(1, jobs.requeue_stale_jobs())
+        job.refresh_from_db()
+        self.assertEqual(Job.Status.PENDING, job.status)
+
+    def test_run_jobs_command(self):
+        jobs.enqueue('test_task', value=1)
+        jobs.enqueue('test_task', value=2)
+
+        call_command('run_jobs', '--burst', stdout=StringIO())
+        self.assertEqual([1, 2], calls)
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from model_bakery import baker
+
+from recipy.models import Recipe
+from recipy.utils.metrics import percentile, view_metrics
+
+
+METRICS_SETTINGS = {
+    'enabled': True,
+    'buffer_size': 3,
+    'slow_request_ms': None,
+}
+
+
+@override_settings(RECIPY_VIEW_METRICS=METRICS_SETTINGS)
+class ViewMetricsTests(TestCase):
+
+    def setUp(self):
+        view_metrics.reset()
+        self.user = baker.make(get_user_model(), is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(7, percentile([7], 95))
+
+    def test_requests_are_recorded_per_view(self):
+        recipe = baker.make(Recipe, user=self.user)
+        for _ in range(5):
+            self.client.get(reverse('recipy:recipe-detail', args=[recipe.pk]))
+
+        summary = view_metrics.get_summary()['recipy:recipe-detail']
+        # Only the last buffer_size requests are kept
+        self.assertEqual(3, summary['count'])
+        self.assertGreater(summary['queries']['p50'], 0)
+        self.assertGreater(summary['render_ms']['p99'], 0)
+        self.assertGreaterEqual(
+            summary['total_ms']['p50'], summary['db_ms']['p50']
+        )
+
+    @override_settings(
+        RECIPY_VIEW_METRICS={**METRICS_SETTINGS, 'slow_request_ms': 0}
+    )
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs('recipy.middleware', 'WARNING') as logs:
+            self.client.get(reverse('recipy:recipes-list'))
+
+        self.assertIn('recipy:recipes-list', logs.output[0])
+
+    @override_settings(
+        RECIPY_VIEW_METRICS={**METRICS_SETTINGS, 'enabled': False}
+    )
+    def test_disabled(self):
+        self.client.get(reverse('recipy:recipes-list'))
+
+        self.assertEqual({}, view_metrics.get_summary())
+
+    def test_report_is_staff_only(self):
+        self.client.get(reverse('recipy:recipes-list'))
+        response = self.client.get(reverse('recipy:view-metrics'))
+        self.assertContains(response, 'recipy:recipes-list')
+
+        self.client.force_login(baker.make(get_user_model()))
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse('recipy:view-metrics'))
+        self.assertEqual(403, response.status_code)
+
+
+@override_settings(RECIPY_VIEW_METRICS=METRICS_SETTINGS)
+class AsyncViewMetricsTests(TransactionTestCase):
+
+    def setUp(self):
+        view_metrics.reset()
+        self.user = baker.make(get_user_model())
+        self.async_client.force_login(self.user)
+        self.recipe = baker.make(Recipe, user=self.user)
+        # Under ASGI, the queries of a request run on the connection of
+        # another thread, which connects after the middleware is loaded
+        connection.close()
+
+    async def test_async_requests_are_recorded(self):
+        await self.async_client.get(
+            reverse('recipy:recipe-detail', args=[self.recipe.pk])
+        )
+
+        summary = view_metrics.get_summary()['recipy:recipe-detail']
+        self.assertEqual(1, summary['count'])
+        self.assertGreater(summary['queries']['p50'], 0)
+        self.assertGreater(summary['render_ms']['p99'], 0)
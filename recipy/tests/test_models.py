@@ -1,7 +1,10 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.test import TestCase
 from django.utils.translation import gettext_lazy as _
 
 from recipy.models import Recipe, Step
+from recipy.signals import _update_pending_computed_durations
 from model_bakery import baker
 
 
@@ -23,20 +26,81 @@ class ModelTests(TestCase):
 
     def test_recipe_get_duration_display_with_step(self):
         recipe = baker.make(Recipe)
-        baker.make(Step, recipe=recipe, duration_minutes=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            baker.make(Step, recipe=recipe, duration_minutes=1)
+        recipe.refresh_from_db()
 
         self.assertIsNone(recipe.duration_minutes)
         self.assertEqual(f'1{_("min")}', recipe.get_duration_display())
 
     def test_recipe_get_duration_display_with_step_and_hour(self):
         recipe = baker.make(Recipe)
-        baker.make(Step, recipe=recipe, duration_minutes=61)
+        with self.captureOnCommitCallbacks(execute=True):
+            baker.make(Step, recipe=recipe, duration_minutes=61)
+        recipe.refresh_from_db()
 
         self.assertIsNone(recipe.duration_minutes)
         self.assertEqual(
             f'1{_("h")} 1{_("min")}', recipe.get_duration_display()
         )
 
+    def test_recipe_computed_duration_follows_step_changes(self):
+        recipe = baker.make(Recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            step = baker.make(Step, recipe=recipe, duration_minutes=10)
+            baker.make(Step, recipe=recipe, duration_minutes=5)
+        recipe.refresh_from_db()
+        self.assertEqual(15, recipe.computed_duration_minutes)
+
+        step.duration_minutes = 20
+        with self.captureOnCommitCallbacks(execute=True):
+            step.save()
+        recipe.refresh_from_db()
+        self.assertEqual(25, recipe.computed_duration_minutes)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            step.delete()
+        recipe.refresh_from_db()
+        self.assertEqual(5, recipe.computed_duration_minutes)
+
+    def test_recipe_computed_duration_updated_once_per_transaction(self):
+        recipe = baker.make(Recipe)
+        steps = baker.make(Step, recipe=recipe, _quantity=3)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            for step in steps:
+                step.duration_minutes = 10
+                step.save()
+
+        # Scheduled with each save, but the first call updates the recipe
+        duration_updates = [
+            callback for callback in callbacks
+            if callback is _update_pending_computed_durations
+        ]
+        self.assertEqual(3, len(duration_updates))
+        with self.assertNumQueries(1):
+            for callback in duration_updates:
+                callback()
+        recipe.refresh_from_db()
+        self.assertEqual(30, recipe.computed_duration_minutes)
+
+    def test_recipe_get_duration_display_does_not_query(self):
+        recipe = baker.make(Recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            baker.make(Step, recipe=recipe, duration_minutes=1)
+        recipe = Recipe.objects.get(pk=recipe.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(f'1{_("min")}', recipe.get_duration_display())
+
+    def test_recipe_delete_with_steps(self):
+        recipe = baker.make(Recipe)
+        baker.make(Step, recipe=recipe, duration_minutes=1, _quantity=2)
+
+        recipe.delete()
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Step.objects.exists())
+
     def test_step_get_duration_display_none(self):
         step = baker.make(Step)
 
@@ -50,3 +114,28 @@ class ModelTests(TestCase):
     def test_step_get_duration_display_hours(self):
         step = baker.make(Step, duration_minutes=61)
         self.assertEqual(f'1{_("h")} 1{_("min")}', step.get_duration_display())
+
+
+class RecipeVisibilityTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.own_recipe = baker.make(Recipe, user=self.user)
+        self.public_recipe = baker.make(Recipe, is_public=True)
+        # Private recipe of another user
+        baker.make(Recipe)
+
+    def test_read(self):
+        self.assertCountEqual(
+            [self.own_recipe, self.public_recipe],
+            Recipe.objects.visible_to(self.user),
+        )
+
+    def test_modify(self):
+        self.assertEqual(
+            [self.own_recipe],
+            list(Recipe.objects.visible_to(self.user, Recipe.Action.MODIFY)),
+        )
+
+    def test_anonymous_user(self):
+        self.assertFalse(Recipe.objects.visible_to(AnonymousUser()).exists())
@@ -0,0 +1,165 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from model_bakery import baker
+
+from recipy.forms import RecipeForm
+from recipy.models import Recipe, Ingredient, IngredientTerm
+from recipy.pantry import (
+    MAX_VISIBILITY_CHUNKS, find_recipes_by_ingredients,
+    normalize_ingredient_name, update_ingredient_terms,
+)
+
+
+class PantryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = baker.make(get_user_model())
+        self.other_user = baker.make(get_user_model())
+
+    def make_recipe(self, ingredient_names, **kwargs):
+        kwargs.setdefault('user', self.user)
+        recipe = baker.make(Recipe, **kwargs)
+        for name in ingredient_names:
+            baker.make(Ingredient, recipe=recipe, name=name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_ingredient_terms([recipe.pk])
+
+        return recipe
+
+    def test_normalize_ingredient_name(self):
+        self.assertEqual('tomato', normalize_ingredient_name('2 Fresh Tomatoes'))
+        self.assertEqual('egg', normalize_ingredient_name('Eggs'))
+        self.assertEqual('cherry', normalize_ingredient_name('cherries'))
+        self.assertEqual('olive oil', normalize_ingredient_name('Olive oil,'))
+        self.assertEqual('', normalize_ingredient_name('3 large'))
+
+    def test_form_save_updates_terms(self):
+        form = RecipeForm(user=self.user, data={
+            'title': 'Omelette',
+            'ingredients-TOTAL_FORMS': 2,
+            'ingredients-INITIAL_FORMS': 0,
+            'ingredients-0-name': 'Eggs',
+            'ingredients-1-name': 'Butter',
+            'steps-TOTAL_FORMS': 0,
+            'steps-INITIAL_FORMS': 0,
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        recipe = Recipe.objects.get(title='Omelette')
+        self.assertCountEqual(
+            ['egg', 'butter'],
+            recipe.ingredient_terms.values_list('name', flat=True),
+        )
+
+    def test_terms_are_shared_and_updated(self):
+        recipe = self.make_recipe(['Eggs', 'Milk'])
+        self.make_recipe(['egg'])
+        self.assertEqual(2, IngredientTerm.objects.count())
+
+        recipe.ingredients.filter(name='Milk').update(name='Cream')
+        with self.captureOnCommitCallbacks(execute=True):
+            update_ingredient_terms([recipe.pk])
+
+        self.assertCountEqual(
+            ['egg', 'cream'],
+            recipe.ingredient_terms.values_list('name', flat=True),
+        )
+
+    def test_ingredient_save_and_delete_update_terms(self):
+        recipe = self.make_recipe([])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient = baker.make(Ingredient, recipe=recipe, name='Milk')
+        self.assertEqual(['milk'], list(
+            recipe.ingredient_terms.values_list('name', flat=True)
+        ))
+
+        ingredient.name = 'Cream'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertEqual(['cream'], list(
+            recipe.ingredient_terms.values_list('name', flat=True)
+        ))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.delete()
+        self.assertFalse(recipe.ingredient_terms.exists())
+
+    def test_ranked_by_coverage(self):
+        half = self.make_recipe(['Eggs', 'Flour', 'Sugar', 'Butter'])
+        full = self.make_recipe(['Eggs', 'Butter'])
+        self.make_recipe(['Rice'])
+
+        matches = find_recipes_by_ingredients(
+            self.user, ['eggs', 'butter', 'salt']
+        )
+
+        self.assertEqual([full, half], [match.recipe for match in matches])
+        self.assertEqual(1, matches[0].coverage)
+        self.assertEqual(2, matches[1].missing_count)
+
+    def test_index_is_reloaded_after_changes(self):
+        self.assertEqual([], find_recipes_by_ingredients(self.user, ['eggs']))
+
+        recipe = self.make_recipe(['Eggs'])
+
+        matches = find_recipes_by_ingredients(self.user, ['eggs'])
+        self.assertEqual([recipe], [match.recipe for match in matches])
+
+    def test_respects_visibility_and_limit(self):
+        own_recipe = self.make_recipe(['Eggs'])
+        public_recipe = self.make_recipe(
+            ['Eggs'], user=self.other_user, is_public=True
+        )
+        self.make_recipe(['Eggs'], user=self.other_user)
+
+        matches = find_recipes_by_ingredients(self.user, ['eggs'])
+        self.assertCountEqual(
+            [own_recipe, public_recipe], [match.recipe for match in matches]
+        )
+        self.assertEqual(
+            1, len(find_recipes_by_ingredients(self.user, ['eggs'], limit=1))
+        )
+
+    def test_visibility_queries_are_bounded(self):
+        for _ in range(100):
+            self.make_recipe(['Eggs'], user=self.other_user)
+        # Warms up the index
+        find_recipes_by_ingredients(self.user, ['eggs'])
+
+        # The term lookup and one query per chunk
+        with self.assertNumQueries(1 + MAX_VISIBILITY_CHUNKS):
+            self.assertEqual(
+                [], find_recipes_by_ingredients(self.user, ['eggs'], limit=1)
+            )
+
+    def test_rebuild_ingredient_index_command(self):
+        recipe = baker.make(Recipe, user=self.user)
+        baker.make(Ingredient, recipe=recipe, name='Eggs')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_ingredient_index', stdout=StringIO())
+
+        matches = find_recipes_by_ingredients(self.user, ['eggs'])
+        self.assertEqual([recipe], [match.recipe for match in matches])
+
+    def test_pantry_view(self):
+        recipe = self.make_recipe(['Eggs', 'Flour'])
+        self.client.force_login(self.user)
+
+        response = self.client.get(
+            reverse('recipy:recipe-pantry'), {'ingredients': 'eggs, flour'}
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            [recipe], [match.recipe for match in response.context['matches']]
+        )
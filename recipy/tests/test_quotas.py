@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.files.storage import default_storage
+from django.core.management import call_command, CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from model_bakery import baker
+
+from recipy.forms import RecipeForm
+from recipy.models import Recipe, RecipeUsage
+from recipy.quotas import get_limits, get_remaining_quota, get_usage
+from recipy.tests.test_images import make_image_file, run_jobs
+from recipy.utils.purge import delete_recipes_in_bulk
+
+
+def get_counters(user):
+    usage = get_usage(user)
+    return usage.recipe_count, usage.image_bytes
+
+
+class RecipeUsageTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_recipes_counted(self):
+        recipes = baker.make(Recipe, user=self.user, _quantity=3)
+        self.assertEqual((3, 0), get_counters(self.user))
+
+        recipes[0].delete()
+        self.assertEqual((2, 0), get_counters(self.user))
+
+        delete_recipes_in_bulk([recipe.pk for recipe in recipes[1:]])
+        self.assertEqual((0, 0), get_counters(self.user))
+
+    def test_image_bytes_counted(self):
+        recipe = baker.make(Recipe, user=self.user, image=make_image_file())
+        # Counted once the image is processed, the normalized image is stored
+        # instead of the uploaded one
+        self.assertEqual((1, 0), get_counters(self.user))
+
+        run_jobs()
+        recipe.refresh_from_db()
+        image_size = default_storage.size(recipe.image.name)
+        self.assertEqual(image_size, recipe.image_size)
+        self.assertEqual((1, image_size), get_counters(self.user))
+
+        recipe.image = None
+        recipe.save()
+        run_jobs()
+        self.assertEqual((1, 0), get_counters(self.user))
+
+    def test_reconcile(self):
+        recipe = baker.make(Recipe, user=self.user, image=make_image_file())
+        run_jobs()
+        Recipe.objects.filter(pk=recipe.pk).update(image_size=0)
+        RecipeUsage.objects.all().delete()
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_recipe_usage', '--check',
+                         stdout=StringIO())
+
+        call_command('reconcile_recipe_usage', '--measure-images',
+                     stdout=StringIO())
+
+        recipe.refresh_from_db()
+        self.assertEqual((1, recipe.image_size), get_counters(self.user))
+        self.assertLess(0, recipe.image_size)
+        call_command('reconcile_recipe_usage', '--check', stdout=StringIO())
+
+
+@override_settings(RECIPY_QUOTAS={
+    'default': {'recipes': 2, 'image_bytes': None},
+    'groups': {
+        'editors': {'recipes': 5},
+        'admins': {'recipes': None},
+    },
+    'users': {'limited': {'recipes': 1, 'image_bytes': 10}},
+})
+class QuotaLimitTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+
+    def test_limits(self):
+        self.assertEqual({'recipes': 2, 'image_bytes': None},
+                         get_limits(self.user))
+
+        self.user.groups.add(baker.make(Group, name='editors'))
+        self.assertEqual(5, get_limits(self.user)['recipes'])
+
+        self.user.groups.add(baker.make(Group, name='admins'))
+        self.assertIsNone(get_limits(self.user)['recipes'])
+
+        limited_user = baker.make(get_user_model(), username='limited')
+        limited_user.groups.add(*self.user.groups.all())
+        self.assertEqual({'recipes': 1, 'image_bytes': 10},
+                         get_limits(limited_user))
+
+    def test_remaining_quota(self):
+        baker.make(Recipe, user=self.user, _quantity=3)
+        self.assertEqual(0, get_remaining_quota(self.user, 'recipes'))
+        self.assertIsNone(get_remaining_quota(self.user, 'image_bytes'))
+
+    def test_create_view(self):
+        self.client.force_login(self.user)
+        url = reverse('recipy:recipe-create')
+        self.assertEqual(200, self.client.get(url).status_code)
+
+        baker.make(Recipe, user=self.user, _quantity=2)
+        # The groups and the usage, the recipes aren't counted
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertRedirects(response, reverse('recipy:recipes-list'),
+                             fetch_redirect_response=False)
+
+    def test_create_view_checks_the_locked_usage(self):
+        self.client.force_login(self.user)
+        baker.make(Recipe, user=self.user, _quantity=2)
+
+        # A concurrent request which hasn't committed its recipes yet passes
+        # the check on dispatch
+        with mock.patch('recipy.utils.views.get_usage',
+                        return_value=RecipeUsage(user=self.user)):
+            response = self.client.post(reverse('recipy:recipe-create'), {
+                'title': 'Recipe',
+                'steps-TOTAL_FORMS': 0, 'steps-INITIAL_FORMS': 0,
+                'ingredients-TOTAL_FORMS': 0, 'ingredients-INITIAL_FORMS': 0,
+            })
+
+        self.assertRedirects(response, reverse('recipy:recipes-list'),
+                             fetch_redirect_response=False)
+        self.assertEqual(2, Recipe.objects.count())
+
+    def test_image_quota(self):
+        user = baker.make(get_user_model(), username='limited')
+        form = RecipeForm(
+            data={'title': 'Recipe', 'duration_minutes': 10},
+            files={'image': make_image_file()}, user=user,
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
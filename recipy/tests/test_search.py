@@ -0,0 +1,123 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from model_bakery import baker
+
+from recipy.models import (
+    Recipe, RecipeQuerySet, RecipeSearchDocument, Step, Ingredient
+)
+from recipy.search import search_recipes, get_query_terms
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.other_user = baker.make(get_user_model())
+
+    def make_recipe(self, **kwargs):
+        kwargs.setdefault('user', self.user)
+        kwargs.setdefault('description', '')
+        with self.captureOnCommitCallbacks(execute=True):
+            return baker.make(Recipe, **kwargs)
+
+    def test_get_query_terms(self):
+        self.assertEqual(
+            ['chicken', 'soup'], get_query_terms(' Chicken, "soup"* ')
+        )
+        self.assertEqual([], get_query_terms('*"-'))
+
+    def test_document_is_updated_on_commit(self):
+        recipe = self.make_recipe(title='Pancakes')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            baker.make(Ingredient, recipe=recipe, name='Buttermilk')
+            baker.make(Step, recipe=recipe, name='Whisk',
+                       description='Whisk the batter until smooth.')
+
+        document = RecipeSearchDocument.objects.get(recipe=recipe)
+        self.assertEqual('Pancakes', document.title)
+        self.assertIn('Buttermilk', document.body)
+        self.assertIn('batter', document.body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.steps.all().delete()
+
+        document.refresh_from_db()
+        self.assertNotIn('batter', document.body)
+
+    def test_search_matches_children_and_prefixes(self):
+        recipe = self.make_recipe(title='Pancakes')
+        with self.captureOnCommitCallbacks(execute=True):
+            baker.make(Ingredient, recipe=recipe, name='Buttermilk')
+
+        self.assertEqual([recipe], search_recipes(self.user, 'buttermilk'))
+        self.assertEqual([recipe], search_recipes(self.user, 'PANCAKE butter'))
+        self.assertEqual([], search_recipes(self.user, 'pancakes waffles'))
+        self.assertEqual([], search_recipes(self.user, ''))
+
+    def test_search_ranks_title_matches_first(self):
+        description_match = self.make_recipe(
+            title='Dinner', description='Served with rice.'
+        )
+        title_match = self.make_recipe(title='Rice pudding')
+
+        self.assertEqual(
+            [title_match, description_match],
+            search_recipes(self.user, 'rice'),
+        )
+
+    def test_search_respects_visibility(self):
+        own_recipe = self.make_recipe(title='Lasagna')
+        public_recipe = self.make_recipe(
+            title='Lasagna', user=self.other_user, is_public=True
+        )
+        self.make_recipe(title='Lasagna', user=self.other_user)
+
+        self.assertCountEqual(
+            [own_recipe, public_recipe], search_recipes(self.user, 'lasagna')
+        )
+        self.assertEqual([], search_recipes(AnonymousUser(), 'lasagna'))
+
+    def test_search_applies_the_recipe_access_policy(self):
+        own_recipe = self.make_recipe(title='Lasagna')
+        self.make_recipe(
+            title='Lasagna', user=self.other_user, is_public=True
+        )
+
+        # A stricter policy which hides the public recipes
+        def visible_to(queryset, user, action=None):
+            return queryset.filter(user=user)
+
+        with mock.patch.object(RecipeQuerySet, 'visible_to', visible_to):
+            self.assertEqual(
+                [own_recipe], search_recipes(self.user, 'lasagna')
+            )
+
+    def test_rebuild_search_index_command(self):
+        recipe = self.make_recipe(title='Goulash')
+        RecipeSearchDocument.objects.all().delete()
+
+        call_command('rebuild_search_index', '--batch-size', '1',
+                     stdout=StringIO())
+
+        self.assertEqual([recipe], search_recipes(self.user, 'goulash'))
+
+    def test_search_view(self):
+        recipe = self.make_recipe(title='Risotto')
+        self.client.force_login(self.user)
+
+        response = self.client.get(
+            reverse('recipy:recipe-search'), {'q': 'risotto'}
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([recipe], list(response.context['recipes']))
+        self.assertContains(
+            response, reverse('recipy:recipe-detail', args=[recipe.pk])
+        )
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+
+class StaticFilesTests(TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_dir)
+        self.addCleanup(shutil.rmtree, self.static_root)
+
+        self.write_static_file('recipy/js/load_more.js',
+                               'console.log("load more");' * 100)
+        self.write_static_file('recipy/vendor/chart.js/Chart.js', '')
+
+        settings_override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[self.static_dir],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATICFILES_STORAGE='whitenoise.storage.'
+                                'CompressedManifestStaticFilesStorage',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        call_command('collectstatic', '--noinput', stdout=StringIO())
+
+    def write_static_file(self, name, content):
+        path = os.path.join(self.static_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_collectstatic(self):
+        hashed_name = staticfiles_storage.stored_name('recipy/js/load_more.js')
+
+        self.assertNotEqual('recipy/js/load_more.js', hashed_name)
+        for extension in ('', '.gz', '.br'):
+            self.assertTrue(os.path.exists(
+                os.path.join(self.static_root, hashed_name + extension)
+            ))
+        # Unused vendor assets are left out
+        self.assertFalse(os.path.exists(
+            os.path.join(self.static_root, 'recipy/vendor')
+        ))
+
+    def test_served_compressed_and_immutable(self):
+        url = staticfiles_storage.url('recipy/js/load_more.js')
+
+        for accept_encoding in ('br', 'gzip'):
+            response = self.client.get(
+                url, HTTP_ACCEPT_ENCODING=f'{accept_encoding}, deflate'
+            )
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(accept_encoding, response['Content-Encoding'])
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('Accept-Encoding', response['Vary'])
+            response.close()
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response.close()
+
+    async def test_served_to_async_requests(self):
+        url = staticfiles_storage.url('recipy/js/load_more.js')
+
+        # The async test client takes the headers by their names
+        response = await self.async_client.get(
+            url, **{'Accept-Encoding': 'br'}
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('br', response['Content-Encoding'])
+        response.close()
@@ -1,9 +1,17 @@
-from django.db import transaction
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.html import escape
+from django.utils.http import urlencode
 from model_bakery import baker
 
+from recipy.api import RecipeApiListView
 from recipy.models import Recipe, Step, Ingredient
+from recipy.views import RecipeDetailView, RecipeListView
 
 
 def prepare_formset_data(prefix, parent_name, form_data_list,
@@ -164,3 +172,397 @@ class ViewTests(TestCase):
 
                         # Rollback the DB to keep the tests isolated
                         transaction.savepoint_rollback(savepoint)
+
+
+@override_settings(RECIPY_RECIPES_PER_PAGE=2)
+class RecipeListViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(get_user_model())
+        cls.user_recipes = baker.make(Recipe, user=cls.user, _quantity=3)
+        cls.public_recipes = baker.make(Recipe, is_public=True, _quantity=3)
+        # Private recipes of other users are never listed
+        baker.make(Recipe, is_public=False, _quantity=2)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_sections_are_paginated(self):
+        response = self.client.get(reverse('recipy:recipes-list'))
+
+        self.assertEqual(200, response.status_code)
+        user_page = response.context['user_recipes_page']
+        public_page = response.context['public_recipes_page']
+        self.assertEqual(2, len(user_page))
+        self.assertTrue(user_page.has_next)
+        self.assertEqual(2, len(public_page))
+        self.assertTrue(public_page.has_next)
+
+    def test_pages_cover_all_recipes_once(self):
+        for section, expected_recipes in (
+                ('user', self.user_recipes), ('public', self.public_recipes)):
+            with self.subTest(section=section):
+                first_page = self.client.get(
+                    reverse('recipy:recipes-list')
+                ).context[f'{section}_recipes_page']
+                response = self.client.get(
+                    reverse('recipy:recipes-list-more'),
+                    data={'section': section,
+                          'cursor': first_page.next_cursor},
+                )
+                second_page = response.context['page']
+
+                self.assertFalse(second_page.has_next)
+                self.assertCountEqual(
+                    [recipe.pk for recipe in expected_recipes],
+                    [recipe.pk for recipe in
+                     [*first_page.object_list, *second_page.object_list]],
+                )
+
+    def test_load_more_links_keep_the_other_section_cursor(self):
+        baker.make(Recipe, user=self.user, _quantity=2)
+        list_url = reverse('recipy:recipes-list')
+        more_url = reverse('recipy:recipes-list-more')
+        public_cursor = self.client.get(list_url).context[
+            'public_recipes_page'].next_cursor
+
+        response = self.client.get(list_url,
+                                   data={'public_cursor': public_cursor})
+        user_cursor = response.context['user_recipes_page'].next_cursor
+        self.assertContains(response, 'href="{}"'.format(escape(
+            f'{list_url}?' + urlencode({'public_cursor': public_cursor,
+                                        'user_cursor': user_cursor})
+        )))
+        fragment_url = f'{more_url}?' + urlencode({
+            'public_cursor': public_cursor, 'section': 'user',
+            'cursor': user_cursor,
+        })
+        self.assertContains(
+            response, 'data-fragment-url="{}"'.format(escape(fragment_url))
+        )
+
+        # The button of the next page of cards keeps it too
+        response = self.client.get(fragment_url)
+        user_cursor = response.context['page'].next_cursor
+        self.assertContains(response, 'href="{}"'.format(escape(
+            f'{list_url}?' + urlencode({'public_cursor': public_cursor,
+                                        'user_cursor': user_cursor})
+        )))
+
+    def test_query_count_does_not_depend_on_table_size(self):
+        url = reverse('recipy:recipes-list')
+        # Caches the user and the recipe cards
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small_table_queries:
+            self.client.get(url)
+
+        baker.make(Recipe, user=self.user, _quantity=10)
+        baker.make(Recipe, is_public=True, _quantity=10)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as large_table_queries:
+            self.client.get(url)
+
+        self.assertEqual(
+            len(small_table_queries), len(large_table_queries)
+        )
+
+    def test_delete_confirmation_modal_is_shared(self):
+        response = self.client.get(reverse('recipy:recipes-list'))
+        content = response.content.decode()
+
+        self.assertEqual(1, content.count('id="confirm-delete-recipe"'))
+        self.assertContains(
+            response,
+            '<form id="confirm-delete-recipe-form" method="post">'
+            '<input type="hidden" name="csrfmiddlewaretoken"',
+        )
+        for recipe in response.context['user_recipes_page'].object_list:
+            delete_url = reverse('recipy:recipe-delete', args=(recipe.pk,))
+            self.assertContains(response, f'data-form-action="{delete_url}"')
+        for recipe in response.context['public_recipes_page'].object_list:
+            delete_url = reverse('recipy:recipe-delete', args=(recipe.pk,))
+            self.assertNotContains(response, delete_url)
+
+        # The cards of the next page use the same modal
+        response = self.client.get(
+            reverse('recipy:recipes-list-more'),
+            data={'section': 'user', 'cursor': response.context[
+                'user_recipes_page'].next_cursor},
+        )
+        self.assertContains(response, 'data-target="#confirm-delete-recipe"')
+        self.assertNotContains(response, 'id="confirm-delete-recipe"')
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse('recipy:recipes-list'), data={'user_cursor': 'invalid'}
+        )
+        self.assertEqual(404, response.status_code)
+
+    def test_more_view_unknown_section(self):
+        response = self.client.get(
+            reverse('recipy:recipes-list-more'), data={'section': 'unknown'}
+        )
+        self.assertEqual(404, response.status_code)
+
+
+class QueryCountTests(TestCase):
+    """Guards against N+1 queries. The number of queries must not depend on
+    the number of recipes, steps or ingredients shown on the page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = baker.make(get_user_model())
+        recipes = [
+            *baker.make(Recipe, user=cls.user, _quantity=5),
+            *baker.make(Recipe, is_public=True, _quantity=5),
+        ]
+        for recipe in recipes:
+            baker.make(Step, recipe=recipe, duration_minutes=5, _quantity=5)
+            baker.make(Ingredient, recipe=recipe, _quantity=5)
+
+        cls.public_recipe = recipes[-1]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_recipe_list(self):
+        url = reverse('recipy:recipes-list')
+        # The first request caches the user
+        self.client.get(url)
+
+        # User recipes page, public recipes page. The session and the user
+        # are cached.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(200, response.status_code)
+
+    def test_recipe_list_without_session_and_user_caching(self):
+        middleware = [
+            'django.contrib.auth.middleware.AuthenticationMiddleware'
+            if name == 'accounts.middleware.CachedUserAuthenticationMiddleware'
+            else name for name in settings.MIDDLEWARE
+        ]
+        url = reverse('recipy:recipes-list')
+        with override_settings(
+                SESSION_ENGINE='django.contrib.sessions.backends.db',
+                MIDDLEWARE=middleware):
+            self.client.force_login(self.user)
+            self.client.get(url)
+
+            # Session, user, user recipes page, public recipes page
+            with self.assertNumQueries(4):
+                self.client.get(url)
+
+    def test_recipe_detail(self):
+        url = reverse('recipy:recipe-detail', args=(self.public_recipe.pk,))
+        self.client.get(url)
+
+        # Recipe, ingredients, steps
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+
+        self.assertEqual(200, response.status_code)
+
+
+class RecipeAccessControlTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.other_user = baker.make(get_user_model())
+        self.client.force_login(self.user)
+
+        self.public_recipe = baker.make(
+            Recipe, user=self.other_user, is_public=True
+        )
+        self.private_recipe = baker.make(Recipe, user=self.other_user)
+
+    def assertStatusCode(self, status_code, url_name, recipe_pk,
+                         method='get'):
+        url = reverse(url_name, args=(recipe_pk,))
+        with self.assertLogs('django.request', 'WARNING'):
+            response = getattr(self.client, method)(url)
+        self.assertEqual(status_code, response.status_code)
+
+    def test_forbidden(self):
+        # User, the filtered lookup and the existence check. The session is
+        # cached.
+        with self.assertNumQueries(3):
+            self.assertStatusCode(403, 'recipy:recipe-detail',
+                                  self.private_recipe.pk)
+
+        for recipe in (self.public_recipe, self.private_recipe):
+            self.assertStatusCode(403, 'recipy:recipe-update', recipe.pk)
+            self.assertStatusCode(403, 'recipy:recipe-delete', recipe.pk,
+                                  method='post')
+        self.assertTrue(Recipe.objects.filter(pk=self.public_recipe.pk)
+                        .exists())
+
+    def test_not_found(self):
+        for url_name in ('recipy:recipe-detail', 'recipy:recipe-update'):
+            self.assertStatusCode(404, url_name, 0)
+
+    def test_login_required(self):
+        self.client.logout()
+        url = reverse('recipy:recipe-detail', args=(self.public_recipe.pk,))
+
+        # The recipe isn't looked up
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("accounts:login")}?next={url}'
+        )
+
+
+@override_settings(RECIPY_RECIPES_PER_PAGE=2)
+class ASGIViewTests(TestCase):
+    """The async test client runs the middleware like an ASGI server, so its
+    requests are resolved with RECIPY_ASGI_URLCONF."""
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+        baker.make(Recipe, user=self.user, _quantity=2)
+        self.recipe = baker.make(Recipe, user=self.user, title='Pancakes')
+        self.private_recipe = baker.make(Recipe, is_public=False)
+
+    def assertServedByAsyncView(self, response):
+        self.assertTrue(response.resolver_match.func.view_class.view_is_async)
+
+    def test_wsgi_requests_are_served_by_sync_views(self):
+        for url, view_class in (
+                (reverse('recipy:recipes-list'), RecipeListView),
+                (reverse('recipy:recipe-detail', args=(self.recipe.pk,)),
+                 RecipeDetailView),
+                (reverse('recipy:api-recipes-list'), RecipeApiListView)):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(200, response.status_code)
+                self.assertIs(view_class,
+                              response.resolver_match.func.view_class)
+
+    async def test_read_paths_are_served_by_async_views(self):
+        list_url = reverse('recipy:recipes-list')
+        response = await self.async_client.get(list_url)
+        self.assertServedByAsyncView(response)
+        self.assertContains(response, 'Pancakes')
+
+        cursor = response.context['user_recipes_page'].next_cursor
+        response = await self.async_client.get(
+            reverse('recipy:recipes-list-more'),
+            {'section': 'user', 'cursor': cursor},
+        )
+        self.assertServedByAsyncView(response)
+        self.assertEqual(1, len(response.context['recipes']))
+
+        url = reverse('recipy:recipe-detail', args=(self.recipe.pk,))
+        response = await self.async_client.get(url)
+        self.assertServedByAsyncView(response)
+        self.assertContains(response, 'Pancakes')
+        response = await self.async_client.get(
+            url, **{'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(304, response.status_code)
+
+        for url_name, args in (('recipy:api-recipes-list', ()),
+                               ('recipy:api-recipe-detail', (self.recipe.pk,)),
+                               ('recipy:api-recipe-changes', ())):
+            url = reverse(url_name, args=args)
+            response = await self.async_client.get(url)
+            self.assertServedByAsyncView(response)
+            self.assertEqual(
+                (await sync_to_async(self.client.get)(url)).json(),
+                response.json(),
+            )
+
+    async def test_async_views_apply_the_access_policies(self):
+        url = reverse('recipy:recipe-detail', args=(self.private_recipe.pk,))
+        with self.assertLogs('django.request', 'WARNING'):
+            response = await self.async_client.get(url)
+        self.assertEqual(403, response.status_code)
+
+        await sync_to_async(self.async_client.logout)()
+        url = reverse('recipy:recipes-list')
+        response = await self.async_client.get(url)
+        self.assertRedirects(
+            response, f'{reverse("accounts:login")}?next={url}',
+            fetch_redirect_response=False,
+        )
+
+
+class RecipeDetailCachingTests(TestCase):
+
+    def setUp(self):
+        self.user = baker.make(get_user_model())
+        self.other_user = baker.make(get_user_model())
+        self.client.force_login(self.user)
+
+        self.public_recipe = baker.make(
+            Recipe, user=self.other_user, is_public=True
+        )
+        self.own_recipe = baker.make(Recipe, user=self.user)
+
+    def get(self, recipe, **headers):
+        return self.client.get(
+            reverse('recipy:recipe-detail', args=(recipe.pk,)), **headers
+        )
+
+    def test_not_modified(self):
+        response = self.get(self.public_recipe)
+        etag = response['ETag']
+
+        # Only the recipe, the steps and ingredients are not loaded. The
+        # session and the user are cached.
+        with self.assertNumQueries(1):
+            response = self.get(self.public_recipe, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+
+        baker.make(Step, recipe=self.public_recipe)
+        response = self.get(self.public_recipe, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+
+    def test_etag_depends_on_user(self):
+        etag = self.get(self.public_recipe)['ETag']
+
+        self.client.force_login(baker.make(get_user_model()))
+        response = self.get(self.public_recipe, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+
+    def test_cache_control(self):
+        # The page shows the user, shared caches must not store it
+        response = self.get(self.public_recipe)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        response = self.get(self.own_recipe)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        # Private recipes of other users are never served
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.get(
+                baker.make(Recipe, user=self.other_user),
+                HTTP_IF_NONE_MATCH='*',
+            )
+        self.assertEqual(403, response.status_code)
+
+    def test_pages_with_messages_are_not_cached(self):
+        demo_user = baker.make(
+            get_user_model(), username=settings.RECIPY_DEMO_USER['username']
+        )
+        self.client.force_login(demo_user)
+        etag = self.get(self.public_recipe)['ETag']
+        # Adds a warning for the next page
+        self.client.get(reverse('recipy:recipe-import'))
+
+        response = self.get(self.public_recipe, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Demo user cannot import recipes.')
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
@@ -15,6 +15,9 @@ Including another URLconf
 """
 from django.urls import path
 
+from recipy.api import (
+    RecipeApiListView, RecipeApiDetailView, RecipeApiChangesView
+)
 from recipy.views import *
 
 app_name = 'recipy'
@@ -25,6 +28,25 @@ urlpatterns = [
 
     # /recipes
     path('recipes', RecipeListView.as_view(), name='recipes-list'),
+    path(
+        'recipes/more', RecipeListMoreView.as_view(),
+        name='recipes-list-more'
+    ),
+    path('recipes/search', RecipeSearchView.as_view(), name='recipe-search'),
+    path('recipes/pantry', RecipePantryView.as_view(), name='recipe-pantry'),
+    path('recipes/export', RecipeExportView.as_view(), name='recipe-export'),
+    path(
+        'recipes/imports/create', RecipeImportCreateView.as_view(),
+        name='recipe-import'
+    ),
+    path(
+        'recipes/imports/<int:pk_import>', RecipeImportDetailView.as_view(),
+        name='recipe-import-detail'
+    ),
+    path(
+        'recipes/imports/<int:pk_import>/errors',
+        RecipeImportErrorsView.as_view(), name='recipe-import-errors'
+    ),
     path('recipes/create', RecipeCreateView.as_view(), name='recipe-create'),
     path(
         'recipes/<int:pk_recipe>/update',
@@ -38,4 +60,18 @@ urlpatterns = [
         'recipes/<int:pk_recipe>', RecipeDetailView.as_view(),
         name='recipe-detail'
     ),
+
+    # /api
+    path('api/recipes', RecipeApiListView.as_view(), name='api-recipes-list'),
+    path(
+        'api/recipes/<int:pk_recipe>', RecipeApiDetailView.as_view(),
+        name='api-recipe-detail'
+    ),
+    path(
+        'api/recipes/changes', RecipeApiChangesView.as_view(),
+        name='api-recipe-changes'
+    ),
+
+    # /metrics
+    path('metrics', ViewMetricsView.as_view(), name='view-metrics'),
 ]
@@ -0,0 +1,36 @@
+"""recipy URL Configuration under ASGI, see RECIPY_ASGI_URLCONF
+
+The same as recipy.urls, except that the recipe read paths are served by
+their async views.
+"""
+from django.urls import path
+
+from recipy import urls
+from recipy.api import (
+    AsyncRecipeApiListView, AsyncRecipeApiDetailView,
+    AsyncRecipeApiChangesView
+)
+from recipy.views import (
+    AsyncRecipeListView, AsyncRecipeListMoreView, AsyncRecipeDetailView
+)
+
+app_name = urls.app_name
+
+# By URL name
+async_views = {
+    'recipes-list': AsyncRecipeListView,
+    'recipes-list-more': AsyncRecipeListMoreView,
+    'recipe-detail': AsyncRecipeDetailView,
+    'api-recipes-list': AsyncRecipeApiListView,
+    'api-recipe-detail': AsyncRecipeApiDetailView,
+    'api-recipe-changes': AsyncRecipeApiChangesView,
+}
+
+urlpatterns = [
+    path(
+        str(pattern.pattern), async_views[pattern.name].as_view(),
+        name=pattern.name,
+    )
+    if pattern.name in async_views else pattern
+    for pattern in urls.urlpatterns
+]
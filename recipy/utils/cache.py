@@ -0,0 +1,183 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from recipy.models import Recipe
+
+
+class RecipeCardCache:
+    """Cache of the rendered recipe cards shown in the recipe list.
+
+    Every recipe has a version token in the cache and the card keys include
+    it, together with the card variant (owner or public) and the language.
+    Invalidating a recipe only deletes its version token, which makes all
+    the cached cards of the recipe unreachable at once, no matter how many
+    languages or variants were cached. The unreachable cards expire on their
+    own.
+
+    Hits and misses are counted in the cache itself so that the counters are
+    shared by all the worker processes when a shared backend is used.
+
+    Configured with the RECIPY_CARD_CACHE setting:
+        - alias: alias of the cache in CACHES
+        - timeout: number of seconds the cards are kept in the cache
+    """
+    OWNER = 'owner'
+    PUBLIC = 'public'
+    variants = (OWNER, PUBLIC)
+
+    key_prefix = 'recipy:card'
+    # Part of the card keys. Bump it when the card markup changes so that
+    # the cards cached by the previous release aren't shown.
+    markup_version = 3
+    stats_keys = {
+        'hits': f'{key_prefix}:stats:hits',
+        'misses': f'{key_prefix}:stats:misses',
+    }
+
+    def __init__(self):
+        self.cache = caches[settings.RECIPY_CARD_CACHE['alias']]
+        self.timeout = settings.RECIPY_CARD_CACHE['timeout']
+        # Versions looked up by this instance. Saves a round trip when the
+        # cards missing from get_many are stored using set_many.
+        self._versions = {}
+
+    def get_many(self, recipe_pks, variant, language):
+        """Returns a dictionary of recipe PKs and their cached cards. Recipes
+        whose cards are not cached are left out."""
+        card_keys = self._get_card_keys(recipe_pks, variant, language)
+        cached_cards = self.cache.get_many(card_keys.keys())
+
+        cards = {
+            card_keys[card_key]: card
+            for card_key, card in cached_cards.items()
+        }
+        self._count('hits', len(cards))
+        self._count('misses', len(card_keys) - len(cards))
+
+        return cards
+
+    def set_many(self, cards, variant, language):
+        """Caches the cards given as a dictionary of recipe PKs and cards."""
+        card_keys = self._get_card_keys(cards.keys(), variant, language)
+        self.cache.set_many({
+            card_key: cards[recipe_pk]
+            for card_key, recipe_pk in card_keys.items()
+        }, timeout=self.timeout)
+
+    def invalidate(self, recipe_pk):
+        self._versions.pop(recipe_pk, None)
+        self.cache.delete(self._get_version_key(recipe_pk))
+
+    def get_stats(self):
+        stats = self.cache.get_many(self.stats_keys.values())
+        return {
+            name: stats.get(key, 0) for name, key in self.stats_keys.items()
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many(self.stats_keys.values())
+
+    def _get_card_keys(self, recipe_pks, variant, language):
+        if variant not in self.variants:
+            msg = f'"{variant}" is not a valid card variant. Possible values '
+            msg += f'are: {self.variants}.'
+            raise ValueError(msg)
+
+        versions = self._get_versions(recipe_pks)
+        return {
+            f'{self.key_prefix}:{self.markup_version}:{recipe_pk}:{version}:'
+            f'{variant}:{language}': recipe_pk
+            for recipe_pk, version in versions.items()
+        }
+
+    def _get_versions(self, recipe_pks):
+        version_keys = {
+            self._get_version_key(recipe_pk): recipe_pk
+            for recipe_pk in recipe_pks if recipe_pk not in self._versions
+        }
+
+        if version_keys:
+            versions = self.cache.get_many(version_keys.keys())
+
+            missing_versions = {
+                version_key: uuid.uuid4().hex
+                for version_key in version_keys.keys() - versions.keys()
+            }
+            if missing_versions:
+                self.cache.set_many(missing_versions, timeout=self.timeout)
+                versions.update(missing_versions)
+
+            self._versions.update({
+                recipe_pk: versions[version_key]
+                for version_key, recipe_pk in version_keys.items()
+            })
+
+        return {
+            recipe_pk: self._versions[recipe_pk] for recipe_pk in recipe_pks
+        }
+
+    def _get_version_key(self, recipe_pk):
+        return f'{self.key_prefix}:{recipe_pk}:version'
+
+    def _count(self, name, value):
+        if not value:
+            return
+
+        key = self.stats_keys[name]
+        # incr fails on missing keys. add is a no-op if the key exists.
+        self.cache.add(key, 0, timeout=None)
+        try:
+            self.cache.incr(key, value)
+        except ValueError:
+            # The counter expired or was reset in the meantime
+            pass
+
+
+def render_recipe_cards(recipes, variant, queryset=None):
+    """Renders the list cards of the recipes, reusing the cached ones.
+
+    The recipes were loaded before the versions of their cards were read. A
+    recipe changed in between would be cached as stale under the new
+    version, so the missing cards are rendered from the recipes loaded again
+    after the versions.
+
+    Args:
+        queryset: loads the recipes of the missing cards, by default the
+            recipes with their authors
+
+    Returns:
+        list of (recipe, card HTML) tuples in the order of the recipes
+    """
+    card_cache = RecipeCardCache()
+    language = get_language()
+
+    cards = card_cache.get_many(
+        [recipe.pk for recipe in recipes], variant, language
+    )
+
+    missing_pks = [recipe.pk for recipe in recipes if recipe.pk not in cards]
+    if missing_pks:
+        if queryset is None:
+            queryset = Recipe.objects.select_related('user')
+        # Deleted in the meantime, not cached
+        fresh_recipes = queryset.in_bulk(missing_pks)
+        rendered_cards = {
+            recipe.pk: render_to_string('recipy/recipe_card.html', {
+                'recipe': fresh_recipes.get(recipe.pk, recipe),
+                'is_owner': variant == RecipeCardCache.OWNER,
+            })
+            for recipe in recipes if recipe.pk in missing_pks
+        }
+        card_cache.set_many(
+            {pk: card for pk, card in rendered_cards.items()
+             if pk in fresh_recipes},
+            variant, language,
+        )
+        cards.update(rendered_cards)
+
+    return [(recipe, mark_safe(cards[recipe.pk])) for recipe in recipes]
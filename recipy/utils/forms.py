@@ -0,0 +1,47 @@
+def save_formset_in_bulk(formset, parent):
+    """Saves the forms of an inline formset using bulk_create for the new
+    objects and bulk_update for the changed ones, instead of a query per form.
+    Forms without changes are skipped. Deleting is not supported.
+
+    Neither bulk_create nor bulk_update send the model signals, so the caller
+    is responsible for anything the signal handlers would do.
+
+    Args:
+        formset: validated inline formset
+        parent: saved instance the objects belong to
+
+    Returns:
+        True if any object was created or updated
+    """
+    model = formset.model
+    field_names = {
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name != formset.fk.name
+    }
+
+    new_objects = []
+    changed_objects = []
+    changed_field_names = set()
+    for form in formset.forms:
+        if not form.has_changed():
+            continue
+
+        obj = form.save(commit=False)
+        setattr(obj, formset.fk.name, parent)
+        if obj._state.adding:
+            new_objects.append(obj)
+        else:
+            changed_objects.append(obj)
+            changed_field_names.update(
+                field_name for field_name in form.changed_data
+                if field_name in field_names
+            )
+
+    if new_objects:
+        model.objects.bulk_create(new_objects)
+    if not changed_field_names:
+        changed_objects = []
+    if changed_objects:
+        model.objects.bulk_update(changed_objects, changed_field_names)
+
+    return bool(new_objects or changed_objects)
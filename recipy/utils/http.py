@@ -0,0 +1,35 @@
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def make_etag(*values):
+    """Returns a quoted ETag which changes when any of the values changes."""
+    values = '|'.join(str(value) for value in values)
+    return quote_etag(hashlib.md5(values.encode()).hexdigest())
+
+
+def get_not_modified_response(request, etag, last_modified=None):
+    """Returns 304 Not Modified (or 412 Precondition Failed) if the
+    conditional headers of the request match, otherwise None.
+
+    Args:
+        etag: current ETag of the resource, see make_etag
+        last_modified: datetime of the last change of the resource
+    """
+    return get_conditional_response(
+        request, etag=etag,
+        last_modified=timegm(last_modified.utctimetuple())
+        if last_modified else None,
+    )
+
+
+def set_validators(response, etag, last_modified=None):
+    """Sets the ETag and Last-Modified headers of the response."""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(
+            timegm(last_modified.utctimetuple())
+        )
@@ -0,0 +1,215 @@
+import posixpath
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipy.models import Recipe
+
+
+# Format name used in the renditions dictionary: (Pillow format, MIME type,
+# file extension)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', 'image/webp', 'webp'),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+}
+
+# Directory of the sample images copied by the seed_recipes command. Many
+# seeded recipes share each of them, so they are never deleted with a recipe.
+SEED_IMAGES_DIR = 'uploads/seed/'
+
+
+def normalize_image(image_name, storage=None):
+    """Saves a copy of the original image that is rotated according to the
+    EXIF orientation, no larger than the max_original_size setting and
+    without any metadata. The original is left in place, the caller deletes
+    it once nothing refers to it anymore.
+
+    Returns:
+        name of the copy in the storage
+
+    Raises:
+        PIL.UnidentifiedImageError: if the file is not a valid image
+        PIL.Image.DecompressionBombError: if the image is too large to decode
+    """
+    storage = storage or default_storage
+    config = settings.RECIPY_IMAGE_RENDITIONS
+
+    with storage.open(image_name) as image_file:
+        with Image.open(image_file) as image:
+            # verify() only checks the file structure, it doesn't decode
+            image.verify()
+
+    with storage.open(image_name) as image_file:
+        with Image.open(image_file) as image:
+            image_format = image.format
+            image = ImageOps.exif_transpose(image)
+
+    max_size = config['max_original_size']
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG':
+        image = image.convert('RGB')
+
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=config['quality'])
+
+    # The original still exists, so the storage picks a free name
+    return storage.save(image_name, ContentFile(buffer.getvalue()))
+
+
+def get_rendition_name(image_name, width, rendition_format):
+    """Builds the storage name of a rendition. For example, for the image
+    "uploads/photo.jpg", the 320px wide WebP rendition is stored as
+    "renditions/uploads/photo.jpg-320w.webp".
+
+    The whole name of the original is kept, so the renditions of
+    "uploads/photo.jpg" and "uploads/photo.png" never share a name.
+    """
+    extension = RENDITION_FORMATS[rendition_format][2]
+    return f'renditions/{image_name}-{width}w.{extension}'
+
+
+# Inverse of get_rendition_name, captures the name of the original image. The
+# storage can add a random suffix if the name is taken.
+RENDITION_NAME_RE = re.compile(
+    r'^renditions/(?P<image>.+\.\w+)-\d+w(_[a-zA-Z0-9]{7})?\.[a-z]+$'
+)
+
+
+def generate_renditions(image_name, storage=None):
+    """Generates resized copies of the image in all the configured widths and
+    formats. The copies are rotated according to the EXIF orientation and
+    saved without any metadata.
+
+    Widths larger than the original image are skipped, but there is always at
+    least one rendition in each format.
+
+    Args:
+        image_name: name of the original image in the storage
+        storage: by default, the default storage
+
+    Returns:
+        dictionary of the renditions, for example:
+        {'webp': {'320': 'renditions/...', ...}, 'jpeg': {...}}
+    """
+    storage = storage or default_storage
+    config = settings.RECIPY_IMAGE_RENDITIONS
+
+    with storage.open(image_name) as image_file:
+        with Image.open(image_file) as image:
+            image = ImageOps.exif_transpose(image)
+            # Drops the alpha channel and the palette which JPEG can't store.
+            # Any remaining metadata is not passed to save, so it's stripped.
+            image = image.convert('RGB')
+
+    widths = sorted(
+        width for width in config['widths'] if width <= image.width
+    ) or [image.width]
+
+    renditions = {rendition_format: {} for rendition_format in RENDITION_FORMATS}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized_image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        for rendition_format, (pil_format, _, _) in RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            resized_image.save(
+                buffer, pil_format, quality=config['quality'], optimize=True
+            )
+
+            # Existing files are never overwritten, they could still be
+            # used. The storage picks a free name instead.
+            name = get_rendition_name(image_name, width, rendition_format)
+            renditions[rendition_format][str(width)] = storage.save(
+                name, ContentFile(buffer.getvalue())
+            )
+
+    return renditions
+
+
+def is_seed_image(name):
+    """Tells whether the file is one of the seeded sample images or their
+    renditions, see SEED_IMAGES_DIR."""
+    # The renditions are named after the original, see get_rendition_name
+    return name.startswith((SEED_IMAGES_DIR, f'renditions/{SEED_IMAGES_DIR}'))
+
+
+def delete_renditions(renditions, storage=None):
+    storage = storage or default_storage
+    for rendition_names in renditions.values():
+        for name in rendition_names.values():
+            if not is_seed_image(name):
+                storage.delete(name)
+
+
+def get_srcset(renditions, rendition_format, storage=None):
+    """Returns the srcset attribute value for the renditions in the format."""
+    storage = storage or default_storage
+    rendition_names = renditions.get(rendition_format, {})
+    return ', '.join(
+        f'{storage.url(name)} {width}w'
+        for width, name in sorted(
+            rendition_names.items(), key=lambda item: int(item[0])
+        )
+    )
+
+
+def list_files(path, storage=None):
+    """Yields the names of all the files in the directory and its
+    subdirectories."""
+    storage = storage or default_storage
+    if not storage.exists(path):
+        return
+
+    directories, files = storage.listdir(path)
+    for file_name in files:
+        yield posixpath.join(path, file_name)
+    for directory in directories:
+        yield from list_files(posixpath.join(path, directory), storage)
+
+
+def find_orphaned_images(batch_size=1000, min_age=None, storage=None):
+    """Yields the names of the uploaded recipe images and their renditions
+    which are not used by any recipe. The recipes are looked up in batches.
+
+    Args:
+        batch_size: number of image names looked up in a single query
+        min_age: timedelta, newer files are skipped because their recipe
+            could still be being saved
+        storage: by default, the default storage
+    """
+    storage = storage or default_storage
+    max_modified_time = timezone.now() - min_age if min_age else None
+
+    def is_old_enough(name):
+        return max_modified_time is None or \
+            storage.get_modified_time(name) <= max_modified_time
+
+    # Renditions are grouped by the name of their original image
+    renditions = {}
+    for name in list_files('renditions', storage):
+        match = RENDITION_NAME_RE.match(name)
+        if match:
+            renditions.setdefault(match.group('image'), []).append(name)
+
+    upload_to = Recipe._meta.get_field('image').upload_to.rstrip('/')
+    images = list_files(upload_to, storage)
+    while batch := [name for _, name in zip(range(batch_size), images)]:
+        used_images = set(
+            Recipe.objects.filter(image__in=batch)
+            .values_list('image', flat=True)
+        )
+        for name in batch:
+            if name in used_images or not is_old_enough(name):
+                renditions.pop(name, None)
+            else:
+                yield name
+                yield from renditions.pop(name, ())
+
+    # Renditions whose original image doesn't exist anymore
+    for rendition_names in renditions.values():
+        yield from filter(is_old_enough, rendition_names)
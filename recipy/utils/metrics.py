@@ -0,0 +1,88 @@
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from django.conf import settings
+
+
+@dataclass
+class RequestMetrics:
+    total_ms: float
+    db_ms: float
+    render_ms: float
+    queries: int
+
+
+METRIC_NAMES = ('total_ms', 'db_ms', 'render_ms', 'queries')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of a sorted list of values."""
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class ViewMetricsStore:
+    """Keeps the metrics of the last requests of every view in memory. The
+    number of kept requests per view is limited by the buffer_size of the
+    RECIPY_VIEW_METRICS setting, so the memory use is bounded.
+
+    Every process has its own store, so the reports only cover the requests
+    handled by the process serving the report.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def record(self, view_name, request_metrics: RequestMetrics):
+        with self._lock:
+            buffer = self._buffers.get(view_name)
+            if buffer is None:
+                buffer = self._buffers[view_name] = deque(
+                    maxlen=settings.RECIPY_VIEW_METRICS['buffer_size']
+                )
+            buffer.append(request_metrics)
+
+    def get_summary(self):
+        """Returns the percentiles of the metrics of every view.
+
+        Returns:
+            dictionary of view names and their summaries, for example:
+            {'recipy:recipes-list': {
+                'count': 120,
+                'total_ms': {'p50': 35.2, 'p95': 80.1, 'p99': 120.5},
+                'queries': {'p50': 4, 'p95': 4, 'p99': 5},
+                ...
+            }}
+        """
+        with self._lock:
+            buffers = {
+                view_name: list(buffer)
+                for view_name, buffer in self._buffers.items()
+            }
+
+        summary = {}
+        for view_name, requests in sorted(buffers.items()):
+            view_summary = {'count': len(requests)}
+            for metric_name in METRIC_NAMES:
+                values = sorted(
+                    getattr(request_metrics, metric_name)
+                    for request_metrics in requests
+                )
+                view_summary[metric_name] = {
+                    f'p{percent}': percentile(values, percent)
+                    for percent in PERCENTILES
+                }
+            summary[view_name] = view_summary
+
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._buffers = {}
+
+
+view_metrics = ViewMetricsStore()
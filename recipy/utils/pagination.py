@@ -0,0 +1,136 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Paginates a queryset by seeking past the last row of the previous page
+    instead of using OFFSET. The cost of fetching a page is the same no
+    matter how deep into the results it is, as long as there is an index
+    that matches the ordering.
+
+    The ordering needs to be unique (end with the primary key) so that no
+    rows are skipped or repeated between pages.
+
+    Usage:
+        >>> paginator = KeysetPaginator(Recipe.objects.all(), per_page=30)
+        >>> page = paginator.get_page(request.GET.get('cursor'))
+        >>> page.object_list, page.next_cursor
+        >>>
+        >>> # In async views
+        >>> page = await paginator.aget_page(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created', '-pk')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    def get_page(self, cursor=None) -> KeysetPage:
+        """Returns the page that starts after the cursor. If the cursor is
+        empty, returns the first page.
+
+        Raises:
+            InvalidCursor: if the cursor was not created by this paginator
+        """
+        return self._make_page(list(self._get_page_queryset(cursor)))
+
+    async def aget_page(self, cursor=None) -> KeysetPage:
+        """Async version of get_page."""
+        return self._make_page(
+            [obj async for obj in self._get_page_queryset(cursor)]
+        )
+
+    def _get_page_queryset(self, cursor):
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._get_seek_filter(cursor))
+
+        # Fetch one extra row to know if there is a next page without running
+        # a COUNT query.
+        return queryset[:self.per_page + 1]
+
+    def _make_page(self, object_list):
+        if len(object_list) <= self.per_page:
+            return KeysetPage(object_list, next_cursor=None)
+
+        object_list = object_list[:self.per_page]
+        return KeysetPage(
+            object_list, next_cursor=self.encode_cursor(object_list[-1])
+        )
+
+    def encode_cursor(self, obj) -> str:
+        values = [
+            self._get_field(field_name).value_to_string(obj)
+            for field_name, _ in self._iter_ordering()
+        ]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> list:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor(f'Invalid cursor "{cursor}".') from e
+
+        ordering = list(self._iter_ordering())
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise InvalidCursor(f'Invalid cursor "{cursor}".')
+
+        try:
+            return [
+                self._get_field(field_name).to_python(value)
+                for (field_name, _), value in zip(ordering, values)
+            ]
+        except ValidationError as e:
+            raise InvalidCursor(f'Invalid cursor "{cursor}".') from e
+
+    def _get_seek_filter(self, cursor):
+        """Builds (a < x) OR (a = x AND b < y) OR ... for the ordering fields.
+        For ascending fields, the comparison is flipped."""
+        values = self.decode_cursor(cursor)
+        ordering = list(self._iter_ordering())
+
+        seek_filter = Q()
+        for index, (field_name, descending) in enumerate(ordering):
+            lookup = 'lt' if descending else 'gt'
+            condition = Q(**{f'{field_name}__{lookup}': values[index]})
+            for previous_index in range(index):
+                previous_name = ordering[previous_index][0]
+                condition &= Q(**{previous_name: values[previous_index]})
+            seek_filter |= condition
+
+        return seek_filter
+
+    def _iter_ordering(self):
+        for field in self.ordering:
+            yield field.lstrip('-'), field.startswith('-')
+
+    def _get_field(self, field_name):
+        opts = self.queryset.model._meta
+        if field_name == 'pk':
+            return opts.pk
+
+        return opts.get_field(field_name)
@@ -0,0 +1,55 @@
+from django.db import models
+
+from recipy.models import Recipe
+
+
+def get_recipe_dependent_querysets(recipe_pks):
+    """Returns the querysets of the rows which reference the recipes, i.e.
+    the rows deleted by the cascade, keyed by model label.
+
+    Raises:
+        ValueError: if a relation is not a plain cascade which can be deleted
+            with a single query
+    """
+    querysets = {}
+    for related_object in Recipe._meta.related_objects:
+        related_model = related_object.related_model
+        if related_object.on_delete is not models.CASCADE or \
+                related_model._meta.related_objects:
+            msg = f'Relation "{related_object.name}" of recipes can\'t be '
+            msg += f'deleted in bulk. Only cascades to models without '
+            msg += f'relations of their own are supported.'
+            raise ValueError(msg)
+
+        querysets[related_model._meta.label] = \
+            related_model._base_manager.filter(
+                **{f'{related_object.field.name}__in': recipe_pks}
+            )
+
+    for field in Recipe._meta.many_to_many:
+        through = field.remote_field.through
+        querysets[through._meta.label] = through._base_manager.filter(
+            **{f'{field.m2m_field_name()}__in': recipe_pks}
+        )
+
+    return querysets
+
+
+def delete_recipes_in_bulk(recipe_pks):
+    """Deletes a chunk of recipes with QuerySet.delete, so the signal
+    handlers record the deletions in the change feed, subtract them from the
+    usage and delete the renditions and the cached cards (see recipy.signals).
+    The rows referencing the recipes are deleted with one query per model,
+    unless the model has signal handlers which need the rows.
+
+    The original images are left to the caller, see find_orphaned_images.
+
+    Should be called in a transaction.
+
+    Returns:
+        dictionary of model labels and the number of deleted rows
+    """
+    _, deleted_counts = Recipe._base_manager.filter(
+        pk__in=recipe_pks
+    ).delete()
+    return deleted_counts
@@ -0,0 +1,33 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+class ImportsStorage(FileSystemStorage):
+    """Storage of the uploaded import files in RECIPY_IMPORTS_ROOT. The files
+    contain private recipes, so they have no URL and the directory must not
+    be served."""
+
+    def __init__(self):
+        super().__init__(base_url=None)
+
+    @property
+    def base_location(self):
+        # Read on every access, so the setting can be overridden in the tests
+        return settings.RECIPY_IMPORTS_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        raise ValueError('The import files are not served.')
+
+
+def get_import_file_name(instance, filename):
+    """Random name of an uploaded import file. The original name is kept as
+    the source of the import."""
+    _, extension = os.path.splitext(filename)
+    return f'{uuid.uuid4().hex}{extension.lower()}'
@@ -1,8 +1,14 @@
-def get_id_for_model_instance(model_instance, action_prefix=''):
-    model_name = model_instance._meta.model_name
-
-    id_components = (model_name, str(model_instance.pk))
+def get_id_for_model(model, action_prefix=''):
+    """Returns the HTML id of an element shared by all the instances of the
+    model, e.g. a modal whose content is filled in by the button that opens
+    it."""
+    id_components = (model._meta.model_name,)
     if action_prefix:
         id_components = (action_prefix, *id_components)
 
     return '-'.join(id_components)
+
+
+def get_id_for_model_instance(model_instance, action_prefix=''):
+    return f'{get_id_for_model(model_instance, action_prefix)}-' \
+           f'{model_instance.pk}'
@@ -1,16 +1,27 @@
 import abc
-from enum import Enum
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.mixins import AccessMixin, LoginRequiredMixin
 from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
+from django.utils.translation import gettext as _
 from django.views import View
 from django.views.generic.detail import SingleObjectMixin
 from django.views.generic.edit import DeletionMixin
 
+from recipy.models import Recipe
+from recipy.quotas import get_limits, get_usage, lock_usage
+
+
+async def is_authenticated(request):
+    """Loads request.user, which queries the session and the user, in a
+    thread. Async views can use request.user directly afterwards."""
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
 
 class DirectDeleteView(SingleObjectMixin, DeletionMixin, View):
     """As opposed to regular DeleteView, this view does not have an
@@ -26,19 +37,21 @@ class DirectDeleteView(SingleObjectMixin, DeletionMixin, View):
         >>>     pk_url_kwarg = 'pk_object'
 
     Template examples using suggested tags:
-        >>> {% url 'object-delete' pk_object as form_action %}
-        >>> {% render_delete_confirmation_modal object_instance form_action %}
-        >>> {% show_delete_confirmation_modal_btn object_instance %}
+        >>> {% render_delete_confirmation_modal 'app.Object' %}
+        >>> {% url 'object-delete' pk_object as delete_url %}
+        >>> {% show_delete_confirmation_modal_btn object_instance delete_url %}
     """
     pass
 
 
 class DemoUserMixin:
     """
-    Checks permissions for the Demo user.
+    Checks permissions for the Demo user and the recipe quotas of the users
+    (see recipy.quotas).
 
     Possible options for `demo_user_permissions` tuple:
-        - can_add_recipe
+        - can_add_recipe: the user has recipes left in the quota
+        - can_import_recipes
 
     Usage:
         >>> from recipy.utils.views import DemoUserMixin
@@ -82,7 +95,7 @@ class DemoUserMixin:
 
     def _validate_demo_user_permissions(self):
         demo_user_permissions = self.get_demo_user_permissions()
-        valid_demo_user_permissions = ('can_add_recipe', )
+        valid_demo_user_permissions = ('can_add_recipe', 'can_import_recipes')
 
         for permission in demo_user_permissions:
             if permission not in valid_demo_user_permissions:
@@ -91,42 +104,53 @@ class DemoUserMixin:
                 msg += f'{valid_demo_user_permissions}.'
                 raise ImproperlyConfigured(msg)
 
-    def can_add_recipe(self):
-        if self._is_demo_user() and self._is_over_recipes_limit():
-            recipe_limit = settings.RECIPY_DEMO_USER['recipe_limit']
-            wmsg = f'Demo user can have no more than {recipe_limit} recipes. '
-            wmsg += f'Also, keep in mind that the demo user data is deleted '
-            wmsg += f'on daily basis. '
+    def can_add_recipe(self, lock=False):
+        """With lock, the usage stays locked until the end of the current
+        transaction, see recipy.quotas.lock_usage."""
+        user = self.request.user
+        recipe_limit = get_limits(user)['recipes']
+        if recipe_limit is None:
+            return True
+
+        usage = lock_usage(user) if lock else get_usage(user)
+        if usage.recipe_count >= recipe_limit:
+            wmsg = f'You can have no more than {recipe_limit} recipes. '
+            if self._is_demo_user():
+                wmsg += f'Also, keep in mind that the demo user data is '
+                wmsg += f'deleted on daily basis. '
             messages.warning(self.request, wmsg)
             return False
 
         return True
 
+    def can_import_recipes(self):
+        if self._is_demo_user():
+            messages.warning(self.request, 'Demo user cannot import recipes.')
+            return False
+
+        return True
+
     def _is_demo_user(self):
         user = self.request.user
         return user.username == settings.RECIPY_DEMO_USER['username']
 
-    def _is_over_recipes_limit(self):
-        user = self.request.user
-        return user.recipes.count() >= settings.RECIPY_DEMO_USER['recipe_limit']
-
 
-class RecipeAccessControlMixin(UserPassesTestMixin):
+class RecipeAccessControlMixin(AccessMixin):
     """
     Implementation of access control policies for recipes.
 
     This mixin should be applied in combination with SingleObjectMixin.
 
-    It implements the following policies:
-        - All users need to be authenticated
-        - All users are allowed to read public recipes
-        - Only the users that are authors of the recipes are allowed to
-            modify them
+    The policies (see RecipeQuerySet.visible_to) are applied by the queryset,
+    so the recipe is looked up with a single query which only finds it if
+    the user is allowed to take the action:
+        - Unauthenticated users are handled by handle_no_permission, i.e.
+            redirected to the login page
+        - Recipes the user isn't allowed to access are forbidden (403)
+        - Recipes which don't exist are not found (404)
     """
 
-    class Action(Enum):
-        READ = 'read'
-        MODIFY = 'modify'  # write or delete
+    Action = Recipe.Action
 
     action: Action = None
 
@@ -138,36 +162,97 @@ class RecipeAccessControlMixin(UserPassesTestMixin):
 
         return self.action
 
-    def setup(self, *args, **kwargs):
-        super().setup(*args, **kwargs)
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+
         # Loading the object attribute here because the DetailView,
-        # DeletionMixin, and UpdateView load it too late (in the dispatch
-        # method).
-        self.object = self.get_object()
+        # DeletionMixin, and UpdateView load it too late (in the handler
+        # methods).
+        try:
+            self.object = self.get_object()
+        except Http404:
+            # Only the existence is checked, the recipe isn't loaded
+            pk = self.kwargs.get(self.pk_url_kwarg)
+            if not self.model._default_manager.filter(pk=pk).exists():
+                raise
+
+            return self.handle_no_permission()
+
+        return super().dispatch(request, *args, **kwargs)
 
     # This needs to be overridden because above the self.object is loaded early
     # and this is to cache the result so that it's not done twice.
-    def get_object(self):
+    def get_object(self, queryset=None):
         if hasattr(self, 'object'):
             return self.object
 
-        return super().get_object()
+        return super().get_object(queryset)
 
-    def test_func(self):
-        user = self.request.user
-        if not user.is_authenticated:
-            return False
+    def get_queryset(self):
+        return super().get_queryset().visible_to(
+            self.request.user, self.get_action()
+        )
 
-        recipe = self.object
-        action = self.get_action()
-        if action == RecipeAccessControlMixin.Action.READ:
-            if recipe.user != user and not recipe.is_public:
-                return False
-        elif action == RecipeAccessControlMixin.Action.MODIFY:
-            if recipe.user != user:
-                return False
-        else:
-            msg = f'"{action}" is not a supported action. '
-            raise NotImplementedError(msg)
 
-        return True
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """LoginRequiredMixin for async views, i.e. views whose handlers are
+    coroutines. The user is loaded without blocking the event loop."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await is_authenticated(request):
+            return self.handle_no_permission()
+
+        # Skips the synchronous check of LoginRequiredMixin
+        return await super(LoginRequiredMixin, self).dispatch(
+            request, *args, **kwargs
+        )
+
+
+class AsyncRecipeAccessControlMixin(RecipeAccessControlMixin):
+    """RecipeAccessControlMixin for async views, i.e. views whose handlers
+    are coroutines. The user and the recipe are loaded with the async ORM
+    interface, the policies are the same.
+
+    Usage:
+        >>> class RecipeView(AsyncRecipeAccessControlMixin, SingleObjectMixin,
+        >>>                  View):
+        >>>     model = Recipe
+        >>>     pk_url_kwarg = 'pk_recipe'
+        >>>     action = AsyncRecipeAccessControlMixin.Action.READ
+        >>>
+        >>>     async def get(self, request, *args, **kwargs):
+        >>>         return JsonResponse({'title': self.object.title})
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await is_authenticated(request):
+            return self.handle_no_permission()
+
+        try:
+            self.object = await self.aget_object()
+        except Http404:
+            # Only the existence is checked, the recipe isn't loaded
+            pk = self.kwargs.get(self.pk_url_kwarg)
+            if not await self.model._default_manager.filter(pk=pk).aexists():
+                raise
+
+            return self.handle_no_permission()
+
+        # Skips the synchronous lookup of RecipeAccessControlMixin
+        return await super(RecipeAccessControlMixin, self).dispatch(
+            request, *args, **kwargs
+        )
+
+    async def aget_object(self):
+        """Async version of SingleObjectMixin.get_object, looks the recipe up
+        by the PK only."""
+        queryset = self.get_queryset()
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        try:
+            return await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise Http404(
+                _('No %(verbose_name)s found matching the query')
+                % {'verbose_name': queryset.model._meta.verbose_name}
+            )
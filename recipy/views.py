@@ -1,15 +1,43 @@
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.messages import get_messages
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import (
+    Http404, HttpResponseBadRequest, StreamingHttpResponse
+)
+from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.cache import (
+    add_never_cache_headers, patch_cache_control, patch_vary_headers
+)
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import (
-    ListView, CreateView, RedirectView, UpdateView, DetailView
+    ListView, CreateView, RedirectView, UpdateView, DetailView, TemplateView,
+    View
 )
 
-from recipy.forms import RecipeForm
-from recipy.models import Recipe
+from recipy.export import (
+    EXPORT_FORMATS, export_recipes, get_export_file_info
+)
+from recipy.forms import RecipeForm, RecipeImportForm
+from recipy.imports import iter_error_file
+from recipy.jobs import enqueue
+from recipy.models import Recipe, Step, Ingredient, RecipeImport
+from recipy.pantry import find_recipes_by_ingredients
+from recipy.search import search_recipes
+from recipy.utils.cache import RecipeCardCache, render_recipe_cards
+from recipy.utils.http import (
+    get_not_modified_response, make_etag, set_validators
+)
+from recipy.utils.metrics import view_metrics
+from recipy.utils.pagination import InvalidCursor, KeysetPaginator
 from recipy.utils.views import (
-    DirectDeleteView, DemoUserMixin, RecipeAccessControlMixin
+    AsyncLoginRequiredMixin, AsyncRecipeAccessControlMixin, DirectDeleteView,
+    DemoUserMixin, RecipeAccessControlMixin
 )
 
 
@@ -20,27 +48,274 @@ class IndexView(LoginRequiredMixin, RedirectView):
 
 
 class RecipeListView(LoginRequiredMixin, ListView):
+    """Shows the user's recipes and the public recipes of other users in two
+    separately paginated sections.
+
+    Each section uses keyset pagination so that the number of queries and
+    the amount of loaded rows is constant no matter how many recipes exist.
+    The cursor of each section is passed in the `<section>_cursor` GET
+    parameter.
+    """
     model = Recipe
     context_object_name = 'recipes'
     template_name = 'recipy/recipe_list.html'
+    sections = ('user', 'public')
+    card_variants = {
+        'user': RecipeCardCache.OWNER,
+        'public': RecipeCardCache.PUBLIC,
+    }
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        qs = qs.filter(Q(user=self.request.user) | Q(is_public=True))
-        return qs
+        return super().get_queryset().visible_to(self.request.user)
+
+    def get_section_queryset(self, section):
+        user = self.request.user
+        if section == 'user':
+            return Recipe.objects.filter(user=user)
+        elif section == 'public':
+            # The author is shown on the public recipe cards
+            return Recipe.objects.filter(is_public=True).exclude(user=user)\
+                .select_related('user')
+        else:
+            raise Http404(f'Unknown recipe list section "{section}".')
+
+    def get_section_cursors(self):
+        """Returns the cursors of the shown sections by their names."""
+        return {
+            section: self.request.GET.get(f'{section}_cursor')
+            for section in self.sections
+        }
+
+    def get_section_paginator(self, section):
+        return KeysetPaginator(
+            self.get_section_queryset(section),
+            per_page=settings.RECIPY_RECIPES_PER_PAGE,
+        )
+
+    def get_section_page(self, section, cursor=None):
+        try:
+            return self.get_section_paginator(section).get_page(cursor)
+        except InvalidCursor as e:
+            raise Http404(str(e))
+
+    def get_section_cards(self, section, page):
+        return render_recipe_cards(
+            page.object_list, self.card_variants[section],
+            queryset=self.get_section_queryset(section),
+        )
 
     def get_context_data(self, *args, **kwargs):
-        public_recipes = self.object_list.filter(is_public=True).exclude(
-            user=self.request.user
+        cursors = self.get_section_cursors()
+        user_recipes_page = self.get_section_page('user', cursors['user'])
+        public_recipes_page = self.get_section_page(
+            'public', cursors['public']
         )
-        user_recipes = self.object_list.filter(user=self.request.user)
 
         return super().get_context_data(
-            *args, public_recipes=public_recipes, user_recipes=user_recipes,
+            *args,
+            public_recipes=public_recipes_page.object_list,
+            public_recipes_page=public_recipes_page,
+            public_recipe_cards=self.get_section_cards(
+                'public', public_recipes_page
+            ),
+            user_recipes=user_recipes_page.object_list,
+            user_recipes_page=user_recipes_page,
+            user_recipe_cards=self.get_section_cards(
+                'user', user_recipes_page
+            ),
             **kwargs
         )
 
 
+class RecipeListMoreView(RecipeListView):
+    """Renders only the cards of the next page of one recipe list section.
+    Used by the "Load more" buttons."""
+    template_name = 'recipy/recipe_cards.html'
+
+    def get_section_cursors(self):
+        section = self.request.GET.get('section')
+        if section not in self.sections:
+            raise Http404(f'Unknown recipe list section "{section}".')
+
+        return {section: self.request.GET.get('cursor')}
+
+    def get_context_data(self, *args, **kwargs):
+        [(section, cursor)] = self.get_section_cursors().items()
+        page = self.get_section_page(section, cursor)
+
+        return {
+            'view': self,
+            'section': section,
+            'recipes': page.object_list,
+            'recipe_cards': self.get_section_cards(section, page),
+            'page': page,
+        }
+
+
+class AsyncRecipeListView(AsyncLoginRequiredMixin, RecipeListView):
+    """RecipeListView which loads the pages of the sections with the async
+    ORM interface. Served under ASGI only, see RECIPY_ASGI_URLCONF.
+
+    The card cache and the templates are synchronous, so the cards are
+    rendered in a thread together with the rest of the response.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.section_pages = {
+            section: await self.aget_section_page(section, cursor)
+            for section, cursor in self.get_section_cursors().items()
+        }
+        return await sync_to_async(super().get)(request, *args, **kwargs)
+
+    async def aget_section_page(self, section, cursor=None):
+        try:
+            return await self.get_section_paginator(section).aget_page(cursor)
+        except InvalidCursor as e:
+            raise Http404(str(e))
+
+    def get_section_page(self, section, cursor=None):
+        # Loaded by get
+        return self.section_pages[section]
+
+
+class AsyncRecipeListMoreView(AsyncRecipeListView, RecipeListMoreView):
+    """RecipeListMoreView which loads the page with the async ORM
+    interface, see AsyncRecipeListView."""
+    pass
+
+
+class RecipeSearchView(LoginRequiredMixin, ListView):
+    """Full-text search of the user's recipes and the public recipes. The
+    search words are passed in the `q` GET parameter."""
+    context_object_name = 'recipes'
+    template_name = 'recipy/recipe_search.html'
+
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        return search_recipes(self.request.user, self.get_search_query())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.get_search_query()
+        return context
+
+
+class RecipePantryView(LoginRequiredMixin, ListView):
+    """Finds the recipes which can be made with the ingredients on hand. The
+    ingredients are passed in the `ingredients` GET parameter, separated by
+    commas or new lines."""
+    context_object_name = 'matches'
+    template_name = 'recipy/recipe_pantry.html'
+
+    def get_ingredients_query(self):
+        return self.request.GET.get('ingredients', '').strip()
+
+    def get_queryset(self):
+        ingredient_names = re.split(r'[,\n]', self.get_ingredients_query())
+        return find_recipes_by_ingredients(
+            self.request.user, ingredient_names
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['ingredients_query'] = self.get_ingredients_query()
+        return context
+
+
+class RecipeExportView(LoginRequiredMixin, View):
+    """Streams the user's recipes, or all the public recipes, with their
+    ingredients and steps.
+
+    GET parameters:
+        format: jsonl (default) or csv
+        scope: mine (default) or public
+        images: 1 to bundle the recipes and their images into a zip
+    """
+    scopes = ('mine', 'public')
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'jsonl')
+        scope = request.GET.get('scope', 'mine')
+        if export_format not in EXPORT_FORMATS or scope not in self.scopes:
+            return HttpResponseBadRequest()
+
+        if scope == 'mine':
+            recipes = Recipe.objects.filter(user=request.user)
+        else:
+            recipes = Recipe.objects.filter(is_public=True)
+
+        include_images = request.GET.get('images') == '1'
+        file_name, content_type = get_export_file_info(
+            export_format, include_images
+        )
+        response = StreamingHttpResponse(
+            export_recipes(recipes, export_format, include_images),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="{file_name}"'
+        return response
+
+
+class RecipeImportCreateView(LoginRequiredMixin, DemoUserMixin, CreateView):
+    """Uploads a recipes file which is imported in the background, see
+    recipy.imports."""
+    model = RecipeImport
+    form_class = RecipeImportForm
+    template_name = 'recipy/form.html'
+    demo_user_permissions = ('can_import_recipes',)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        context.update({
+            'form_title': _('Import recipes'),
+            'form_submit_label': _('Import'),
+            'form_has_file_fields': True,
+        })
+
+        return context
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs.update({'user': self.request.user})
+        return kwargs
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        enqueue('import_recipes', import_id=self.object.pk)
+        return response
+
+    def get_success_url(self):
+        return reverse('recipy:recipe-import-detail', args=(self.object.pk,))
+
+
+class RecipeImportDetailView(LoginRequiredMixin, DetailView):
+    """Progress of the user's import."""
+    model = RecipeImport
+    context_object_name = 'recipe_import'
+    template_name = 'recipy/recipe_import_detail.html'
+    pk_url_kwarg = 'pk_import'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
+
+
+class RecipeImportErrorsView(RecipeImportDetailView):
+    """Streams the rejected records of the import as JSON Lines."""
+
+    def get(self, request, *args, **kwargs):
+        recipe_import = self.get_object()
+        response = StreamingHttpResponse(
+            iter_error_file(recipe_import), content_type='application/jsonl'
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="import-{recipe_import.pk}-errors.jsonl"'
+        return response
+
+
 class RecipeCreateView(LoginRequiredMixin, DemoUserMixin, CreateView):
     model = Recipe
     form_class = RecipeForm
@@ -63,6 +338,15 @@ class RecipeCreateView(LoginRequiredMixin, DemoUserMixin, CreateView):
         kwargs.update({'user': self.request.user})
         return kwargs
 
+    def form_valid(self, form):
+        # Checked again with the usage locked until the recipe is counted,
+        # so concurrent requests can't both create the last allowed recipe
+        with transaction.atomic():
+            if not self.can_add_recipe(lock=True):
+                return redirect(self.demo_user_redirect_to)
+
+            return super().form_valid(form)
+
     def get_success_url(self):
         return reverse('recipy:recipes-list')
 
@@ -102,8 +386,89 @@ class RecipeDeleteView(RecipeAccessControlMixin, DirectDeleteView):
 
 
 class RecipeDetailView(RecipeAccessControlMixin, DetailView):
+    """Supports conditional requests: a page the client already has is
+    answered with 304 Not Modified before the steps and ingredients are
+    loaded or anything is rendered.
+
+    The page shows the user in the topbar, so the ETag depends on the user
+    as well as on the recipe and the page is only cached by the browser.
+    Public recipes viewed by other users than the author are reused for
+    RECIPY_PUBLIC_RECIPE_MAX_AGE seconds, the rest are revalidated every
+    time. Pages with pending messages are never cached, the messages are
+    shown only once.
+    """
     model = Recipe
     pk_url_kwarg = 'pk_recipe'
     template_name = 'recipy/recipe_detail.html'
     context_object_name = 'recipe'
     action = RecipeAccessControlMixin.Action.READ
+
+    def get_etag(self):
+        user = self.request.user
+        return make_etag(
+            self.object.pk, self.object.updated.timestamp(),
+            user.pk, user.username, user.is_staff,
+        )
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+        last_modified = self.object.updated
+
+        # Pending messages are shown on the page, it has to be rendered
+        response = None
+        has_messages = bool(len(get_messages(request)))
+        if not has_messages:
+            response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            prefetch_related_objects(
+                [self.object],
+                Prefetch('ingredients',
+                         queryset=Ingredient.objects.order_by('pk')),
+                Prefetch('steps', queryset=Step.objects.order_by('pk')),
+            )
+            response = super().get(request, *args, **kwargs)
+
+        if has_messages:
+            add_never_cache_headers(response)
+        else:
+            set_validators(response, etag, last_modified)
+            if self.object.is_public and \
+                    self.object.user_id != request.user.pk:
+                patch_cache_control(
+                    response, private=True,
+                    max_age=settings.RECIPY_PUBLIC_RECIPE_MAX_AGE,
+                )
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+class AsyncRecipeDetailView(AsyncRecipeAccessControlMixin, RecipeDetailView):
+    """RecipeDetailView which looks the recipe up with the async ORM
+    interface. Served under ASGI only, see RECIPY_ASGI_URLCONF.
+
+    The messages are stored in the session and Django 4.1 has no async
+    version of prefetch_related_objects, so the rest of the response is
+    built in a thread.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        return await sync_to_async(super().get)(request, *args, **kwargs)
+
+
+class ViewMetricsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Staff-only report of the request metrics recorded by
+    recipy.middleware.ViewMetricsMiddleware in this process."""
+    template_name = 'recipy/view_metrics.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'metrics_enabled': settings.RECIPY_VIEW_METRICS['enabled'],
+            'view_metrics': view_metrics.get_summary(),
+        })
+        return context
@@ -0,0 +1,49 @@
+from django.contrib.staticfiles.apps import StaticFilesConfig
+
+
+class RecipyStaticFilesConfig(StaticFilesConfig):
+    """Leaves the assets the templates don't use out of collectstatic, i.e.
+    the sources of the vendor libraries, their unminified copies and the
+    demo scripts of the sb-admin-2 theme. Replaces django.contrib.staticfiles
+    in INSTALLED_APPS.
+
+    The patterns are matched against the paths of the files relative to the
+    static directories, e.g. recipy/vendor/jquery/jquery.js, and against the
+    names of the directories. A directory is left out by a pattern ending
+    with /*.
+    """
+    ignore_patterns = [
+        *StaticFilesConfig.ignore_patterns,
+        # Sources of the theme and the demo pages
+        'recipy/scss/*',
+        'recipy/js/demo/*',
+        'recipy/js/sb-admin-2.js',
+        'recipy/css/sb-admin-2.css',
+        # Libraries which aren't used
+        'recipy/vendor/chart.js/*',
+        'recipy/vendor/datatables/*',
+        # Only the minified bundles and the web fonts are used
+        'recipy/vendor/bootstrap/scss/*',
+        'recipy/vendor/bootstrap/js/bootstrap.js*',
+        'recipy/vendor/bootstrap/js/bootstrap.min.js*',
+        'recipy/vendor/bootstrap/js/bootstrap.bundle.js*',
+        'recipy/vendor/jquery/jquery.js',
+        'recipy/vendor/jquery/jquery.slim.*',
+        'recipy/vendor/jquery-easing/jquery.easing.js',
+        'recipy/vendor/jquery-easing/jquery.easing.compatibility.js',
+        'recipy/vendor/fontawesome-free/css/all.css',
+        'recipy/vendor/fontawesome-free/css/brands*',
+        'recipy/vendor/fontawesome-free/css/fontawesome*',
+        'recipy/vendor/fontawesome-free/css/regular*',
+        'recipy/vendor/fontawesome-free/css/solid*',
+        'recipy/vendor/fontawesome-free/css/svg-with-js*',
+        'recipy/vendor/fontawesome-free/css/v4-shims*',
+        'recipy/vendor/fontawesome-free/js/*',
+        'recipy/vendor/fontawesome-free/less/*',
+        'recipy/vendor/fontawesome-free/metadata/*',
+        'recipy/vendor/fontawesome-free/scss/*',
+        'recipy/vendor/fontawesome-free/sprites/*',
+        'recipy/vendor/fontawesome-free/svgs/*',
+        'recipy/vendor/fontawesome-free/attribution.js',
+        'recipy/vendor/fontawesome-free/package.json',
+    ]
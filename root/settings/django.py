@@ -48,7 +48,10 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # Serves the static files in development the same way as in production
+    'whitenoise.runserver_nostatic',
+    # django.contrib.staticfiles without the unused assets
+    'root.apps.RecipyStaticFilesConfig',
 
     'accounts',
     'recipy',
@@ -61,22 +64,40 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves the static files, see STATICFILES_STORAGE. Unlike
+    # WhiteNoiseMiddleware, it doesn't turn the async requests into sync ones.
+    'recipy.middleware.StaticFilesMiddleware',
+    # Opt-in, see RECIPY_VIEW_METRICS
+    'recipy.middleware.ViewMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware which caches the users, see RECIPY_USER_CACHE
+    'accounts.middleware.CachedUserAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Serves the async read views under ASGI, see RECIPY_ASGI_URLCONF
+    'recipy.middleware.ASGIURLConfMiddleware',
 ]
 
 ROOT_URLCONF = 'root.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # In production, every template is compiled once per process.
+            # With DEBUG, the templates are read on every render, so edits
+            # show up without restarting the server.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ] if not DEBUG else TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -96,6 +117,26 @@ WSGI_APPLICATION = 'root.wsgi.application'
 DATABASES = {'default': env.db()}
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# For production, use a backend shared by all the workers, for example:
+# CACHE_URL=filecache:///var/tmp/recipy_cache or CACHE_URL=redis://...
+
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+
+# Sessions
+# https://docs.djangoproject.com/en/4.1/topics/http/sessions/
+# cached_db reads the sessions from the cache and only queries the database on
+# a miss. django.contrib.sessions.backends.signed_cookies stores them in the
+# cookie and needs no storage at all, but a logout doesn't invalidate the
+# copies of the cookie.
+
+SESSION_ENGINE = env.str(
+    'SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db'
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -138,6 +179,16 @@ STATICFILES_FINDERS = [
     'django.contrib.staticfiles.finders.FileSystemFinder',
     'django.contrib.staticfiles.finders.AppDirectoriesFinder',
 ]
+# In production, collectstatic adds the hash of the content to the names of
+# the files and compresses them with gzip and Brotli:
+# STATICFILES_STORAGE=whitenoise.storage.CompressedManifestStaticFilesStorage
+# WhiteNoiseMiddleware serves the compressed files to the clients which
+# accept them and lets the clients cache the hashed files forever.
+# https://whitenoise.readthedocs.io/en/stable/django.html
+STATICFILES_STORAGE = env.str(
+    'STATICFILES_STORAGE',
+    default='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
 MEDIA_ROOT = env.str('MEDIA_ROOT')
 MEDIA_URL = '/media/'
 
@@ -1,10 +1,107 @@
+from .django import BASE_DIR, env
+
 RECIPY_PRODUCT_NAME = 'Recipy'
 
 # Demo user settings
 RECIPY_DEMO_USER = {
     'username': 'recipy',
     'password': 'recipy123',
-    'recipe_limit': 10,
 }
 
 RECIPY_WEBSITE_URL = 'https://vinkomlacic.com'
+
+# Per-user quotas of the number of recipes and of the bytes of their images,
+# see recipy.quotas. The group and user limits override the default ones, by
+# group name and username. None means unlimited.
+RECIPY_QUOTAS = {
+    'default': {
+        'recipes': None,
+        'image_bytes': None,
+    },
+    'groups': {},
+    'users': {
+        RECIPY_DEMO_USER['username']: {
+            'recipes': 10,
+        },
+    },
+}
+
+# Number of recipes shown per page in each section of the recipe list
+RECIPY_RECIPES_PER_PAGE = 30
+
+# Resized copies of the recipe images. Generated once per upload in every
+# width and in WebP and JPEG formats. "sizes" is the default value of the
+# sizes attribute, i.e. how wide the image is displayed. Uploaded originals
+# are downsized to max_original_size.
+RECIPY_IMAGE_RENDITIONS = {
+    'widths': (320, 640, 1024),
+    'quality': 80,
+    'sizes': '(max-width: 768px) 100vw, 33vw',
+    'max_original_size': 2048,
+}
+
+# Background jobs, see recipy.jobs. The retry delay is doubled after every
+# failed attempt. Running jobs are considered abandoned by a dead worker after
+# stale_after_seconds.
+RECIPY_JOBS = {
+    'max_attempts': 3,
+    'retry_delay_seconds': 30,
+    'poll_interval_seconds': 2,
+    'stale_after_seconds': 60 * 10,
+}
+
+# Cache of the rendered recipe cards in the recipe list
+RECIPY_CARD_CACHE = {
+    'alias': 'default',
+    'timeout': 60 * 60 * 24,
+}
+
+# Cache of the authenticated users, see accounts.middleware.UserCache
+RECIPY_USER_CACHE = {
+    'alias': 'default',
+    'timeout': 60,
+}
+
+# Number of seconds the browser can reuse the detail pages of public recipes
+# of other users, see recipy.views.RecipeDetailView. Other recipe pages are
+# always revalidated. The pages show the user, so shared caches never store
+# them.
+RECIPY_PUBLIC_RECIPE_MAX_AGE = 60
+
+# Max number of recipes returned by the full-text search, see recipy.search
+RECIPY_SEARCH_RESULTS_LIMIT = 50
+
+# Max number of recipes returned by the pantry lookup, see recipy.pantry
+RECIPY_PANTRY_RESULTS_LIMIT = 50
+
+# Number of recipes loaded at once by the streaming export, see recipy.export
+RECIPY_EXPORT_CHUNK_SIZE = 500
+
+# Max number of changes returned at once by the change feed of the API, see
+# recipy.changes
+RECIPY_CHANGES_PAGE_SIZE = 500
+
+# Number of records validated and inserted in a single transaction by the bulk
+# import, see recipy.imports
+RECIPY_IMPORT_BATCH_SIZE = 500
+
+# Directory of the uploaded import files. They contain private recipes, so it
+# must not be served, e.g. from inside MEDIA_ROOT. The files are deleted when
+# their import finishes.
+RECIPY_IMPORTS_ROOT = env.str('RECIPY_IMPORTS_ROOT',
+                              default=str(BASE_DIR / 'imports'))
+
+# URL configuration of the requests served under ASGI, see
+# recipy.middleware.ASGIURLConfMiddleware. It routes the recipe list, detail
+# and JSON API to their async views. Under WSGI the sync views of
+# ROOT_URLCONF are served.
+RECIPY_ASGI_URLCONF = 'root.urls_asgi'
+
+# Per-view request metrics, see recipy.middleware.ViewMetricsMiddleware. The
+# last buffer_size requests of every view are kept in memory. Requests slower
+# than slow_request_ms are logged, None turns the logging off.
+RECIPY_VIEW_METRICS = {
+    'enabled': env.bool('RECIPY_VIEW_METRICS_ENABLED', default=False),
+    'buffer_size': 1000,
+    'slow_request_ms': env.int('RECIPY_SLOW_REQUEST_MS', default=None),
+}
@@ -0,0 +1,14 @@
+"""recipy URL Configuration under ASGI, see RECIPY_ASGI_URLCONF
+
+The same as root.urls, except that the recipy URLs are the ones of
+recipy.urls_asgi.
+"""
+from django.urls import path, include
+
+from root import urls
+
+urlpatterns = [
+    path('', include('recipy.urls_asgi'))
+    if getattr(pattern, 'app_name', None) == 'recipy' else pattern
+    for pattern in urls.urlpatterns
+]